@@ -79,6 +79,17 @@ class SaleAdmin(admin.ModelAdmin):
     readonly_fields = ('date', 'id', 'subtotal', 'discount', 'total')
     inlines = [CartItemInline, SalePaymentInline]
 
+    # Savdo faqat create_sales orqali yoziladi: u qoldiq, qarz, yig'indilar va smenani birga
+    # o'zgartiradi, admin'dagi tahrir esa ularni buzadi. Shuning uchun bu yerda faqat ko'rish.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 class GoodsReceiptItemInline(admin.TabularInline):
     model = GoodsReceiptItem
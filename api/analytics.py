@@ -0,0 +1,157 @@
+"""
+Vaqt bo'laklari (soat/kun/hafta/oy) bo'yicha savdo, to'lov va xarajat qatorlari. Guruhlash
+SQL da (Trunc* + Sum/Count) qilinadi; bo'sh bo'laklar serverda nol bilan to'ldiriladi.
+Mijoz filtrisiz so'rovlar Sale jadvalini emas, soatlik yig'indilarni (HourlySalesRollup, seller_id
+bilan HourlySellerSalesRollup) o'qiydi.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, Trunc
+
+from .models import Sale, SalePayment, Expense, HourlySalesRollup, HourlySellerSalesRollup
+from .rollups import utc_hour
+
+BUCKETS = ('hour', 'day', 'week', 'month')
+# Bitta javobdagi bo'laklar soni (yil davomidagi soatlar ~8 784)
+MAX_BUCKETS = 10000
+HOUR = timedelta(hours=1)
+
+
+class TimeseriesError(ValueError):
+    pass
+
+
+def bucket_start(moment, bucket, tz):
+    local = moment.astimezone(tz)
+    if bucket == 'hour':
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.date()
+    if bucket == 'week':
+        day -= timedelta(days=day.weekday())
+    elif bucket == 'month':
+        day = day.replace(day=1)
+    return datetime.combine(day, time.min, tzinfo=tz)
+
+
+def next_bucket(start, bucket, tz):
+    if bucket == 'hour':
+        # UTC bo'yicha qo'shiladi: yozgi vaqtga o'tishda ham har bir soat bir marta
+        return (start.astimezone(dt_timezone.utc) + timedelta(hours=1)).astimezone(tz)
+    day = start.date()
+    if bucket == 'day':
+        day += timedelta(days=1)
+    elif bucket == 'week':
+        day += timedelta(days=7)
+    else:
+        day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return datetime.combine(day, time.min, tzinfo=tz)
+
+
+def bucket_range(bucket, tz, start, end):
+    if bucket == 'hour':
+        # Soatlar UTC da qo'shiladi (next_bucket bilan bir xil), har biri bitta astimezone
+        first = bucket_start(start, bucket, tz).astimezone(dt_timezone.utc)
+        count = max(0, (end - first) // HOUR + 1)
+        if count > MAX_BUCKETS:
+            raise TimeseriesError(f'Too many buckets (max {MAX_BUCKETS}), use a larger bucket or a shorter range')
+        return [(first + HOUR * index).astimezone(tz) for index in range(count)]
+    buckets = []
+    current = bucket_start(start, bucket, tz)
+    while current <= end:
+        buckets.append(current)
+        if len(buckets) > MAX_BUCKETS:
+            raise TimeseriesError(f'Too many buckets (max {MAX_BUCKETS}), use a larger bucket or a shorter range')
+        current = next_bucket(current, bucket, tz)
+    return buckets
+
+
+def whole_hour_offsets(tz, start, end):
+    return all(tz.utcoffset(moment.replace(tzinfo=None)).total_seconds() % 3600 == 0 for moment in (start, end))
+
+
+def money_sum(field):
+    # Javobda float qaytadi: Decimal yaratmasdan SQL natijasining o'zi olinadi
+    return Sum(field, output_field=FloatField())
+
+
+def grouped(queryset, field, bucket, tz, *keys, **aggregates):
+    if field == 'hour' and bucket == 'hour':
+        # Soatlik yig'indilar allaqachon soat bo'yicha: qayta Trunc qilish shart emas
+        return queryset.values(*keys, bucket_key=F(field)).annotate(**aggregates).order_by()
+    return queryset.annotate(bucket_key=Trunc(field, bucket, tzinfo=tz)).values('bucket_key', *keys)\
+        .annotate(**aggregates).order_by()
+
+
+def sales_timeseries(bucket, tz, start, end, seller_id=None, customer_id=None):
+    """
+    [start, end] oralig'ini qoplaydigan bo'laklar ro'yxati: har birida savdolar soni, jami, chegirma,
+    to'lov turlari bo'yicha summalar va xarajatlar. customer_id bilan xarajatlar qaytarilmaydi
+    (xarajat mijozga bog'lanmagan); seller_id bilan - faqat shu xodim kiritgan xarajatlar.
+    Ikkinchi qiymat - ma'lumot manbai ('rollup' yoki 'sales').
+    """
+    if bucket not in BUCKETS:
+        raise TimeseriesError(f"bucket must be one of: {', '.join(BUCKETS)}")
+    buckets = bucket_range(bucket, tz, start, end)
+    # Oraliq bo'lak chegaralarigacha kengaytiriladi: birinchi va oxirgi bo'lak ham to'liq
+    start, end = buckets[0], next_bucket(buckets[-1], bucket, tz)
+    if not customer_id and whole_hour_offsets(tz, start, end):
+        source = 'rollup'
+        payment_fields = HourlySalesRollup.PAYMENT_FIELDS
+        rollups = HourlySellerSalesRollup.objects.filter(seller_id=seller_id) if seller_id else HourlySalesRollup.objects.all()
+        rollups = rollups.filter(hour__gte=utc_hour(start), hour__lt=end)
+        money_fields = ('total', 'discount', *payment_fields.values())
+        if bucket == 'hour':
+            # Soatiga bitta qator (umumiy yoki bitta sotuvchi): GROUP BY va Decimal'siz o'qiladi
+            names = ('bucket_key', 'count', *money_fields)
+            sales = [dict(zip(names, row)) for row in rollups.values_list(
+                'hour', 'count', *[Cast(field, FloatField()) for field in money_fields]).order_by()]
+        else:
+            sales = list(grouped(rollups, 'hour', bucket, tz, count=Sum('count'),
+                                 **{field: money_sum(field) for field in money_fields}))
+        payment_totals = {
+            row['bucket_key']: {payment_type: row[field] for payment_type, field in payment_fields.items() if row[field]}
+            for row in sales
+        }
+    else:
+        source = 'sales'
+        sale_filter = {}
+        if seller_id:
+            sale_filter['seller_id'] = seller_id
+        if customer_id:
+            sale_filter['customer_id'] = customer_id
+        sales = grouped(Sale.objects.filter(date__gte=start, date__lt=end, **sale_filter), 'date', bucket, tz,
+                        count=Count('pk'), total=money_sum('total'), discount=money_sum('discount'))
+        payments = grouped(
+            SalePayment.objects.filter(sale__date__gte=start, sale__date__lt=end,
+                                       **{f'sale__{key}': value for key, value in sale_filter.items()}),
+            'sale__date', bucket, tz, 'type', amount=money_sum('amount'),
+        )
+        payment_totals = defaultdict(dict)
+        for row in payments:
+            payment_totals[row['bucket_key']][row['type']] = row['amount'] or 0.0
+
+    expenses = {}
+    if not customer_id:
+        expense_queryset = Expense.objects.filter(date__gte=start, date__lt=end)
+        if seller_id:
+            expense_queryset = expense_queryset.filter(employee_id=seller_id)
+        expenses = {row['bucket_key']: row['amount']
+                    for row in grouped(expense_queryset, 'date', bucket, tz, amount=money_sum('amount'))}
+
+    sales = {row['bucket_key']: row for row in sales}
+    results = []
+    for current in buckets:
+        # UTC kalit: zoneinfo vaqtlarini xeshlashdan ancha arzon
+        key = current.astimezone(dt_timezone.utc)
+        row = sales.get(key)
+        results.append({
+            'start': current,
+            'count': row['count'] if row else 0,
+            'total': (row['total'] or 0.0) if row else 0.0,
+            'discount': (row['discount'] or 0.0) if row else 0.0,
+            'payments': payment_totals.get(key, {}),
+            'expenses': None if customer_id else expenses.get(key) or 0.0,
+        })
+    return results, source
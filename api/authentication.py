@@ -0,0 +1,51 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import role_cache
+from .models import Employee
+
+ROLE_CLAIM = 'role'
+PERMISSIONS_CLAIM = 'perms'
+
+
+def token_for_employee(employee):
+    """Rol id'si va ruxsatlar bitmask'i bilan RefreshToken (access token claim'larni meros oladi)."""
+    refresh = RefreshToken.for_user(employee)
+    refresh[ROLE_CLAIM] = employee.role_id
+    refresh[PERMISSIONS_CLAIM] = employee.role.permission_mask if employee.role_id else 0
+    return refresh
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Tokenda role/perms claim'lari bo'lsa, Employee bazadan o'qilmaydi: xodim holati va
+    rolning joriy ruxsatlari role_cache'dan olinadi. Claim'siz eski tokenlar oddiy
+    JWTAuthentication kabi tekshiriladi.
+    """
+
+    def get_user(self, validated_token):
+        if ROLE_CLAIM not in validated_token or PERMISSIONS_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        state = role_cache.employee_state(user_id)
+        if state is None:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        role_id, is_active = state
+        if not is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if role_id != validated_token[ROLE_CLAIM]:
+            # Rol o'zgargan: yangi ruxsatlar bilan qayta kirish kerak
+            raise InvalidToken('Role has changed, please log in again')
+
+        # Qolgan maydonlar deferred: kerak bo'lgandagina bazadan yuklanadi
+        user = Employee.from_db('default', ['id', 'role_id', 'is_active'], [user_id, role_id, is_active])
+        # Token bergan ruxsatlardan rolda hozir ham mavjud bo'lganlari
+        user.permission_mask = validated_token[PERMISSIONS_CLAIM] & role_cache.role_mask(role_id)
+        return user
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import DailySalesRollup, DailyExpenseRollup, DailyProductSales
+
+logger = logging.getLogger(__name__)
+
+# Har bir jarayon (worker) uchun dashboard natijasining xotiradagi nusxasi. Natija
+# DASHBOARD_CACHE_TTL soniya yangi hisoblanadi; undan eski, lekin DASHBOARD_CACHE_MAX_STALE
+# dan yosh natija darhol qaytariladi va fon thread'ida (bir vaqtda faqat bittasi) yangilanadi.
+# Kesh bo'sh yoki juda eski bo'lsa so'rovlar _refresh_lock da bitta hisoblashni kutadi,
+# shuning uchun agregatlar foydalanuvchilar soniga emas, worker'lar soniga mutanosib bajariladi.
+# Savdo/xarajatda kesh ataylab tozalanmaydi: har savdoda tozalash keshni yuklama ostida befoyda
+# qiladi; natija eskiligi TTL/MAX_STALE bilan chegaralangan va javobdagi cached_at da ko'rinadi.
+_refresh_lock = threading.Lock()
+_state_lock = threading.Lock()
+_entry = None
+_refreshing = False
+
+
+class _Entry:
+    def __init__(self, data):
+        self.data = data
+        self.computed_at = timezone.now()
+        self.loaded_at = time.monotonic()
+
+    @property
+    def age(self):
+        return time.monotonic() - self.loaded_at
+
+
+def compute_stats():
+    """Dashboard ko'rsatkichlari: jami va oxirgi 30 kun kunlik yig'indi jadvallaridan (butun tarix skanlanmaydi)."""
+    total_sales = DailySalesRollup.objects.aggregate(total=Sum('total'))['total'] or 0
+    total_expenses = DailyExpenseRollup.objects.aggregate(total=Sum('amount'))['total'] or 0
+    recent_since = timezone.localdate(timezone.now() - timedelta(days=30))
+    recent_sales = DailySalesRollup.objects.filter(date__gte=recent_since).aggregate(
+        total=Sum('total'), count=Sum('count'),
+    )
+    recent_expenses = DailyExpenseRollup.objects.filter(date__gte=recent_since).aggregate(
+        total=Sum('amount'), count=Sum('count'),
+    )
+    # Mahsulot id'si bo'yicha: bir xil nomli mahsulotlar birlashib ketmaydi
+    top_products = DailyProductSales.objects.filter(date__gte=recent_since).values('product_id').annotate(
+        total_sold=Sum('quantity'), name=Max('product__name'),
+    ).order_by('-total_sold', 'product_id')[:5]
+    expense_breakdown = DailyExpenseRollup.objects.values('expenseTypeId').annotate(
+        total=Sum('amount'), count=Sum('count'),
+    ).filter(count__gt=0).order_by('-total')
+    return {
+        'total_sales': float(total_sales),
+        'total_expenses': float(total_expenses),
+        'net_profit': float(total_sales - total_expenses),
+        'recent_sales_total': float(recent_sales['total'] or 0),
+        'recent_sales_count': recent_sales['count'] or 0,
+        'recent_expenses_total': float(recent_expenses['total'] or 0),
+        'recent_expenses_count': recent_expenses['count'] or 0,
+        'top_products': [{
+            'name': product['name'] or 'Unknown',
+            'total_sold': float(product['total_sold'] or 0),
+        } for product in top_products],
+        'expense_breakdown': [{
+            'type': item['expenseTypeId'] or None,
+            'total': float(item['total'] or 0),
+            'count': item['count'],
+        } for item in expense_breakdown],
+    }
+
+
+def _refresh():
+    global _entry
+    _entry = _Entry(compute_stats())
+    return _entry
+
+
+def _background_refresh():
+    global _refreshing
+    try:
+        with _refresh_lock:
+            _refresh()
+    except Exception:
+        # Eski natija MAX_STALE gacha berilib turadi, keyin so'rovlar xatoni o'zi ko'radi
+        logger.exception("Dashboard statistikasini fonda yangilab bo'lmadi")
+    finally:
+        _refreshing = False
+        connection.close()
+
+
+def _start_background_refresh():
+    global _refreshing
+    with _state_lock:
+        if _refreshing:
+            return
+        _refreshing = True
+    threading.Thread(target=_background_refresh, name='dashboard-refresh', daemon=True).start()
+
+
+def get_stats():
+    """_Entry (data, computed_at, age). TTL 0 bo'lsa kesh ishlatilmaydi."""
+    ttl = getattr(settings, 'DASHBOARD_CACHE_TTL', 10)
+    if ttl <= 0:
+        return _Entry(compute_stats())
+    entry = _entry
+    if entry is not None and entry.age < ttl:
+        return entry
+    if entry is not None and entry.age < getattr(settings, 'DASHBOARD_CACHE_MAX_STALE', 60):
+        _start_background_refresh()
+        return entry
+    with _refresh_lock:
+        # Lock kutilayotganda boshqa so'rov yoki fon thread'i yangilagan bo'lishi mumkin
+        entry = _entry
+        if entry is not None and entry.age < ttl:
+            return entry
+        return _refresh()
+
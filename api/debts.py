@@ -0,0 +1,140 @@
+"""
+Mijoz qarzlari daftari (DebtLedgerEntry). Yozuvlar faqat qo'shiladi, Customer.debt esa shu
+tranzaksiyada atomar F() UPDATE bilan o'zgaradi. Hisob-kitob varag'i (statement), qarz yoshi
+(aging) va Customer.debt ni daftar bilan solishtirish daftardan (customer, date) indeksi bo'yicha o'qiladi.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Sum, When
+from django.utils import timezone
+
+from .fast_serializers import decimal_field
+from .models import Customer, DebtLedgerEntry, ChangeLog
+
+# (nom, yuqori chegara kunlarda); oxirgisi - chegarasiz
+AGING_BUCKETS = (('0-30', 30), ('31-60', 60), ('61-90', 90), ('90+', None))
+
+_money = decimal_field(DebtLedgerEntry, 'amount')
+
+
+def money(value):
+    return _money(value or 0, None)
+
+
+def add_customer_debts(debts):
+    """{customer_id: summa} bo'yicha Customer.debt ni bitta atomar UPDATE bilan o'zgartiradi."""
+    debts = {customer_id: amount for customer_id, amount in debts.items() if amount}
+    if not debts:
+        return
+    Customer.objects.filter(pk__in=list(debts)).update(debt=Case(
+        *[When(pk=customer_id, then=F('debt') + amount) for customer_id, amount in debts.items()],
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    ))
+    ChangeLog.record(Customer, list(debts))
+
+
+def post_debt_entries(entries):
+    """Saqlanmagan DebtLedgerEntry'lar: bitta bulk_create va Customer.debt ga jamlangan F() UPDATE."""
+    entries = [entry for entry in entries if entry.amount]
+    if not entries:
+        return
+    DebtLedgerEntry.objects.bulk_create(entries)
+    debts = defaultdict(Decimal)
+    for entry in entries:
+        debts[entry.customer_id] += Decimal(entry.amount)
+    add_customer_debts(debts)
+
+
+def ledger_balances(until=None, customer_id=None):
+    """{customer_id: daftar bo'yicha qoldiq}; until berilsa shu vaqtgacha (kiritilgan holda)."""
+    entries = DebtLedgerEntry.objects.all()
+    if until is not None:
+        entries = entries.filter(date__lte=until)
+    if customer_id is not None:
+        entries = entries.filter(customer_id=customer_id)
+    return dict(entries.values('customer_id').annotate(balance=Sum('amount')).order_by().values_list('customer_id', 'balance'))
+
+
+def customer_statement(customer, start, end):
+    """[start, end] oralig'idagi yozuvlar, har biridan keyingi qoldiq, boshlang'ich va yakuniy qoldiq bilan."""
+    opening = DebtLedgerEntry.objects.filter(customer=customer, date__lt=start).aggregate(total=Sum('amount'))['total'] or Decimal(0)
+    balance = opening
+    entries = []
+    for date, kind, amount, related_id in DebtLedgerEntry.objects.filter(customer=customer, date__gte=start, date__lte=end)\
+            .order_by('date', 'id').values_list('date', 'kind', 'amount', 'relatedId'):
+        balance += amount
+        entries.append({'date': date, 'kind': kind, 'amount': money(amount), 'relatedId': related_id,
+                        'balance': money(balance)})
+    return {
+        'customerId': customer.pk,
+        'customerName': customer.name,
+        'start': start,
+        'end': end,
+        'openingBalance': money(opening),
+        'closingBalance': money(balance),
+        'entries': entries,
+    }
+
+
+def aging_bucket(days):
+    for name, limit in AGING_BUCKETS:
+        if limit is None or days <= limit:
+            return name
+
+
+def debt_aging(as_of=None, customer_id=None):
+    """
+    as_of holatiga qarz yoshi: to'lovlar eng eski qarzlarni yopadi (FIFO), shuning uchun mijozning
+    qoldig'i eng yangi qarz yozuvlaridan boshlab taqsimlanadi va har bir qism yozuv yoshi bo'yicha
+    bo'lakka tushadi. Qoldig'i musbat mijozlar, qoldiq bo'yicha kamayish tartibida.
+    """
+    as_of = as_of or timezone.now()
+    remaining = {pk: balance for pk, balance in ledger_balances(as_of, customer_id).items() if balance > 0}
+    buckets = defaultdict(lambda: dict.fromkeys([name for name, _ in AGING_BUCKETS], Decimal(0)))
+    debits = DebtLedgerEntry.objects.filter(amount__gt=0, date__lte=as_of)
+    if customer_id is not None:
+        debits = debits.filter(customer_id=customer_id)
+    for pk, date, amount in debits.order_by('customer_id', '-date', '-id')\
+            .values_list('customer_id', 'date', 'amount').iterator(chunk_size=2000):
+        left = remaining.get(pk)
+        if not left:
+            continue
+        part = min(amount, left)
+        remaining[pk] = left - part
+        buckets[pk][aging_bucket((as_of - date).days)] += part
+
+    names = dict(Customer.objects.filter(pk__in=list(buckets)).values_list('id', 'name'))
+    totals = dict.fromkeys([name for name, _ in AGING_BUCKETS], Decimal(0))
+    customers = []
+    for pk, customer_buckets in sorted(buckets.items(), key=lambda item: sum(item[1].values()), reverse=True):
+        for name, amount in customer_buckets.items():
+            totals[name] += amount
+        customers.append({
+            'customerId': pk,
+            'customerName': names.get(pk),
+            'balance': money(sum(customer_buckets.values())),
+            'buckets': {name: money(amount) for name, amount in customer_buckets.items()},
+        })
+    return {
+        'asOf': as_of,
+        'total': money(sum(totals.values())),
+        'buckets': {name: money(amount) for name, amount in totals.items()},
+        'customers': customers,
+    }
+
+
+def reconcile_debts(fix=False):
+    """
+    Customer.debt ni daftar yig'indisi bilan solishtiradi: [(customer_id, debt, daftar)] farqlar.
+    fix=True bo'lsa farq atomar F() UPDATE bilan tuzatiladi (daftar - asosiy manba).
+    """
+    balances = ledger_balances()
+    mismatches = []
+    for pk, debt in Customer.objects.values_list('id', 'debt').iterator(chunk_size=2000):
+        ledger = balances.get(pk) or Decimal(0)
+        if debt != ledger:
+            mismatches.append((pk, debt, ledger))
+    if fix:
+        add_customer_debts({pk: ledger - debt for pk, debt, ledger in mismatches})
+    return mismatches
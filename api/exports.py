@@ -0,0 +1,220 @@
+"""
+Savdolar (qatorlari va to'lovlari bilan), ombor harakatlari va xarajatlarni CSV/XLSX ko'rinishida
+oqim sifatida eksport qilish. Querysetlar .iterator() bilan EXPORT_CHUNK_SIZE tadan o'qiladi va
+har bir bo'lak darhol baytlarga aylantirilib StreamingHttpResponse ga beriladi, shuning uchun
+xotira sarfi qatorlar soniga bog'liq emas. XLSX tashqi kutubxonasiz yoziladi: zip arxiv
+qidirilmaydigan (unseekable) buferga yoziladi va varaq XML'i qatorma-qator siqiladi.
+"""
+import csv
+import re
+import zipfile
+from collections import defaultdict
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import Sale, CartItem, SalePayment, StockMovement, Expense
+from .utils import iter_chunks
+
+EXPORT_CHUNK_SIZE = 1000
+# Savdoda bir nechta qator bo'ladi: bo'lak savdolar soni bo'yicha kichikroq, toki uning qatorlari
+# (va ular uchun olingan savat/to'lov qatorlari) taxminan EXPORT_CHUNK_SIZE atrofida qolsin.
+SALE_CHUNK_SIZE = 200
+EXPORT_FORMATS = ('csv', 'xlsx')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# =, +, -, @ (va tab/CR) bilan boshlangan matnni Excel formula sifatida bajaradi (CSV injection):
+# bunday katak oldiga ' qo'shiladi. Sonlar son bo'lib qoladi, shuning uchun manfiy miqdorlar o'zgarmaydi.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ExportError(ValueError):
+    pass
+
+
+def safe_text(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def local_time(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def sale_rows(start, end, chunk_size=SALE_CHUNK_SIZE):
+    """Har bir savat qatori alohida qator; savdo ustunlari va to'lov turlari bo'yicha summalar takrorlanadi."""
+    payment_types = SalePayment.PaymentType.values
+    yield ('saleId', 'date', 'seller', 'customer', 'warehouse', 'subtotal', 'discount', 'total',
+           *payment_types, 'productId', 'productName', 'quantity', 'price', 'unitCost')
+    sales = Sale.objects.filter(date__gte=start, date__lte=end).order_by('date', 'id').values_list(
+        'id', 'date', 'seller__name', 'customer__name', 'warehouse__name', 'subtotal', 'discount', 'total',
+    )
+    for chunk in iter_chunks(sales.iterator(chunk_size=chunk_size), chunk_size):
+        # Qatorlar bo'lakning sana oralig'i bo'yicha olinadi: sale_id__in=[1000 ta id] har bo'lakda katta SQL
+        # satrini hosil qiladi (DEBUG da connection.queries ularni saqlab, xotira qatorlar bilan o'sadi).
+        # Chegaradagi bir xil sanali boshqa bo'lak savdolari sale_ids bilan tashlab yuboriladi.
+        sale_ids = {row[0] for row in chunk}
+        in_chunk = {'sale__date__gte': chunk[0][1], 'sale__date__lte': chunk[-1][1]}
+        items = defaultdict(list)
+        for sale_id, *item in CartItem.objects.filter(**in_chunk).order_by('pk')\
+                .values_list('sale_id', 'product_id', 'product__name', 'quantity', 'price', 'unitCost'):
+            if sale_id in sale_ids:
+                items[sale_id].append(item)
+        payments = defaultdict(lambda: defaultdict(int))
+        for sale_id, payment_type, amount in SalePayment.objects.filter(**in_chunk)\
+                .values_list('sale_id', 'type', 'amount'):
+            if sale_id in sale_ids:
+                payments[sale_id][payment_type] += amount
+        for sale_id, date, *sale in chunk:
+            sale_payments = payments.get(sale_id, {})
+            head = (sale_id, local_time(date), *sale, *(sale_payments.get(t) for t in payment_types))
+            for item in items.get(sale_id) or [(None,) * 5]:
+                yield (*head, *item)
+
+
+def movement_rows(start, end, chunk_size=EXPORT_CHUNK_SIZE):
+    labels = dict(StockMovement.MovementType.choices)
+    yield ('id', 'date', 'type', 'productId', 'productName', 'warehouse', 'quantity', 'relatedId', 'comment')
+    movements = StockMovement.objects.filter(date__gte=start, date__lte=end).order_by('date', 'id').values_list(
+        'id', 'date', 'type', 'product_id', 'product__name', 'warehouse__name', 'quantity', 'relatedId', 'comment',
+    )
+    for movement_id, date, movement_type, *rest in movements.iterator(chunk_size=chunk_size):
+        yield (movement_id, local_time(date), labels.get(movement_type, movement_type), *rest)
+
+
+def expense_rows(start, end, chunk_size=EXPORT_CHUNK_SIZE):
+    yield ('id', 'date', 'type', 'amount', 'description', 'employee')
+    expenses = Expense.objects.filter(date__gte=start, date__lte=end).order_by('date', 'id').values_list(
+        'id', 'date', 'type__display_name', 'amount', 'description', 'employee__name',
+    )
+    for expense_id, date, *rest in expenses.iterator(chunk_size=chunk_size):
+        yield (expense_id, local_time(date), *rest)
+
+
+EXPORTS = {
+    'sales': sale_rows,
+    'movements': movement_rows,
+    'expenses': expense_rows,
+}
+
+
+class Echo:
+    """csv.writer uchun fayl o'rnini bosuvchi: yozilgan qatorni qaytaradi."""
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    # BOM: Excel UTF-8 faylni to'g'ri ochishi uchun
+    yield '\ufeff'.encode()
+    for chunk in iter_chunks(rows, chunk_size):
+        yield ''.join(writer.writerow(map(safe_text, row)) for row in chunk).encode()
+
+
+class ChunkBuffer:
+    """Zip arxiv yoziladigan qidirilmaydigan bufer: yozilgan baytlar take() bilan olinadi."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+# XML 1.0 da ruxsat etilmagan boshqaruv belgilari
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(safe_text(XML_INVALID_CHARS.sub('', str(value))))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_stream(rows, sheet='Sheet1', chunk_size=EXPORT_CHUNK_SIZE):
+    """Bitta varaqli XLSX: satrlar inlineStr, sonlar (Decimal ham) raqamli katak sifatida yoziladi."""
+    buffer = ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content.replace('{sheet}', escape(sheet, {'"': '&quot;'})))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet_file:
+            sheet_file.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for chunk in iter_chunks(rows, chunk_size):
+                sheet_file.write(''.join(
+                    '<row>' + ''.join(xlsx_cell(value) for value in row) + '</row>' for row in chunk
+                ).encode())
+                yield buffer.take()
+            sheet_file.write(b'</sheetData></worksheet>')
+    yield buffer.take()
+
+
+def export_stream(dataset, file_format, start, end):
+    """(baytlar generatori, fayl nomi). Noma'lum ma'lumot turi yoki format uchun ExportError."""
+    if dataset not in EXPORTS:
+        raise ExportError(f"Unknown export: {dataset}. Must be one of: {', '.join(EXPORTS)}")
+    if file_format not in EXPORT_FORMATS:
+        raise ExportError(f"file_format must be one of: {', '.join(EXPORT_FORMATS)}")
+    rows = EXPORTS[dataset](start, end)
+    filename = f'{dataset}_{timezone.localdate(start)}_{timezone.localdate(end)}.{file_format}'
+    if file_format == 'xlsx':
+        return xlsx_stream(rows, sheet=dataset), filename
+    return csv_stream(rows), filename
@@ -0,0 +1,268 @@
+"""
+Faqat o'qish uchun tezkor serializerlar. Ma'lumotlar .values_list() bilan olinadi va
+DRF maydonlari bilan bir xil formatga o'tkaziladi, natija serializers.py dagi mos
+serializer bilan baytma-bayt bir xil (api/tests.py da tekshiriladi).
+"""
+import decimal
+
+from django.utils import timezone
+
+from .models import Product, Customer, Sale, CartItem, SalePayment, StockMovement, WarehouseProduct
+
+# IN (...) so'rovlaridagi id'lar soni (SQLite parametrlar chegarasi)
+IN_CHUNK_SIZE = 500
+
+
+def decimal_field(model, name):
+    """DRF DecimalField(coerce_to_string=True).to_representation bilan bir xil."""
+    field = model._meta.get_field(name)
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = field.max_digits
+
+    def convert(value, state):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        return '{:f}'.format(value.quantize(exponent, context=context))
+    return convert
+
+
+def float_field(value, state):
+    return float(value)
+
+
+def datetime_field(value, state):
+    # DRF DateTimeField: joriy timezone'ga o'tkazib ISO 8601, UTC uchun 'Z'
+    value = value.astimezone(state['timezone']).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def image_field(model, name):
+    storage = model._meta.get_field(name).storage
+
+    def convert(value, state):
+        if not value:
+            return None
+        url = storage.url(value)
+        request = state['request']
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+class Nested:
+    """Bog'langan obyekt (select_related kabi bitta so'rovda JOIN orqali o'qiladi)."""
+
+    def __init__(self, serializer, path):
+        self.serializer = serializer
+        self.path = path
+
+
+def compile_fields(fields, prefix, columns):
+    """fields ro'yxatidan values_list ustunlarini yig'adi va qator -> dict funksiyasini qaytaradi."""
+    parts = []
+    for entry in fields:
+        if isinstance(entry[1], Nested):
+            key, nested = entry
+            parts.append((key, None, compile_fields(nested.serializer.fields, f'{prefix}{nested.path}__', columns)))
+        else:
+            key, column, converter = entry
+            parts.append((key, len(columns), converter))
+            columns.append(prefix + column)
+    pk_index = parts[0][1]
+
+    def build(row, state):
+        # Bog'langan obyekt yo'q (NULL FK) bo'lsa DRF None qaytaradi
+        if row[pk_index] is None:
+            return None
+        obj = {}
+        for key, index, converter in parts:
+            if index is None:
+                obj[key] = converter(row, state)
+                continue
+            value = row[index]
+            obj[key] = value if value is None or converter is None else converter(value, state)
+        return obj
+    return build
+
+
+class FastModelSerializer:
+    """
+    DRF serializer interfeysiga o'xshash: FastProductSerializer(queryset, many=True).data.
+    fields: (kalit, ustun, converter) yoki (kalit, Nested(...)); birinchi maydon pk bo'lishi kerak.
+    """
+    fields = []
+
+    def __init__(self, queryset, many=True, context=None):
+        self.queryset = queryset
+        self.context = context or {}
+
+    @classmethod
+    def compiled(cls):
+        if '_compiled' not in cls.__dict__:
+            columns = []
+            cls._compiled = (columns, compile_fields(cls.fields, '', columns))
+        return cls._compiled
+
+    @classmethod
+    def values(cls, queryset):
+        columns, _ = cls.compiled()
+        return queryset.select_related(None).prefetch_related(None).values_list(*columns)
+
+    def get_state(self):
+        return {'timezone': timezone.get_current_timezone(), 'request': self.context.get('request')}
+
+    def serialize_rows(self, rows):
+        _, build = self.compiled()
+        state = self.get_state()
+        return [build(row, state) for row in rows]
+
+    @property
+    def data(self):
+        return self.serialize_rows(list(self.values(self.queryset)))
+
+
+class FastProductSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('name', 'name', None),
+        ('barcode', 'barcode', None),
+        ('unit', 'unit', None),
+        ('purchasePrice', 'purchasePrice', decimal_field(Product, 'purchasePrice')),
+        ('averageCost', 'averageCost', decimal_field(Product, 'averageCost')),
+        ('salePrice', 'salePrice', decimal_field(Product, 'salePrice')),
+        ('stock', 'stock', float_field),
+        ('minStock', 'minStock', float_field),
+        ('description', 'description', None),
+        ('status', 'status', None),
+        ('image', 'image', image_field(Product, 'image')),
+        ('created_at', 'created_at', datetime_field),
+        ('updated_at', 'updated_at', datetime_field),
+    ]
+
+
+class FastCustomerSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('name', 'name', None),
+        ('phone', 'phone', None),
+        ('address', 'address', None),
+        ('debt', 'debt', decimal_field(Customer, 'debt')),
+    ]
+
+
+class FastRoleSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('name', 'name', None),
+        ('permissions', 'permissions', None),
+    ]
+
+
+class FastEmployeeSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('name', 'name', None),
+        ('phone', 'phone', None),
+        ('role', Nested(FastRoleSerializer, 'role')),
+    ]
+
+
+class FastWarehouseSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('name', 'name', None),
+        ('location', 'location', None),
+        ('description', 'description', None),
+        ('is_active', 'is_active', None),
+        ('created_at', 'created_at', datetime_field),
+        ('updated_at', 'updated_at', datetime_field),
+    ]
+
+
+class FastStockMovementSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('product', Nested(FastProductSerializer, 'product')),
+        ('quantity', 'quantity', float_field),
+        ('type', 'type', None),
+        ('date', 'date', datetime_field),
+        ('relatedId', 'relatedId', None),
+        ('comment', 'comment', None),
+        ('warehouse', 'warehouse_id', None),
+    ]
+
+
+class FastWarehouseProductSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('warehouse', Nested(FastWarehouseSerializer, 'warehouse')),
+        ('product', Nested(FastProductSerializer, 'product')),
+        ('quantity', 'quantity', float_field),
+        ('reserved_quantity', 'reserved_quantity', float_field),
+        ('created_at', 'created_at', datetime_field),
+        ('updated_at', 'updated_at', datetime_field),
+    ]
+
+
+class FastCartItemSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('sale_id', 'sale_id', None),
+        ('productId', 'product_id', None),
+        ('product', Nested(FastProductSerializer, 'product')),
+        ('quantity', 'quantity', float_field),
+        ('price', 'price', decimal_field(CartItem, 'price')),
+    ]
+
+
+class FastSalePaymentSerializer(FastModelSerializer):
+    fields = [
+        ('id', 'id', None),
+        ('sale_id', 'sale_id', None),
+        ('type', 'type', None),
+        ('amount', 'amount', decimal_field(SalePayment, 'amount')),
+    ]
+
+
+class FastSaleSerializer(FastModelSerializer):
+    """SaleSerializer: items va payments prefetch_related kabi alohida so'rovlarda o'qiladi."""
+    fields = [
+        ('id', 'id', None),
+        ('date', 'date', datetime_field),
+        ('subtotal', 'subtotal', decimal_field(Sale, 'subtotal')),
+        ('discount', 'discount', decimal_field(Sale, 'discount')),
+        ('total', 'total', decimal_field(Sale, 'total')),
+        ('customer', Nested(FastCustomerSerializer, 'customer')),
+        ('seller', Nested(FastEmployeeSerializer, 'seller')),
+    ]
+
+    def serialize_rows(self, rows):
+        sales = super().serialize_rows(rows)
+        items = {}
+        payments = {}
+        sale_ids = [sale['id'] for sale in sales]
+        for start in range(0, len(sale_ids), IN_CHUNK_SIZE):
+            chunk = sale_ids[start:start + IN_CHUNK_SIZE]
+            item_serializer = FastCartItemSerializer(CartItem.objects.filter(sale_id__in=chunk).order_by('id'), context=self.context)
+            for item in item_serializer.data:
+                del item['id']
+                items.setdefault(item.pop('sale_id'), []).append(item)
+            payment_serializer = FastSalePaymentSerializer(SalePayment.objects.filter(sale_id__in=chunk).order_by('id'), context=self.context)
+            for payment in payment_serializer.data:
+                del payment['id']
+                payments.setdefault(payment.pop('sale_id'), []).append(payment)
+
+        # Kalitlar tartibi SaleSerializer.Meta.fields bilan bir xil bo'lishi kerak
+        return [{
+            'id': sale['id'],
+            'date': sale['date'],
+            'items': items.get(sale['id'], []),
+            'subtotal': sale['subtotal'],
+            'discount': sale['discount'],
+            'total': sale['total'],
+            'payments': payments.get(sale['id'], []),
+            'customer': sale['customer'],
+            'seller': sale['seller'],
+        } for sale in sales]
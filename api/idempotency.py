@@ -0,0 +1,102 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+# Shuncha soniyadan keyin ham tugallanmagan so'rov (worker o'lgan) egasiz hisoblanadi
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.get_full_path()}\n{body}'.encode()).hexdigest()
+
+
+def replay(record):
+    return Response(record.response_body, status=record.response_status, headers={REPLAYED_HEADER: 'true'})
+
+
+def claim(request, key):
+    """
+    Kalitni so'rov uchun band qiladi. (record, None) - so'rovni bajarish kerak;
+    (None, response) - saqlangan javob yoki xato qaytariladi.
+    """
+    now = timezone.now()
+    fingerprint = request_fingerprint(request)
+    IdempotencyKey.objects.filter(expires_at__lte=now).delete()
+    try:
+        # Alohida tranzaksiyada: parallel so'rovlar band qilinganini darhol ko'radi
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                key=key, employee_id=request.user.pk, path=request.path, request_hash=fingerprint,
+                expires_at=now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)),
+            )
+        return record, None
+    except IntegrityError:
+        pass
+
+    record = IdempotencyKey.objects.filter(employee_id=request.user.pk, key=key).first()
+    if record is None:
+        # Shu orada o'chirildi (muvaffaqiyatsiz so'rov kalitni bo'shatdi)
+        return claim(request, key)
+    if record.path != request.path or record.request_hash != fingerprint:
+        return None, Response(
+            {'error': 'Idempotency-Key was already used with a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    if record.response_status is not None:
+        return None, replay(record)
+    stale_before = now - timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT)
+    if record.created_at < stale_before:
+        # Egasiz qolgan band qilishni faqat bitta so'rov o'ziga oladi
+        taken = IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True, created_at=record.created_at)\
+            .update(created_at=now)
+        if taken:
+            return record, None
+    return None, Response(
+        {'error': 'A request with this Idempotency-Key is still in progress'},
+        status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'},
+    )
+
+
+class IdempotentCreateMixin:
+    """
+    POST so'rovida Idempotency-Key sarlavhasi bo'lsa, muvaffaqiyatli javob saqlanadi va
+    shu kalit bilan takroriy so'rovlar (masalan, timeout'dan keyin) ishni qayta bajarmasdan
+    o'sha javobni oladi. Kalitlar har bir xodim uchun alohida.
+    """
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return super().post(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+            return Response({'error': 'Idempotency-Key is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        record, response = claim(request, key)
+        if response is not None:
+            return response
+        try:
+            # Natija ish bilan bitta tranzaksiyada saqlanadi: ikkalasi ham yoziladi yoki hech biri
+            with transaction.atomic():
+                response = super().post(request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    IdempotencyKey.objects.filter(pk=record.pk).update(
+                        response_status=response.status_code, response_body=response.data,
+                    )
+                    return response
+        except Exception:
+            IdempotencyKey.objects.filter(pk=record.pk).delete()
+            raise
+        # Xato javoblar saqlanmaydi: tuzatilgan so'rov shu kalit bilan qayta yuborilishi mumkin
+        IdempotencyKey.objects.filter(pk=record.pk).delete()
+        return response
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.stock import build_stock_snapshots
+
+
+class Command(BaseCommand):
+    help = ("Kunlik qoldiq snapshot'larini oxirgi snapshot'dan bugungacha quradi (cron orqali "
+            "kuniga bir marta ishga tushiriladi; qayta ishga tushirish xavfsiz).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill-days', type=int, default=0,
+                            help="Eng eski snapshot'dan orqaga qo'shimcha shuncha kunlik snapshot qurish")
+
+    def handle(self, *args, **options):
+        created = build_stock_snapshots(backfill_days=options['backfill_days'])
+        for snapshot in created:
+            self.stdout.write(f"{snapshot.date.isoformat()}: {snapshot.balances.count()} ta qoldiq")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} ta snapshot yaratildi"))
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Warehouse
+from api.stocktake import STOCKTAKE_CHUNK_SIZE, StocktakeFormatError, apply_stocktake, iter_count_rows
+
+
+class Command(BaseCommand):
+    help = "Inventarizatsiya faylini (CSV: barcode,quantity yoki JSON lines) oqim sifatida import qiladi."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Sanoq fayli")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default=None,
+                            help="Fayl formati (sukut bo'yicha kengaytmadan aniqlanadi)")
+        parser.add_argument('--warehouse', default=None, help="Ombor id'si (berilmasa Product.stock bilan solishtiriladi)")
+        parser.add_argument('--chunk-size', type=int, default=STOCKTAKE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        warehouse_id = options['warehouse']
+        if warehouse_id and not Warehouse.objects.filter(pk=warehouse_id).exists():
+            raise CommandError(f"Ombor topilmadi: {warehouse_id}")
+        try:
+            with open(path, 'rb') as lines:
+                report = apply_stocktake(iter_count_rows(lines, file_format), warehouse_id=warehouse_id,
+                                         chunk_size=options['chunk_size'])
+        except (OSError, StocktakeFormatError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['lines']} qator, {report['adjusted']} ta tuzatish, {report['linesPerSecond']} qator/s"
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Employee
+
+
+class Command(BaseCommand):
+    help = ("pin_lookup'i bo'lmagan (PIN qidiruv digest'i joriy qilinishidan oldin yaratilgan va o'shandan beri "
+            "kirmagan) xodimlarni ko'rsatadi: ular birinchi kirishda digest oladi, ungacha har noto'g'ri PIN "
+            "ularning hammasini tekshiradi (LEGACY_PIN_SCANS_PER_MINUTE bilan cheklangan).")
+
+    def handle(self, *args, **options):
+        employees = Employee.objects.filter(pin_lookup__isnull=True).order_by('name')\
+            .values_list('id', 'name', 'phone', 'is_active')
+        count = 0
+        for employee_id, name, phone, is_active in employees.iterator(chunk_size=2000):
+            count += 1
+            self.stdout.write(f"{employee_id}: {name} ({phone}){'' if is_active else ' - faol emas'}")
+        if count:
+            self.stdout.write(self.style.WARNING(
+                f"{count} ta xodim hali digest olmagan (birinchi kirishda oladi yoki PIN qayta o'rnatiladi)"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Barcha xodimlarning PIN qidiruv digest'i bor"))
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = ("Eski ChangeLog yozuvlarini o'chiradi (cron orqali kuniga bir marta). Shundan eski kursor "
+            "bilan kelgan terminal 410 oladi va to'liq ma'lumotni qayta yuklaydi.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'CHANGELOG_RETENTION_DAYS', 30),
+                            help="Shuncha kundan eski yozuvlar o'chiriladi")
+
+    def handle(self, *args, **options):
+        deleted = ChangeLog.prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f"{deleted} ta ChangeLog yozuvi o'chirildi"))
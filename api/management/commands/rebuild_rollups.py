@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = ("Kunlik savdo, to'lov va xarajat yig'indilarini Sale/SalePayment/Expense jadvallaridan "
+            "qayta hisoblaydi (masalan, ma'lumotlar qo'lda tuzatilgandan keyin).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', default=None,
+                            help="Shu sanadan (YYYY-MM-DD) boshlab qayta hisoblash; berilmasa butun tarix")
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_date(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError(f"Noto'g'ri sana: {options['since']}")
+        created = rebuild_rollups(since=since)
+        self.stdout.write(self.style.SUCCESS(f"{created} ta kunlik yig'indi qatori yaratildi"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.debts import reconcile_debts
+
+
+class Command(BaseCommand):
+    help = ("Customer.debt ni qarz daftari yig'indisi bilan solishtiradi va farqlarni chiqaradi "
+            "(--fix bilan qarz daftar bo'yicha tuzatiladi).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help="Farqli mijozlar qarzini daftar yig'indisiga tenglashtirish")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            mismatches = reconcile_debts(fix=options['fix'])
+        for customer_id, debt, ledger in mismatches:
+            self.stdout.write(f"{customer_id}: qarz={debt} daftar={ledger} farq={debt - ledger}")
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Barcha mijozlar qarzi daftar bilan mos"))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} ta mijoz qarzi tuzatildi"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} ta mijoz qarzi daftar bilan mos emas"))
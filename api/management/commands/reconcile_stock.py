@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.stock import reconcile_stock
+
+
+class Command(BaseCommand):
+    help = ("Omborlardagi qoldiqlar yig'indisi Product.stock dan katta bo'lgan mahsulotlarni ko'rsatadi "
+            "(ombor qatorlari eskirgan; inventarizatsiya bilan tuzatiladi).")
+
+    def handle(self, *args, **options):
+        mismatches = reconcile_stock()
+        for product_id, stock, total in mismatches:
+            self.stdout.write(f"{product_id}: stock={stock} omborlar={total} farq={stock - total}")
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("Barcha mahsulotlar qoldig'i omborlar bilan mos"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(mismatches)} ta mahsulotda omborlar qoldig'i umumiy qoldiqdan ko'p"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Muddati o'tgan savat bronlarini bo'shatadi (cron orqali har daqiqada ishga tushiriladi)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Bitta tranzaksiyada bo'shatiladigan bronlar soni")
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{released} ta bron bo'shatildi"))
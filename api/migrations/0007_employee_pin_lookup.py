@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_expensetype_alter_expense_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='pin_lookup',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, null=True),
+        ),
+    ]
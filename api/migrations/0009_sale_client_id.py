@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:38
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sale',
+            name='clientId',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='sale',
+            name='date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
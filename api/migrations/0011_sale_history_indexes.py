@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date', 'id'], name='sale_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['seller', 'date', 'id'], name='sale_seller_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['customer', 'date', 'id'], name='sale_customer_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salepayment',
+            index=models.Index(fields=['sale', 'type', 'amount'], name='salepayment_sale_type_idx'),
+        ),
+    ]
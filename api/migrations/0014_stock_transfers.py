@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='type',
+            field=models.CharField(choices=[('kirim', 'Kirim'), ('chiqim', 'Chiqim'), ('savdo', 'Savdo'), ('vozvrat', 'Vozvrat'), ('kochirish_chiqim', "Ko'chirish (chiqim)"), ('kochirish_kirim', "Ko'chirish (kirim)")], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='StockTransfer',
+            fields=[
+                ('id', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('date', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.CharField(blank=True, max_length=255, null=True)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('fromWarehouse', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transfers_out', to='api.warehouse')),
+                ('toWarehouse', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transfers_in', to='api.warehouse')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockTransferItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.FloatField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='api.product')),
+                ('transfer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='api.stocktransfer')),
+            ],
+        ),
+    ]
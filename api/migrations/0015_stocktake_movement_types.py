@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_stock_transfers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='type',
+            field=models.CharField(choices=[('kirim', 'Kirim'), ('chiqim', 'Chiqim'), ('savdo', 'Savdo'), ('vozvrat', 'Vozvrat'), ('kochirish_chiqim', "Ko'chirish (chiqim)"), ('kochirish_kirim', "Ko'chirish (kirim)"), ('inventar_ortiqcha', 'Inventarizatsiya (ortiqcha)'), ('inventar_kamomad', 'Inventarizatsiya (kamomad)')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+def initial_average_cost(apps, schema_editor):
+    # Kirimlar tarixi qayta hisoblanmaydi: boshlang'ich qiymat oxirgi kirim narxi
+    Product = apps.get_model('api', 'Product')
+    Product.objects.update(averageCost=models.F('purchasePrice'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_stocktake_movement_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='averageCost',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=14),
+        ),
+        migrations.RunPython(initial_average_cost, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_product_average_cost'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='goodsreceipt',
+            index=models.Index(fields=['date', 'id'], name='goodsreceipt_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goodsreceipt',
+            index=models.Index(fields=['supplier', 'date', 'id'], name='goodsreceipt_supplier_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='goodsreceipt',
+            index=models.Index(fields=['docNumber'], name='goodsreceipt_docnumber_idx'),
+        ),
+    ]
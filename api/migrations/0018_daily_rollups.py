@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:06
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def build_rollups(apps, schema_editor):
+    # Mavjud tarix bo'yicha boshlang'ich yig'indilar. api.rollups dagi funksiyalarning shu
+    # migratsiya vaqtidagi nusxasi: keyingi o'zgarishlar tarixiy migratsiyani o'zgartirmasin.
+    Sale = apps.get_model('api', 'Sale')
+    SalePayment = apps.get_model('api', 'SalePayment')
+    Expense = apps.get_model('api', 'Expense')
+    DailySalesRollup = apps.get_model('api', 'DailySalesRollup')
+    DailyPaymentRollup = apps.get_model('api', 'DailyPaymentRollup')
+    DailyExpenseRollup = apps.get_model('api', 'DailyExpenseRollup')
+    tz = timezone.get_current_timezone()
+    DailySalesRollup.objects.bulk_create([
+        DailySalesRollup(date=row['day'], count=row['count'], total=row['total'] or 0, discount=row['discount'] or 0)
+        for row in Sale.objects.annotate(day=TruncDate('date', tzinfo=tz)).values('day')
+        .annotate(count=Count('pk'), total=Sum('total'), discount=Sum('discount')).order_by()
+    ], batch_size=500)
+    DailyPaymentRollup.objects.bulk_create([
+        DailyPaymentRollup(date=row['day'], type=row['type'], amount=row['amount'] or 0)
+        for row in SalePayment.objects.annotate(day=TruncDate('sale__date', tzinfo=tz)).values('day', 'type')
+        .annotate(amount=Sum('amount')).order_by()
+    ], batch_size=500)
+    DailyExpenseRollup.objects.bulk_create([
+        DailyExpenseRollup(date=row['day'], expenseTypeId=row['type_id'] or '', count=row['count'],
+                           amount=row['amount'] or 0)
+        for row in Expense.objects.annotate(day=TruncDate('date', tzinfo=tz)).values('day', 'type_id')
+        .annotate(count=Count('pk'), amount=Sum('amount')).order_by()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_goods_receipt_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('expenseTypeId', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('date', 'expenseTypeId')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('type', models.CharField(choices=[('naqd', 'Naqd'), ('plastik', 'Plastik'), ("o'tkazma", "O'tkazma"), ('nasiya', 'Nasiya')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'unique_together': {('date', 'type')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def line_amount(price_field):
+    return ExpressionWrapper(F(price_field) * F('quantity'), output_field=DecimalField(max_digits=16, decimal_places=4))
+
+
+def backfill_product_sales(apps, schema_editor):
+    # Eski savdolarning tannarxi saqlanmagan: taxminan mahsulotning joriy o'rtacha tannarxi olinadi.
+    # Guruhlash api.rollups.daily_product_sales ning shu migratsiya vaqtidagi nusxasi.
+    Product = apps.get_model('api', 'Product')
+    CartItem = apps.get_model('api', 'CartItem')
+    DailyProductSales = apps.get_model('api', 'DailyProductSales')
+    CartItem.objects.update(unitCost=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('averageCost')[:1]))
+    tz = timezone.get_current_timezone()
+    DailyProductSales.objects.bulk_create([
+        DailyProductSales(date=row['day'], product_id=row['product_id'], quantity=row['sold'],
+                          revenue=row['revenue'] or 0, cost=row['cost'] or 0)
+        for row in CartItem.objects.annotate(day=TruncDate('sale__date', tzinfo=tz)).values('day', 'product_id')
+        .annotate(sold=Sum('quantity'), revenue=Sum(line_amount('price')), cost=Sum(line_amount('unitCost'))).order_by()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cartitem',
+            name='unitCost',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=14),
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.FloatField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cost', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.product')),
+            ],
+            options={
+                'unique_together': {('date', 'product')},
+            },
+        ),
+        migrations.RunPython(backfill_product_sales, migrations.RunPython.noop),
+    ]
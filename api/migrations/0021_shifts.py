@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_hourly_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shift',
+            fields=[
+                ('id', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('openedAt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('closedAt', models.DateTimeField(blank=True, null=True)),
+                ('openingCash', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('closingCash', models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True)),
+                ('salesCount', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('card', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transfer', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debt', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('employee', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shifts', to=settings.AUTH_USER_MODEL)),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='shifts', to='api.warehouse')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sales', to='api.shift'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['employee', 'openedAt'], name='shift_employee_opened_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shift',
+            index=models.Index(fields=['openedAt'], name='shift_opened_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='shift',
+            constraint=models.UniqueConstraint(condition=models.Q(('closedAt__isnull', True)), fields=('employee',), name='shift_one_open_per_employee'),
+        ),
+    ]
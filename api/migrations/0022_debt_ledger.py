@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:41
+
+from collections import defaultdict
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def build_debt_ledger(apps, schema_editor):
+    # Mavjud tarixdan: nasiya to'lovlari (+), qarz to'lovlari (-), qolgan farq - Customer.debt ga tuzatish
+    SalePayment = apps.get_model('api', 'SalePayment')
+    DebtPayment = apps.get_model('api', 'DebtPayment')
+    Customer = apps.get_model('api', 'Customer')
+    DebtLedgerEntry = apps.get_model('api', 'DebtLedgerEntry')
+    balances = defaultdict(int)
+    entries = []
+
+    def add(customer_id, date, amount, kind, related_id):
+        balances[customer_id] += amount
+        entries.append(DebtLedgerEntry(customer_id=customer_id, date=date, amount=amount, kind=kind, relatedId=related_id))
+        if len(entries) >= 1000:
+            DebtLedgerEntry.objects.bulk_create(entries)
+            entries.clear()
+
+    debt_sales = SalePayment.objects.filter(type='nasiya', sale__customer__isnull=False)\
+        .values_list('sale__customer_id', 'sale__date', 'amount', 'sale_id').order_by('sale__date', 'pk')
+    for customer_id, date, amount, sale_id in debt_sales.iterator(chunk_size=1000):
+        add(customer_id, date, amount, 'savdo', sale_id)
+    debt_payments = DebtPayment.objects.values_list('customer_id', 'date', 'amount', 'id').order_by('date', 'pk')
+    for customer_id, date, amount, payment_id in debt_payments.iterator(chunk_size=1000):
+        add(customer_id, date, -amount, 'tolov', payment_id)
+    now = django.utils.timezone.now()
+    for customer_id, debt in Customer.objects.values_list('id', 'debt').iterator(chunk_size=1000):
+        difference = debt - balances.get(customer_id, 0)
+        if difference:
+            add(customer_id, now, difference, 'tuzatish', None)
+    DebtLedgerEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_shifts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DebtLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('kind', models.CharField(choices=[('savdo', 'Nasiya savdo'), ('tolov', "Qarz to'lovi"), ('tuzatish', 'Tuzatish')], max_length=10)),
+                ('relatedId', models.CharField(blank=True, max_length=100, null=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='debt_entries', to='api.customer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer', 'date', 'id'], name='debtledger_customer_date_idx')],
+            },
+        ),
+        migrations.RunPython(build_debt_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 12:20
+
+from datetime import timezone as dt_timezone
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncHour
+
+# To'lov turi -> soatlik qatordagi maydon (migratsiya vaqtidagi qiymatlar)
+PAYMENT_FIELDS = {'naqd': 'cash', 'plastik': 'card', "o'tkazma": 'transfer', 'nasiya': 'debt'}
+
+
+def hourly_rollups(model, sales, payments, keys=()):
+    # api.rollups.hourly_rollups ning shu migratsiya vaqtidagi nusxasi: keyingi o'zgarishlar
+    # tarixiy migratsiyani o'zgartirmasin
+    hours = {
+        (*[row[key] for key in keys], row['bucket']): model(
+            hour=row['bucket'], count=row['count'], total=row['total'] or 0, discount=row['discount'] or 0,
+            **{key: row[key] for key in keys},
+        )
+        for row in sales.annotate(bucket=TruncHour('date', tzinfo=dt_timezone.utc)).values('bucket', *keys)
+        .annotate(count=Count('pk'), total=Sum('total'), discount=Sum('discount')).order_by()
+    }
+    payment_sums = {field: Sum('amount', filter=Q(type=payment_type)) for payment_type, field in PAYMENT_FIELDS.items()}
+    for row in payments.annotate(bucket=TruncHour('sale__date', tzinfo=dt_timezone.utc))\
+            .values('bucket', *[f'sale__{key}' for key in keys]).annotate(**payment_sums).order_by():
+        rollup = hours[(*[row[f'sale__{key}'] for key in keys], row['bucket'])]
+        for field in payment_sums:
+            setattr(rollup, field, row[field] or 0)
+    return list(hours.values())
+
+
+def build_seller_rollups(apps, schema_editor):
+    # Mavjud tarix bo'yicha sotuvchi bo'yicha boshlang'ich yig'indilar (sotuvchisiz savdolarsiz)
+    Sale = apps.get_model('api', 'Sale')
+    SalePayment = apps.get_model('api', 'SalePayment')
+    HourlySellerSalesRollup = apps.get_model('api', 'HourlySellerSalesRollup')
+    HourlySellerSalesRollup.objects.bulk_create(
+        hourly_rollups(HourlySellerSalesRollup, Sale.objects.filter(seller__isnull=False),
+                       SalePayment.objects.filter(sale__seller__isnull=False), keys=('seller_id',)),
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_debt_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlySellerSalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cash', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('card', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('transfer', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debt', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('seller', 'hour')},
+            },
+        ),
+        migrations.RunPython(build_seller_rollups, migrations.RunPython.noop),
+    ]
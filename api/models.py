@@ -2,7 +2,14 @@ from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db.models import JSONField
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+import logging
 import os
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
 
 
 class Role(models.Model):
@@ -25,6 +32,31 @@ class Role(models.Model):
     def __str__(self):
         return self.name
 
+    # Bitmask JWT ichida saqlanadi: yangi ruxsatlar faqat ro'yxat oxiriga qo'shilsin
+    @classmethod
+    def permission_bit(cls, permission):
+        # Noma'lum nom uchun 0: u hech qanday ruxsat bermaydi
+        try:
+            return 1 << cls.Permission.values.index(permission)
+        except ValueError:
+            return 0
+
+    @property
+    def permission_mask(self):
+        # Rolda saqlangan eskirgan/xato yozilgan ruxsat butun rolni buzmaydi: u tashlab yuboriladi
+        mask = 0
+        for permission in self.permissions or []:
+            bit = self.permission_bit(permission)
+            if not bit:
+                logger.warning("%s rolida noma'lum ruxsat: %r", self.pk, permission)
+            mask |= bit
+        return mask
+
+
+def make_pin_lookup(pin):
+    # PIN bo'yicha tezkor qidiruv uchun kalitli digest (SECRET_KEY bilan)
+    return salted_hmac('api.Employee.pin_lookup', str(pin), algorithm='sha256').hexdigest()
+
 
 # ========= BU QISM O'ZGARDI =========
 class EmployeeManager(BaseUserManager):
@@ -66,6 +98,7 @@ class Employee(AbstractBaseUser, PermissionsMixin):
     role = models.ForeignKey(Role, on_delete=models.SET_NULL, null=True, related_name='employees')
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    pin_lookup = models.CharField(max_length=64, null=True, blank=True, db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -83,6 +116,11 @@ class Employee(AbstractBaseUser, PermissionsMixin):
     def pin(self):
         return "PIN is write-only"
 
+    def set_password(self, raw_password):
+        # PIN ham parol sifatida saqlanadi, shuning uchun qidiruv digesti shu yerda yangilanadi
+        super().set_password(raw_password)
+        self.pin_lookup = make_pin_lookup(raw_password) if raw_password is not None else None
+
 
 class Unit(models.Model):
     id = models.CharField(max_length=100, primary_key=True)
@@ -99,6 +137,8 @@ class Product(models.Model):
     barcode = models.CharField(max_length=100, null=True, blank=True, unique=True)
     unit = models.CharField(max_length=50)
     purchasePrice = models.DecimalField(max_digits=12, decimal_places=2)
+    # Qoldiqdagi tovarning o'rtacha tannarxi: har bir kirimda qoldiq va kirim narxi bo'yicha o'rtacha olinadi
+    averageCost = models.DecimalField(max_digits=14, decimal_places=4, default=0)
     salePrice = models.DecimalField(max_digits=12, decimal_places=2)
     stock = models.FloatField()
     minStock = models.FloatField()
@@ -128,12 +168,27 @@ class Customer(models.Model):
 
 class Sale(models.Model):
     id = models.CharField(max_length=100, primary_key=True)
-    date = models.DateTimeField(auto_now_add=True)
+    # Oflayn savdolar terminaldagi haqiqiy vaqt bilan sinxronlanadi, shuning uchun auto_now_add emas
+    date = models.DateTimeField(default=timezone.now)
+    # Terminal tomonidan berilgan id: oflayn navbat qayta yuborilganda dublikatni aniqlash uchun
+    clientId = models.CharField(max_length=100, unique=True, null=True, blank=True)
     subtotal = models.DecimalField(max_digits=12, decimal_places=2)
     discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total = models.DecimalField(max_digits=12, decimal_places=2)
     customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
     seller = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, related_name='sales')
+    # Tovar shu ombordan chiqariladi (WarehouseProduct.quantity); None - faqat umumiy Product.stock
+    warehouse = models.ForeignKey('Warehouse', on_delete=models.PROTECT, null=True, blank=True, related_name='sales')
+    # Savdo saqlanganda sotuvchining ochiq smenasi (bo'lmasa None)
+    shift = models.ForeignKey('Shift', on_delete=models.SET_NULL, null=True, blank=True, related_name='sales')
+
+    class Meta:
+        # Savdolar tarixining keyset pagination'i (date, id) bo'yicha, filtrlar bilan ham
+        indexes = [
+            models.Index(fields=['date', 'id'], name='sale_date_id_idx'),
+            models.Index(fields=['seller', 'date', 'id'], name='sale_seller_date_idx'),
+            models.Index(fields=['customer', 'date', 'id'], name='sale_customer_date_idx'),
+        ]
 
 
 class CartItem(models.Model):
@@ -141,6 +196,8 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.FloatField()
     price = models.DecimalField(max_digits=12, decimal_places=2)
+    # Savdo paytidagi birlik tannarxi (Product.averageCost): keyingi kirimlar foydani o'zgartirmaydi
+    unitCost = models.DecimalField(max_digits=14, decimal_places=4, default=0)
 
 
 class SalePayment(models.Model):
@@ -154,6 +211,10 @@ class SalePayment(models.Model):
     type = models.CharField(max_length=10, choices=PaymentType.choices)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
 
+    class Meta:
+        # To'lov turi filtri (EXISTS) va summary uchun jadvalga murojaat qilmasdan o'qiladi
+        indexes = [models.Index(fields=['sale', 'type', 'amount'], name='salepayment_sale_type_idx')]
+
 
 class DebtPayment(models.Model):
     id = models.CharField(max_length=100, primary_key=True)
@@ -163,20 +224,59 @@ class DebtPayment(models.Model):
     paymentType = models.CharField(max_length=10, choices=SalePayment.PaymentType.choices)
 
 
+class DebtLedgerEntry(models.Model):
+    """
+    Mijoz qarzi daftari (faqat qo'shiladi, o'zgartirilmaydi): nasiya savdo qarzni oshiradi (+),
+    qarz to'lovi kamaytiradi (-), qo'lda o'zgartirish tuzatish yozuvi bo'ladi. Customer.debt -
+    shu yozuvlar yig'indisi; hisob-kitob va qarz yoshi hisobotlari daftardan o'qiladi.
+    """
+    class Kind(models.TextChoices):
+        SALE = 'savdo', 'Nasiya savdo'
+        PAYMENT = 'tolov', "Qarz to'lovi"
+        ADJUSTMENT = 'tuzatish', 'Tuzatish'
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='debt_entries')
+    date = models.DateTimeField(default=timezone.now)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    # Savdo yoki DebtPayment id'si
+    relatedId = models.CharField(max_length=100, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['customer', 'date', 'id'], name='debtledger_customer_date_idx')]
+
+
 class StockMovement(models.Model):
     class MovementType(models.TextChoices):
         KIRIM = 'kirim', 'Kirim'
         CHIQIM = 'chiqim', 'Chiqim'
         SAVDO = 'savdo', 'Savdo'
         VOZVRAT = 'vozvrat', "Vozvrat"
+        KOCHIRISH_CHIQIM = 'kochirish_chiqim', "Ko'chirish (chiqim)"
+        KOCHIRISH_KIRIM = 'kochirish_kirim', "Ko'chirish (kirim)"
+        INVENTAR_ORTIQCHA = 'inventar_ortiqcha', "Inventarizatsiya (ortiqcha)"
+        INVENTAR_KAMOMAD = 'inventar_kamomad', "Inventarizatsiya (kamomad)"
+
+    # Qoldiqni oshiruvchi turlar; qolganlari (chiqim, savdo) kamaytiradi
+    INCOMING_TYPES = (
+        MovementType.KIRIM, MovementType.VOZVRAT, MovementType.KOCHIRISH_KIRIM, MovementType.INVENTAR_ORTIQCHA,
+    )
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Ma'lum bir omborga tegishli harakat (masalan, omborga kirim); None - umumiy qoldiq
+    warehouse = models.ForeignKey('Warehouse', on_delete=models.SET_NULL, null=True, blank=True, related_name='movements')
     quantity = models.FloatField()
-    type = models.CharField(max_length=10, choices=MovementType.choices)
+    type = models.CharField(max_length=20, choices=MovementType.choices)
     date = models.DateTimeField(auto_now_add=True)
     relatedId = models.CharField(max_length=100, null=True, blank=True)
     comment = models.CharField(max_length=255, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='stockmovement_date_idx'),
+            models.Index(fields=['product', 'date'], name='stockmovement_product_date_idx'),
+        ]
+
 
 class Warehouse(models.Model):
     id = models.CharField(max_length=100, primary_key=True)
@@ -199,6 +299,13 @@ class GoodsReceipt(models.Model):
     totalAmount = models.DecimalField(max_digits=14, decimal_places=2)
     warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, null=True, blank=True)  # Add warehouse field
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='goodsreceipt_date_id_idx'),
+            models.Index(fields=['supplier', 'date', 'id'], name='goodsreceipt_supplier_date_idx'),
+            models.Index(fields=['docNumber'], name='goodsreceipt_docnumber_idx'),
+        ]
+
 
 class GoodsReceiptItem(models.Model):
     receipt = models.ForeignKey(GoodsReceipt, on_delete=models.CASCADE, related_name='items')
@@ -242,6 +349,44 @@ class WarehouseProduct(models.Model):
     @property
     def available_quantity(self):
         return self.quantity - self.reserved_quantity
+
+
+class StockTransfer(models.Model):
+    """Omborlar orasidagi ko'chirish hujjati; har bir qator uchun juft StockMovement yoziladi."""
+    id = models.CharField(max_length=100, primary_key=True)
+    date = models.DateTimeField(auto_now_add=True)
+    fromWarehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name='transfers_out')
+    toWarehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, related_name='transfers_in')
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True)
+    comment = models.CharField(max_length=255, null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.id}: {self.fromWarehouse_id} -> {self.toWarehouse_id}"
+
+
+class StockTransferItem(models.Model):
+    transfer = models.ForeignKey(StockTransfer, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT)
+    quantity = models.FloatField()
+
+
+class StockReservation(models.Model):
+    """
+    Kassada ushlab turilgan savat uchun ombordagi bron (WarehouseProduct.reserved_quantity ga
+    qo'shilgan). Savdo cartId bilan yopilganda yoki muddati o'tganda bo'shatiladi.
+    """
+    cartId = models.CharField(max_length=100, db_index=True)
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.FloatField()
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.cartId}: {self.product_id} x {self.quantity}"
+
+
 class ExpenseType(models.Model):
     id = models.CharField(max_length=100, primary_key=True)
     name = models.CharField(max_length=100, unique=True)
@@ -265,3 +410,233 @@ class Expense(models.Model):
 
     def __str__(self):
         return f"{self.type} - {self.amount}"
+
+
+class DailySalesRollup(models.Model):
+    """
+    Kunlik (mahalliy sana) savdo yig'indilari. Har bir savdo bilan bitta tranzaksiyada
+    yangilanadi; rebuild_rollups buyrug'i Sale jadvalidan qayta hisoblaydi.
+    """
+    date = models.DateField(unique=True)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+class DailyPaymentRollup(models.Model):
+    date = models.DateField()
+    type = models.CharField(max_length=10, choices=SalePayment.PaymentType.choices)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'type')
+
+
+class HourlySalesRollup(models.Model):
+    """
+    Soatlik (UTC soat boshi) savdo yig'indilari: vaqt qatorlari hisobotida kun/hafta/oy
+    bo'laklari shu qatorlardan SQL da qayta guruhlanadi. To'lov turlari alohida ustunlarda
+    (soatiga bitta qator). Savdo bilan bitta tranzaksiyada yangilanadi.
+    """
+    PAYMENT_FIELDS = {
+        SalePayment.PaymentType.CASH: 'cash',
+        SalePayment.PaymentType.CARD: 'card',
+        SalePayment.PaymentType.TRANSFER: 'transfer',
+        SalePayment.PaymentType.DEBT: 'debt',
+    }
+
+    hour = models.DateTimeField(unique=True)
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    card = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transfer = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debt = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+class HourlySellerSalesRollup(models.Model):
+    """
+    HourlySalesRollup ning sotuvchi bo'yicha bo'linmasi: seller_id filtrli vaqt qatorlari ham
+    Sale jadvalini skanlamaydi. Sotuvchisiz savdolar bu yerga tushmaydi; xodim o'chirilsa uning
+    savdolarida seller NULL bo'ladi, shuning uchun qatorlari ham o'chiriladi (CASCADE).
+    """
+    PAYMENT_FIELDS = HourlySalesRollup.PAYMENT_FIELDS
+
+    seller = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='+')
+    hour = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    card = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transfer = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debt = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('seller', 'hour')
+
+
+class Shift(models.Model):
+    """
+    Kassir smenasi. Ochiq smena davomida xodimning savdolari hisoblagichlarga (soni, jami,
+    chegirma, to'lov turlari) savdo bilan bitta tranzaksiyada qo'shiladi, shuning uchun
+    Z-hisobot Sale va SalePayment jadvallarini skanlamaydi. Xodimda bir vaqtda bitta ochiq smena.
+    """
+    PAYMENT_FIELDS = HourlySalesRollup.PAYMENT_FIELDS
+
+    id = models.CharField(max_length=100, primary_key=True)
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, related_name='shifts')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.PROTECT, null=True, blank=True, related_name='shifts')
+    openedAt = models.DateTimeField(default=timezone.now)
+    closedAt = models.DateTimeField(null=True, blank=True)
+    openingCash = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Yopishda kassada sanalgan naqd pul
+    closingCash = models.DecimalField(max_digits=14, decimal_places=2, null=True, blank=True)
+    salesCount = models.PositiveIntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    discount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cash = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    card = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    transfer = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debt = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee'], condition=models.Q(closedAt__isnull=True),
+                                    name='shift_one_open_per_employee'),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'openedAt'], name='shift_employee_opened_idx'),
+            models.Index(fields=['openedAt'], name='shift_opened_idx'),
+        ]
+
+
+class DailyProductSales(models.Model):
+    """
+    Mahsulot bo'yicha kunlik savdo faktlari: miqdor, tushum (qator narxi * miqdor, savdo
+    chegirmasisiz) va tannarx (unitCost * miqdor). Savdo bilan bitta tranzaksiyada yangilanadi.
+    """
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.FloatField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+
+    class Meta:
+        unique_together = ('date', 'product')
+
+
+class DailyExpenseRollup(models.Model):
+    date = models.DateField()
+    # NULL unique cheklovda takrorlanishi mumkin, shuning uchun turi yo'q xarajatlar '' bilan
+    expenseTypeId = models.CharField(max_length=100, blank=True, default='')
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'expenseTypeId')
+
+
+class ChangeLog(models.Model):
+    """
+    /api/data/initial/?since=<cursor> uchun o'zgarishlar jurnali. Har bir yozuvning id'si
+    kursor vazifasini bajaradi; o'chirilgan obyektlar DELETE (tombstone) sifatida qoladi.
+    id yozish paytida beriladi, commit esa kechroq bo'lishi mumkin (Postgres): kichik id'li yozuv
+    kattaroq id'lilardan keyin ko'rinadi. Shuning uchun mijozga beriladigan kursor CHANGELOG_SAFETY_WINDOW
+    soniyadan eski yozuvlargacha suriladi, oxirgi oynadagi yozuvlar keyingi so'rovda qayta o'qiladi.
+    Eski yozuvlar prune_changelog buyrug'i bilan o'chiriladi.
+    """
+    class Action(models.TextChoices):
+        UPSERT = 'upsert', 'Upsert'
+        DELETE = 'delete', 'Delete'
+
+    model_name = models.CharField(max_length=50)
+    object_id = models.CharField(max_length=100)
+    action = models.CharField(max_length=10, choices=Action.choices, default=Action.UPSERT)
+    date = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def record(cls, model, object_ids, action=Action.UPSERT):
+        # bulk_create / queryset.update() signal yubormaydi, shuning uchun ular buni chaqiradi
+        cls.objects.bulk_create([
+            cls(model_name=model._meta.model_name, object_id=str(object_id), action=action)
+            for object_id in object_ids
+        ])
+
+    @classmethod
+    def current_cursor(cls):
+        return cls.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    @classmethod
+    def settled_before(cls):
+        """Shu vaqtdan oldin yozilgan yozuvlarning tranzaksiyasi tugagan deb hisoblanadi."""
+        return timezone.now() - timedelta(seconds=getattr(settings, 'CHANGELOG_SAFETY_WINDOW', 60))
+
+    @classmethod
+    def safe_cursor(cls):
+        """Xavfsizlik oynasidan eski eng katta id: undan kichik yozuvlarning hammasi commit bo'lgan."""
+        return cls.objects.filter(date__lte=cls.settled_before()).order_by('-id').values_list('id', flat=True).first() or 0
+
+    @classmethod
+    def is_expired(cls, cursor):
+        """(cursor, eng eski yozuv) orasidagi yozuvlar o'chirilgan: mijoz to'liq ma'lumotni qayta olishi kerak."""
+        oldest = cls.objects.order_by('id').values_list('id', flat=True).first()
+        return oldest is not None and cursor < oldest - 1
+
+    @classmethod
+    def prune(cls, older_than):
+        """
+        older_than dan eski yozuvlarni o'chiradi. Jurnal boshidan uzluksiz qism o'chiriladi (is_expired
+        shunga tayanadi), eng oxirgi yozuv kursor uchun doim qoladi.
+        """
+        boundary = cls.objects.filter(date__lt=older_than).order_by('-id').values_list('id', flat=True).first()
+        if boundary is None:
+            return 0
+        deleted, _ = cls.objects.filter(id__lte=boundary, id__lt=cls.current_cursor()).delete()
+        return deleted
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency-Key sarlavhasi bilan kelgan yaratish so'rovining natijasi. Bir xil kalit
+    bilan takroriy so'rov saqlangan javobni oladi; response_status bo'sh bo'lsa so'rov
+    hali bajarilmoqda. Muddati o'tgan yozuvlar keyingi so'rovlarda o'chiriladi.
+    """
+    key = models.CharField(max_length=255)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='idempotency_keys')
+    path = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('employee', 'key')
+
+    def __str__(self):
+        return f"{self.key} ({self.path})"
+
+
+class StockSnapshot(models.Model):
+    """
+    date vaqtidagi qoldiqlar (date dan oldingi barcha harakatlar hisobga olingan).
+    build_stock_snapshots buyrug'i bilan kunlik quriladi; nolga teng qoldiqlar saqlanmaydi.
+    """
+    date = models.DateTimeField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Snapshot {self.date}"
+
+
+class StockSnapshotBalance(models.Model):
+    snapshot = models.ForeignKey(StockSnapshot, on_delete=models.CASCADE, related_name='balances')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # None - mahsulotning umumiy qoldig'i (Product.stock), aks holda ombordagi qoldiq
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, null=True, blank=True)
+    quantity = models.FloatField()
+
+    class Meta:
+        unique_together = ('snapshot', 'product', 'warehouse')
@@ -0,0 +1,79 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    (date, id) bo'yicha kamayish tartibidagi keyset (cursor) pagination. OFFSET ishlatilmaydi:
+    keyingi sahifa oxirgi qatordan keyingi yozuvlardan boshlanadi, shuning uchun 1- va
+    10 000- sahifa bir xil tezlikda o'qiladi.
+
+    Avval faqat kalitlar (date, id) indeks bo'yicha o'qiladi, so'ng sahifadagi qatorlar
+    pk bo'yicha yuklanadi: og'ir JOIN va serializatsiya faqat sahifa hajmidagi qatorlarga qilinadi.
+    """
+    date_field = 'date'
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        position = self.decode_cursor(request)
+        if position is not None:
+            date, pk = position
+            # date <= d sharti alohida: indeks bo'yicha diapazon qidiruvi (OR bilan butun indeks skanlanadi)
+            queryset = queryset.filter(
+                Q(**{f'{self.date_field}__lte': date}),
+                Q(**{f'{self.date_field}__lt': date}) | Q(pk__lt=pk),
+            )
+        ordering = (f'-{self.date_field}', '-pk')
+        keys = list(queryset.order_by(*ordering).values_list(self.date_field, 'pk')[:self.limit + 1])
+        self.next_position = keys[self.limit - 1] if len(keys) > self.limit else None
+        page_ids = [pk for _, pk in keys[:self.limit]]
+        return queryset.model._default_manager.filter(pk__in=page_ids).order_by(*ordering)
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(limit, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            date, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            date = parse_datetime(date)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return date, pk
+
+    def encode_cursor(self, position):
+        date, pk = position
+        return base64.urlsafe_b64encode(json.dumps([date.isoformat(), pk]).encode()).decode()
+
+    def get_next_cursor(self):
+        return self.encode_cursor(self.next_position) if self.next_position is not None else None
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data, **extra):
+        return Response({'next': self.get_next_link(), 'cursor': self.get_next_cursor(), 'results': data, **extra})
@@ -1,5 +1,12 @@
+import logging
+
 from rest_framework import permissions
 
+from . import role_cache
+from .models import Role
+
+logger = logging.getLogger(__name__)
+
 
 class HasPermission(permissions.BasePermission):
     """
@@ -20,8 +27,21 @@ class HasPermission(permissions.BasePermission):
             # Ruxsatni rad etamiz.
             return False
 
-            # Foydalanuvchi rolida kerakli ruxsat borligini tekshirish
-        if not hasattr(request.user, 'role') or not request.user.role:
+        return has_permission(request.user, required_permission)
+
+
+def has_permission(user, permission):
+    # Foydalanuvchi rolida kerakli ruxsat borligini tekshirish (bazaga so'rovsiz)
+    bit = Role.permission_bit(permission)
+    if not bit:
+        # Xato yozilgan ruxsat nomi: rad etiladi (500 emas), lekin logda ko'rinadi
+        logger.warning("Noma'lum ruxsat tekshirildi: %r", permission)
+        return False
+    mask = getattr(user, 'permission_mask', None)
+    if mask is None:
+        role_id = getattr(user, 'role_id', None)
+        if not role_id:
             return False
+        mask = role_cache.role_mask(role_id)
 
-        return required_permission in request.user.role.permissions
\ No newline at end of file
+    return bool(mask & bit)
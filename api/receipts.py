@@ -0,0 +1,91 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.functions import Cast, Greatest
+from django.utils import timezone
+import shortuuid
+
+from .models import GoodsReceipt, GoodsReceiptItem, Product, StockMovement, ChangeLog
+from .stock import STOCK_UPDATE_CHUNK_SIZE, group_by_quantity, increment_warehouse_stock
+
+
+def values_case(keys, values, output_field):
+    """Har bir pk uchun values[pk]; bir xil qiymatli qatorlar bitta When(pk__in=...) bo'ladi."""
+    return Case(*[
+        When(pk__in=group, then=Value(value)) for value, group in group_by_quantity(keys, values).items()
+    ], output_field=output_field)
+
+
+def receive_product_stock(quantities, costs, prices):
+    """
+    Product.stock ni quantities bo'yicha oshiradi va averageCost ni yangilaydi:
+    (averageCost * qoldiq + costs) / (qoldiq + quantities), manfiy qoldiq nol deb olinadi.
+    UPDATE dagi ifodalar eski qiymatlarni o'qiydi, shuning uchun hammasi bitta so'rovda.
+    purchasePrice prices (oxirgi kirim narxi) bilan almashtiriladi.
+    """
+    product_ids = list(quantities)
+    now = timezone.now()
+    cost_field = Product._meta.get_field('averageCost')
+    # Pul hisobi Decimal da: FloatField orqali o'tsa har kirimda tannarx aniqligi yo'qoladi.
+    # Bo'luvchi aniqligi natija maydonidan kengroq, oxirida averageCost ga yaxlitlanadi.
+    money = DecimalField(max_digits=cost_field.max_digits + 16, decimal_places=cost_field.decimal_places + 8)
+    on_hand = Greatest(Cast('stock', money), Value(Decimal(0), output_field=money))
+    received = {product_id: Decimal(str(quantity)) for product_id, quantity in quantities.items()}
+    costs = {product_id: Decimal(cost) for product_id, cost in costs.items()}
+    for start in range(0, len(product_ids), STOCK_UPDATE_CHUNK_SIZE):
+        chunk = product_ids[start:start + STOCK_UPDATE_CHUNK_SIZE]
+        average = ExpressionWrapper(
+            (Cast('averageCost', money) * on_hand + values_case(chunk, costs, money))
+            / (on_hand + values_case(chunk, received, money)),
+            output_field=money,
+        )
+        Product.objects.filter(pk__in=chunk).update(
+            stock=F('stock') + values_case(chunk, quantities, FloatField()),
+            averageCost=Cast(average, DecimalField(max_digits=cost_field.max_digits, decimal_places=cost_field.decimal_places)),
+            purchasePrice=values_case(chunk, prices, Product._meta.get_field('purchasePrice')),
+            updated_at=now,
+        )
+    # queryset.update() signal yubormaydi
+    ChangeLog.record(Product, product_ids)
+
+
+def create_goods_receipt(validated_data):
+    """
+    GoodsReceiptSerializer tekshirgan kirimni saqlaydi: qatorlar va harakatlar bulk_create bilan,
+    Product (va omborda WarehouseProduct) qoldig'i set-based UPDATE bilan yoziladi, shuning uchun
+    so'rovlar soni qatorlar soniga bog'liq emas. transaction.atomic() ichida chaqirilishi kerak.
+    """
+    data = dict(validated_data)
+    items_data = data.pop('items')
+    receipt = GoodsReceipt.objects.create(id=f"rcpt_{shortuuid.random(length=12)}", **data)
+
+    items = []
+    movements = []
+    quantities = defaultdict(float)
+    costs = defaultdict(Decimal)
+    prices = {}
+    comment = f"Omborga kirim: {receipt.docNumber or receipt.id}"
+    for item_data in items_data:
+        product_id = item_data['product'].pk
+        items.append(GoodsReceiptItem(receipt=receipt, **item_data))
+        movements.append(StockMovement(
+            product_id=product_id,
+            warehouse_id=receipt.warehouse_id,
+            quantity=item_data['quantity'],
+            type=StockMovement.MovementType.KIRIM,
+            relatedId=receipt.id,
+            comment=comment,
+        ))
+        quantities[product_id] += item_data['quantity']
+        costs[product_id] += item_data['purchasePrice'] * Decimal(str(item_data['quantity']))
+        prices[product_id] = item_data['purchasePrice']
+
+    receive_product_stock(quantities, costs, prices)
+    if receipt.warehouse_id is not None:
+        # Ombordagi qoldiq ham kirim harakatlari bilan mos bo'lishi kerak (stock_as_of)
+        increment_warehouse_stock(receipt.warehouse_id, quantities)
+    GoodsReceiptItem.objects.bulk_create(items, batch_size=1000)
+    StockMovement.objects.bulk_create(movements, batch_size=1000)
+    ChangeLog.record(StockMovement, [movement.pk for movement in movements])
+    return receipt
@@ -0,0 +1,77 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Har bir jarayon (worker) uchun rollar va xodimlar holatining xotiradagi nusxasi.
+# Nusxa umumiy keshdagi (CACHES['default']) versiya kaliti bilan belgilanadi: Role yoki Employee
+# o'zgargan tranzaksiya commit bo'lganda signals.py versiyani almashtiradi va boshqa worker'lar
+# keyingi so'rovdayoq qayta yuklaydi (bazaga emas, keshga bitta murojaat). Bir necha worker
+# bo'lsa CACHES umumiy (Redis, Memcached) bo'lishi kerak; ROLE_CACHE_TTL - zaxira chegara.
+VERSION_KEY = 'api.role_cache.version'
+_lock = threading.Lock()
+_snapshot = None
+
+
+class _Snapshot:
+    def __init__(self, role_masks, employees, version):
+        self.role_masks = role_masks
+        self.employees = employees
+        self.version = version
+        self.loaded_at = time.monotonic()
+
+    def is_fresh(self, version):
+        return self.version == version and time.monotonic() - self.loaded_at < getattr(settings, 'ROLE_CACHE_TTL', 60)
+
+
+def _load(version):
+    from .models import Role, Employee
+
+    role_masks = {role.id: role.permission_mask for role in Role.objects.only('id', 'permissions')}
+    employees = {
+        employee_id: (role_id, is_active)
+        for employee_id, role_id, is_active in Employee.objects.values_list('id', 'role_id', 'is_active')
+    }
+    return _Snapshot(role_masks, employees, version)
+
+
+def _get_snapshot():
+    global _snapshot
+    # Versiya bazadan o'qishdan oldin olinadi: orada commit bo'lsa keyingi so'rov yana yuklaydi
+    version = cache.get(VERSION_KEY)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_fresh(version):
+        return snapshot
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.is_fresh(version):
+            return snapshot
+        _snapshot = _load(version)
+        return _snapshot
+
+
+def role_mask(role_id):
+    if role_id is None:
+        return 0
+    return _get_snapshot().role_masks.get(role_id, 0)
+
+
+def employee_state(employee_id):
+    """(role_id, is_active) yoki xodim topilmasa None."""
+    return _get_snapshot().employees.get(employee_id)
+
+
+def invalidate(**kwargs):
+    """Faqat shu jarayondagi nusxani tozalaydi."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def publish_change():
+    """Commit'dan keyin chaqiriladi: umumiy versiya almashadi, barcha worker'lar nusxani qayta yuklaydi."""
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    invalidate()
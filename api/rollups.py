@@ -0,0 +1,223 @@
+"""
+Kunlik va soatlik yig'indi jadvallari (Daily*Rollup, DailyProductSales, Hourly*Rollup).
+Savdo va xarajat yozilgan tranzaksiyaning o'zida oshiriladi/kamaytiriladi, shuning uchun
+dashboard butun tarixni emas, kunlik qatorlarni o'qiydi. Kun - mahalliy sana (TIME_ZONE).
+"""
+from collections import defaultdict
+from datetime import datetime, time, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncHour
+from django.utils import timezone
+
+from .models import (
+    Sale, CartItem, SalePayment, Expense, DailySalesRollup, DailyProductSales, DailyPaymentRollup, DailyExpenseRollup,
+    HourlySalesRollup, HourlySellerSalesRollup,
+)
+from .stock import STOCK_UPDATE_CHUNK_SIZE, group_by_quantity
+
+
+def local_day(moment):
+    return timezone.localdate(moment)
+
+
+def utc_hour(moment):
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def add_to_rollup(model, key_fields, deltas):
+    """
+    deltas: {(kalit qiymatlari): {maydon: o'zgarish}}. Yo'q qatorlar bitta bulk_create
+    (ignore_conflicts) bilan yaratiladi, so'ng F() bilan atomar oshiriladi: oxirgi kalit maydoni
+    (masalan, mahsulot) bo'yicha CASE, shuning uchun bitta kun uchun bo'lakka bitta UPDATE.
+    """
+    deltas = {key: changes for key, changes in deltas.items() if any(changes.values())}
+    if not deltas:
+        return
+    model.objects.bulk_create([model(**dict(zip(key_fields, key))) for key in deltas],
+                              batch_size=STOCK_UPDATE_CHUNK_SIZE, ignore_conflicts=True)
+    *prefix_fields, case_field = key_fields
+    groups = defaultdict(dict)
+    for key, changes in deltas.items():
+        groups[key[:-1]][key[-1]] = changes
+    fields = {field for changes in deltas.values() for field in changes}
+    for prefix, rows in groups.items():
+        keys = list(rows)
+        for start in range(0, len(keys), STOCK_UPDATE_CHUNK_SIZE):
+            chunk = keys[start:start + STOCK_UPDATE_CHUNK_SIZE]
+            updates = {}
+            for field in fields:
+                values = {key: rows[key].get(field, 0) for key in chunk}
+                updates[field] = F(field) + Case(*[
+                    When(**{f'{case_field}__in': group}, then=Value(value))
+                    for value, group in group_by_quantity(chunk, values).items()
+                ], default=Value(0), output_field=model._meta.get_field(field))
+            model.objects.filter(**dict(zip(prefix_fields, prefix)), **{f'{case_field}__in': chunk}).update(**updates)
+
+
+def record_sales(sales, items, payments, sign=1):
+    """
+    Saqlangan savdolar, savat qatorlari va to'lovlarni kunlik va soatlik yig'indilarga qo'shadi
+    (sign=-1 - o'chirilayotgan savdolar ayiriladi).
+    """
+    days = defaultdict(lambda: {'count': 0, 'total': Decimal(0), 'discount': Decimal(0)})
+    hours = defaultdict(lambda: {'count': 0, 'total': Decimal(0), 'discount': Decimal(0),
+                                 **dict.fromkeys(HourlySalesRollup.PAYMENT_FIELDS.values(), Decimal(0))})
+    seller_hours = defaultdict(hours.default_factory)
+    sale_days = {}
+    sale_hours = {}
+    for sale in sales:
+        day = sale_days[sale.pk] = local_day(sale.date)
+        hour = sale_hours[sale.pk] = utc_hour(sale.date)
+        # Sotuvchi bo'yicha soatlik qator (sotuvchisiz savdo faqat umumiy qatorga)
+        buckets = [days[(day,)], hours[(hour,)]]
+        if sale.seller_id:
+            buckets.append(seller_hours[(sale.seller_id, hour)])
+        for totals in buckets:
+            totals['count'] += 1
+            totals['total'] += Decimal(sale.total)
+            totals['discount'] += Decimal(sale.discount or 0)
+    sellers = {sale.pk: sale.seller_id for sale in sales if sale.seller_id}
+    product_days = defaultdict(lambda: {'quantity': 0.0, 'revenue': Decimal(0), 'cost': Decimal(0)})
+    for item in items:
+        facts = product_days[(sale_days[item.sale_id], item.product_id)]
+        facts['quantity'] += item.quantity
+        facts['revenue'] += Decimal(item.price) * Decimal(str(item.quantity))
+        facts['cost'] += Decimal(item.unitCost) * Decimal(str(item.quantity))
+    payment_days = defaultdict(lambda: {'amount': Decimal(0)})
+    for payment in payments:
+        payment_days[(sale_days[payment.sale_id], payment.type)]['amount'] += Decimal(payment.amount)
+        field = HourlySalesRollup.PAYMENT_FIELDS[payment.type]
+        hours[(sale_hours[payment.sale_id],)][field] += Decimal(payment.amount)
+        if payment.sale_id in sellers:
+            seller_hours[(sellers[payment.sale_id], sale_hours[payment.sale_id])][field] += Decimal(payment.amount)
+    add_to_rollup(DailySalesRollup, ('date',), signed(days, sign))
+    add_to_rollup(HourlySalesRollup, ('hour',), signed(hours, sign))
+    add_to_rollup(HourlySellerSalesRollup, ('seller_id', 'hour'), signed(seller_hours, sign))
+    add_to_rollup(DailyProductSales, ('date', 'product_id'), signed(product_days, sign))
+    add_to_rollup(DailyPaymentRollup, ('date', 'type'), signed(payment_days, sign))
+
+
+def signed(deltas, sign):
+    if sign == 1:
+        return deltas
+    return {key: {field: sign * value for field, value in changes.items()} for key, changes in deltas.items()}
+
+
+def record_expense(date, type_id, amount, sign=1):
+    """Xarajatni kunlik yig'indiga qo'shadi (sign=-1 - o'chirilgan yoki o'zgartirilgan xarajatning eski qiymati)."""
+    add_to_rollup(DailyExpenseRollup, ('date', 'expenseTypeId'), {
+        (local_day(date), type_id or ''): {'count': sign, 'amount': sign * Decimal(amount)},
+    })
+
+
+def line_amount(price_field):
+    return ExpressionWrapper(F(price_field) * F('quantity'), output_field=DecimalField(max_digits=16, decimal_places=4))
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+# Quyidagi qurilish funksiyalari rebuild_rollups uchun. Ma'lumot migratsiyalarida (0018-0020, 0023)
+# ularning o'sha vaqtdagi nusxalari bor: bu yerdagi o'zgarish tarixiy migratsiyalarga ta'sir qilmaydi.
+
+def daily_sales_rollups(model, sales):
+    tz = timezone.get_current_timezone()
+    return [
+        model(date=row['day'], count=row['count'], total=row['total'] or 0, discount=row['discount'] or 0)
+        for row in sales.annotate(day=TruncDate('date', tzinfo=tz)).values('day')
+        .annotate(count=Count('pk'), total=Sum('total'), discount=Sum('discount')).order_by()
+    ]
+
+
+def daily_product_sales(model, items):
+    tz = timezone.get_current_timezone()
+    return [
+        model(date=row['day'], product_id=row['product_id'], quantity=row['sold'],
+              revenue=row['revenue'] or 0, cost=row['cost'] or 0)
+        for row in items.annotate(day=TruncDate('sale__date', tzinfo=tz)).values('day', 'product_id')
+        .annotate(sold=Sum('quantity'), revenue=Sum(line_amount('price')), cost=Sum(line_amount('unitCost'))).order_by()
+    ]
+
+
+def daily_payment_rollups(model, payments):
+    tz = timezone.get_current_timezone()
+    return [
+        model(date=row['day'], type=row['type'], amount=row['amount'] or 0)
+        for row in payments.annotate(day=TruncDate('sale__date', tzinfo=tz)).values('day', 'type')
+        .annotate(amount=Sum('amount')).order_by()
+    ]
+
+
+def daily_expense_rollups(model, expenses):
+    tz = timezone.get_current_timezone()
+    return [
+        model(date=row['day'], expenseTypeId=row['type_id'] or '', count=row['count'], amount=row['amount'] or 0)
+        for row in expenses.annotate(day=TruncDate('date', tzinfo=tz)).values('day', 'type_id')
+        .annotate(count=Count('pk'), amount=Sum('amount')).order_by()
+    ]
+
+
+def hourly_rollups(model, sales, payments, by_seller=False):
+    """
+    Savdo va to'lovlar querysetlaridan (UTC soat bo'yicha SQL da guruhlangan) soatlik qatorlar;
+    by_seller=True bilan sotuvchi bo'yicha (HourlySellerSalesRollup), sotuvchisiz savdolarsiz.
+    """
+    keys = ('seller_id',) if by_seller else ()
+    if by_seller:
+        sales = sales.filter(seller__isnull=False)
+        payments = payments.filter(sale__seller__isnull=False)
+    hours = {
+        (*[row[key] for key in keys], row['bucket']): model(
+            hour=row['bucket'], count=row['count'], total=row['total'] or 0, discount=row['discount'] or 0,
+            **{key: row[key] for key in keys},
+        )
+        for row in sales.annotate(bucket=TruncHour('date', tzinfo=dt_timezone.utc)).values('bucket', *keys)
+        .annotate(count=Count('pk'), total=Sum('total'), discount=Sum('discount')).order_by()
+    }
+    payment_sums = {field: Sum('amount', filter=Q(type=payment_type))
+                    for payment_type, field in HourlySalesRollup.PAYMENT_FIELDS.items()}
+    for row in payments.annotate(bucket=TruncHour('sale__date', tzinfo=dt_timezone.utc))\
+            .values('bucket', *[f'sale__{key}' for key in keys]).annotate(**payment_sums).order_by():
+        rollup = hours[(*[row[f'sale__{key}'] for key in keys], row['bucket'])]
+        for field in payment_sums:
+            setattr(rollup, field, row[field] or 0)
+    return list(hours.values())
+
+
+def rebuild_rollups(since=None):
+    """
+    since (sana) dan boshlab (berilmasa - butun tarix) yig'indilarni o'chirib, Sale, SalePayment
+    va Expense jadvallaridan qayta hisoblaydi. Yaratilgan qatorlar soni qaytariladi.
+    """
+    sales = Sale.objects.all()
+    items = CartItem.objects.all()
+    payments = SalePayment.objects.all()
+    expenses = Expense.objects.all()
+    daily = [DailySalesRollup, DailyProductSales, DailyPaymentRollup, DailyExpenseRollup]
+    with transaction.atomic():
+        if since is not None:
+            start = day_start(since)
+            sales = sales.filter(date__gte=start)
+            items = items.filter(sale__date__gte=start)
+            payments = payments.filter(sale__date__gte=start)
+            expenses = expenses.filter(date__gte=start)
+            for model in daily:
+                model.objects.filter(date__gte=since).delete()
+            for model in (HourlySalesRollup, HourlySellerSalesRollup):
+                model.objects.filter(hour__gte=utc_hour(start)).delete()
+        else:
+            for model in daily + [HourlySalesRollup, HourlySellerSalesRollup]:
+                model.objects.all().delete()
+
+        created = DailySalesRollup.objects.bulk_create(daily_sales_rollups(DailySalesRollup, sales), batch_size=500)
+        created += DailyProductSales.objects.bulk_create(daily_product_sales(DailyProductSales, items), batch_size=500)
+        created += DailyPaymentRollup.objects.bulk_create(daily_payment_rollups(DailyPaymentRollup, payments), batch_size=500)
+        created += HourlySalesRollup.objects.bulk_create(hourly_rollups(HourlySalesRollup, sales, payments), batch_size=500)
+        created += HourlySellerSalesRollup.objects.bulk_create(
+            hourly_rollups(HourlySellerSalesRollup, sales, payments, by_seller=True), batch_size=500)
+        created += DailyExpenseRollup.objects.bulk_create(daily_expense_rollups(DailyExpenseRollup, expenses), batch_size=500)
+    return len(created)
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from django.db.models import Q
+import shortuuid
+
+from .debts import post_debt_entries
+from .models import Product, Sale, CartItem, SalePayment, StockMovement, StockReservation, DebtLedgerEntry, ChangeLog
+from .rollups import record_sales
+from .shifts import open_shifts, record_shift_sales, sale_shift
+from .stock import STOCK_UPDATE_CHUNK_SIZE, decrement_stock, decrement_warehouse_stock, release_reservations
+
+
+def create_sales(validated_sales):
+    """
+    SaleSerializer tekshirgan savdolarni saqlaydi: savdolar, savat qatorlari, harakatlar va
+    to'lovlar bulk_create bilan, qoldiq va qarzlar esa butun to'plam uchun jamlangan holda
+    yangilanadi (kunlik yig'indilar va smena hisoblagichlari ham), shuning uchun so'rovlar soni
+    savdolar va qatorlar soniga bog'liq emas.
+    transaction.atomic() ichida chaqirilishi kerak; qoldiq yetmasa InsufficientStock ko'tariladi.
+    Savatdagi Product obyektlarining stock qiymati UPDATE dan keyingi qiymat bilan yangilanadi (chek uchun).
+    """
+    sales = []
+    items = []
+    movements = []
+    payments = []
+    quantities = defaultdict(float)
+    warehouse_quantities = defaultdict(lambda: defaultdict(float))
+    carts = Q()
+    products = {}
+    debt_entries = []
+    shifts = open_shifts({data['seller'].pk for data in validated_sales if data.get('seller')})
+    for data in validated_sales:
+        data = dict(data)
+        items_data = data.pop('items')
+        payments_data = data.pop('payments')
+        cart_id = data.pop('cartId', None)
+        if cart_id:
+            # Faqat sotuvchining o'z bronlari yopiladi
+            carts |= Q(cartId=cart_id, employee=data.get('seller'))
+        sale = Sale(id=f"sale_{shortuuid.random(length=12)}", **data)
+        sale.shift_id = sale_shift(shifts, sale)
+        sales.append(sale)
+        for item_data in items_data:
+            items.append(CartItem(sale=sale, unitCost=item_data['product'].averageCost, **item_data))
+            movements.append(StockMovement(
+                product=item_data['product'],
+                warehouse_id=sale.warehouse_id,
+                quantity=item_data['quantity'],
+                type=StockMovement.MovementType.SAVDO,
+                relatedId=sale.id,
+                comment=f"Savdo: {sale.id}"
+            ))
+            quantities[item_data['product'].pk] += item_data['quantity']
+            products[item_data['product'].pk] = item_data['product']
+            if sale.warehouse_id:
+                warehouse_quantities[sale.warehouse_id][item_data['product'].pk] += item_data['quantity']
+        for payment_data in payments_data:
+            payments.append(SalePayment(sale=sale, **payment_data))
+        debt_payment = next((p for p in payments_data if p['type'] == SalePayment.PaymentType.DEBT), None)
+        if debt_payment and sale.customer_id:
+            debt_entries.append(DebtLedgerEntry(
+                customer_id=sale.customer_id, date=sale.date, amount=debt_payment['amount'],
+                kind=DebtLedgerEntry.Kind.SALE, relatedId=sale.id,
+            ))
+
+    Sale.objects.bulk_create(sales)
+    ChangeLog.record(Sale, [sale.pk for sale in sales])
+    # Savat uchun qilingan bronlar avval bo'shatiladi, so'ng tovar bron qilinmagan qoldiqdan olinadi
+    if carts:
+        release_reservations(StockReservation.objects.filter(carts))
+    # Qoldiq shartli UPDATE bilan kamaytiriladi: parallel savdolar manfiy qoldiq qila olmaydi.
+    # Product.stock umumiy qoldiq (omborlarga biriktirilmagani ham), shuning uchun har bir savdo uni
+    # kamaytiradi; omborsiz savdolar (frontend'ning odatiy so'rovi) faqat shundan oladi.
+    for warehouse_id, warehouse_items in warehouse_quantities.items():
+        decrement_warehouse_stock(warehouse_id, warehouse_items)
+    decrement_stock(quantities)
+    CartItem.objects.bulk_create(items)
+    StockMovement.objects.bulk_create(movements)
+    ChangeLog.record(StockMovement, [movement.pk for movement in movements])
+    SalePayment.objects.bulk_create(payments)
+    record_sales(sales, items, payments)
+    record_shift_sales(sales, payments)
+    post_debt_entries(debt_entries)
+    # Chek uchun qoldiq UPDATE dan keyin qayta o'qiladi: qatorlar tranzaksiya oxirigacha qulflangan,
+    # shuning uchun bu aynan shu savdodan keyingi qiymat (parallel savdolar hisobga olingan)
+    product_ids = list(products)
+    for start in range(0, len(product_ids), STOCK_UPDATE_CHUNK_SIZE * 2):
+        for product_id, stock in Product.objects.filter(pk__in=product_ids[start:start + STOCK_UPDATE_CHUNK_SIZE * 2])\
+                .values_list('id', 'stock'):
+            products[product_id].stock = stock
+    return sales
@@ -1,6 +1,18 @@
+from collections import defaultdict
+from datetime import timedelta
+
 from rest_framework import serializers
+from django.conf import settings
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
 from .models import *
+from .debts import post_debt_entries
+from .sales import create_sales
+from .shifts import shift_payments
+from .transfers import create_transfer
+from .receipts import create_goods_receipt
+from .stock import InsufficientStock, record_warehouse_changes, release_reservations, reserve_warehouse_stock
 import shortuuid
 
 
@@ -10,6 +22,14 @@ class RoleSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['id']
 
+    def validate_permissions(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Ruxsatlar ro'yxat bo'lishi kerak.")
+        unknown = [permission for permission in value if permission not in Role.Permission.values]
+        if unknown:
+            raise serializers.ValidationError(f"Noma'lum ruxsatlar: {', '.join(map(str, unknown))}")
+        return value
+
     def create(self, validated_data):
         validated_data['id'] = f"role_{shortuuid.random(length=8)}"
         return super().create(validated_data)
@@ -79,7 +99,7 @@ class ProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'averageCost', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         validated_data['id'] = f"prod_{shortuuid.random(length=10)}"
@@ -102,14 +122,27 @@ class WarehouseProductSerializer(serializers.ModelSerializer):
     class Meta:
         model = WarehouseProduct
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        # reserved_quantity faqat bronlar orqali o'zgaradi
+        read_only_fields = ['id', 'reserved_quantity', 'created_at', 'updated_at']
 
     def create(self, validated_data):
         validated_data['id'] = f"wh_prod_{shortuuid.random(length=10)}"
-        return super().create(validated_data)
-
-
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            record_warehouse_changes({(instance.product_id, instance.warehouse_id): instance.quantity})
+        return instance
 
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            previous = (instance.product_id, instance.warehouse_id)
+            previous_quantity = instance.quantity
+            instance = super().update(instance, validated_data)
+            # Product.stock qayta hisoblanmaydi: faqat qatorning o'zgarishi (yangi - eski) qo'shiladi
+            changes = defaultdict(float)
+            changes[previous] -= previous_quantity
+            changes[(instance.product_id, instance.warehouse_id)] += instance.quantity
+            record_warehouse_changes(changes)
+        return instance
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -120,7 +153,30 @@ class CustomerSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data['id'] = f"cust_{shortuuid.random(length=8)}"
-        return super().create(validated_data)
+        with transaction.atomic():
+            customer = super().create(validated_data)
+            # Boshlang'ich qarz daftarga tuzatish sifatida yoziladi (Customer.debt allaqachon o'rnatilgan)
+            if customer.debt:
+                DebtLedgerEntry.objects.create(customer=customer, amount=customer.debt,
+                                               kind=DebtLedgerEntry.Kind.ADJUSTMENT)
+        return customer
+
+    def update(self, instance, validated_data):
+        # Qarz to'g'ridan-to'g'ri yozilmaydi: save() eski debt ni qaytarib yozmasligi uchun update_fields
+        # dan chiqariladi, farq esa qulflangan joriy qiymatga nisbatan tuzatish yozuvi va atomar UPDATE bo'ladi
+        debt = validated_data.pop('debt', None)
+        with transaction.atomic():
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+            if validated_data:
+                instance.save(update_fields=list(validated_data))
+            if debt is not None:
+                current = Customer.objects.select_for_update().values_list('debt', flat=True).get(pk=instance.pk)
+                if debt != current:
+                    post_debt_entries([DebtLedgerEntry(customer=instance, amount=debt - current,
+                                                       kind=DebtLedgerEntry.Kind.ADJUSTMENT)])
+            instance.refresh_from_db(fields=['debt'])
+        return instance
 
 
 class SupplierSerializer(serializers.ModelSerializer):
@@ -134,8 +190,31 @@ class SupplierSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Ota serializer context[cache_key] ga in_bulk() bilan oldindan yuklagan obyektlardan
+    foydalanadi, shuning uchun har bir element uchun alohida so'rov bo'lmaydi.
+    """
+
+    def __init__(self, cache_key, **kwargs):
+        self.cache_key = cache_key
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        cache = self.context.get(self.cache_key)
+        if cache is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = cache.get(str(data))
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
 class CartItemSerializer(serializers.ModelSerializer):
-    productId = serializers.PrimaryKeyRelatedField(
+    productId = PrefetchedPrimaryKeyRelatedField(
+        cache_key='sale_products',
         queryset=Product.objects.all(),
         source='product'
     )
@@ -152,84 +231,230 @@ class SalePaymentSerializer(serializers.ModelSerializer):
         fields = ['type', 'amount']
 
 
+def insufficient_stock_message(error, products):
+    product = products.get(error.product_id)
+    name = product.name if product is not None else error.product_id
+    where = f"'{error.warehouse_id}' omborida" if error.warehouse_id else "omborda"
+    return (f"'{name}' mahsuloti uchun {where} yetarli qoldiq yo'q. "
+            f"Mavjud: {error.available}, So'ralyapti: {error.requested}")
+
+
 class SaleSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True)
     payments = SalePaymentSerializer(many=True)
     seller = EmployeeSerializer(read_only=True)
     customer = CustomerSerializer(read_only=True)
 
-    customerId = serializers.PrimaryKeyRelatedField(
+    customerId = PrefetchedPrimaryKeyRelatedField(
+        cache_key='sale_customers',
         queryset=Customer.objects.all(),
         source='customer',
         write_only=True,
         required=False,
         allow_null=True
     )
+    warehouseId = PrefetchedPrimaryKeyRelatedField(
+        cache_key='sale_warehouses',
+        queryset=Warehouse.objects.all(),
+        source='warehouse',
+        write_only=True,
+        required=False,
+        allow_null=True
+    )
+    # Savat uchun qilingan bron (StockReservation.cartId) savdo bilan birga yopiladi
+    cartId = serializers.CharField(max_length=100, write_only=True, required=False)
 
     class Meta:
         model = Sale
         fields = ['id', 'date', 'items', 'subtotal', 'discount', 'total', 'payments', 'customerId', 'customer',
-                  'seller']
+                  'seller', 'warehouseId', 'cartId']
         read_only_fields = ['id', 'date', 'seller', 'customer']
 
+    def to_internal_value(self, data):
+        # Savatdagi barcha mahsulotlar bitta so'rovda yuklanadi (PrefetchedPrimaryKeyRelatedField).
+        # Paket sinxronizatsiyada context butun paket uchun oldindan to'ldirilgan bo'ladi.
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list) and 'sale_products' not in self.context:
+            self.context['sale_products'] = Product.objects.in_bulk(sale_product_ids([data]))
+        return super().to_internal_value(data)
+
     # ========= BU METOD O'ZGARDI =========
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        payments_data = validated_data.pop('payments')
-
-        # Savdo yaratishdan oldin mahsulot qoldig'ini tekshirish
-        for item_data in items_data:
-            product = item_data['product']
-            if product.stock < item_data['quantity']:
-                raise serializers.ValidationError(
-                    f"'{product.name}' mahsuloti uchun omborda yetarli qoldiq yo'q. "
-                    f"Mavjud: {product.stock}, So'ralyapti: {item_data['quantity']}"
-                )
-
         with transaction.atomic():
-            sale_id = f"sale_{shortuuid.random(length=12)}"
-            sale = Sale.objects.create(id=sale_id, **validated_data)
-
-            for item_data in items_data:
-                CartItem.objects.create(sale=sale, **item_data)
-
-                product = item_data['product']
-                product.stock -= item_data['quantity']
-                product.save()
-                
-                # Create stock movement record for sales
-                StockMovement.objects.create(
-                    product=product,
-                    quantity=item_data['quantity'],
-                    type=StockMovement.MovementType.SAVDO,
-                    relatedId=sale_id,
-                    comment=f"Savdo: {sale_id}"
-                )
-
-            for payment_data in payments_data:
-                SalePayment.objects.create(sale=sale, **payment_data)
-
-            debt_payment = next((p for p in payments_data if p['type'] == 'nasiya'), None)
-            if debt_payment and validated_data.get('customer'):
-                customer = validated_data['customer']
-                customer.debt += debt_payment['amount']
-                customer.save()
-            return sale
+            try:
+                return create_sales([validated_data])[0]
+            except InsufficientStock as e:
+                products = {item['product'].pk: item['product'] for item in validated_data['items']}
+                raise serializers.ValidationError(insufficient_stock_message(e, products))
     # ========= O'ZGARISH TUGADI =========
 
 
+class SaleReceiptSerializer(serializers.Serializer):
+    """
+    POST /api/sales/?response=receipt javobi: chek uchun kerakli ma'lumotlar va savatdagi
+    mahsulotlarning savdodan keyingi qoldig'i. Savdoning o'zi qayta o'qilmaydi, xotiradagi
+    ma'lumotlardan quriladi.
+    """
+    id = serializers.CharField()
+    date = serializers.DateTimeField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    payments = SalePaymentSerializer(many=True)
+    stock = serializers.DictField(child=serializers.FloatField())
+
+    @classmethod
+    def for_sale(cls, sale, validated_data):
+        # validated_data dagi Product obyektlarining qoldig'i create_sales() da UPDATE dan keyin qayta o'qilgan
+        return cls({
+            'id': sale.id,
+            'date': sale.date,
+            'subtotal': sale.subtotal,
+            'discount': sale.discount,
+            'total': sale.total,
+            'payments': validated_data['payments'],
+            'stock': {item['product'].pk: item['product'].stock for item in validated_data['items']},
+        })
+
+
+def sale_product_ids(sales_data):
+    """Xom so'rov ma'lumotlaridagi barcha productId'lar (in_bulk uchun)."""
+    product_ids = set()
+    for data in sales_data:
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            continue
+        for item in items:
+            if isinstance(item, dict) and item.get('productId') is not None:
+                product_ids.add(str(item['productId']))
+    return product_ids
+
+
+class OfflineSaleSerializer(SaleSerializer):
+    """Terminal navbatidagi oflayn savdo: clientId majburiy, date terminaldagi savdo vaqti."""
+    clientId = serializers.CharField(max_length=100)
+    date = serializers.DateTimeField(required=False)
+
+    class Meta(SaleSerializer.Meta):
+        fields = SaleSerializer.Meta.fields + ['clientId']
+        read_only_fields = ['id', 'seller', 'customer']
+
+
+class ReservationItemSerializer(serializers.Serializer):
+    productId = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), source='product')
+    quantity = serializers.FloatField(min_value=0, max_value=1e9)
+
+
+class StockReservationSerializer(serializers.Serializer):
+    """Savat bronini yaratadi yoki almashtiradi: shu cartId dagi oldingi bron bo'shatiladi."""
+    cartId = serializers.CharField(max_length=100)
+    warehouseId = serializers.PrimaryKeyRelatedField(queryset=Warehouse.objects.all(), source='warehouse')
+    items = ReservationItemSerializer(many=True)
+    ttl = serializers.IntegerField(min_value=1, max_value=24 * 60 * 60, required=False)
+
+    def create(self, validated_data):
+        quantities = defaultdict(float)
+        for item in validated_data['items']:
+            if item['quantity'] > 0:
+                quantities[item['product'].pk] += item['quantity']
+        ttl = validated_data.get('ttl') or getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60)
+        warehouse = validated_data['warehouse']
+        expires_at = timezone.now() + timedelta(seconds=ttl)
+        employee = self.context['request'].user
+        with transaction.atomic():
+            reservations = StockReservation.objects.filter(cartId=validated_data['cartId'])
+            if reservations.exclude(employee=employee).exists():
+                raise serializers.ValidationError({'cartId': "Bu savat boshqa xodimga tegishli"})
+            release_reservations(reservations)
+            try:
+                reserve_warehouse_stock(warehouse.pk, quantities)
+            except InsufficientStock as e:
+                products = {item['product'].pk: item['product'] for item in validated_data['items']}
+                raise serializers.ValidationError(insufficient_stock_message(e, products))
+            StockReservation.objects.bulk_create([
+                StockReservation(cartId=validated_data['cartId'], warehouse=warehouse, product_id=product_id,
+                                 quantity=quantity, employee=employee, expires_at=expires_at)
+                for product_id, quantity in quantities.items()
+            ])
+        return {'cartId': validated_data['cartId'], 'warehouseId': warehouse.pk, 'expiresAt': expires_at,
+                'items': [{'productId': product_id, 'quantity': quantity} for product_id, quantity in quantities.items()]}
+
+    def to_representation(self, instance):
+        return {**instance, 'expiresAt': serializers.DateTimeField().to_representation(instance['expiresAt'])}
+
+
+class StockTransferItemSerializer(serializers.ModelSerializer):
+    productId = PrefetchedPrimaryKeyRelatedField(
+        cache_key='transfer_products',
+        queryset=Product.objects.all(),
+        source='product'
+    )
+    quantity = serializers.FloatField(min_value=0, max_value=1e9)
+
+    class Meta:
+        model = StockTransferItem
+        fields = ['productId', 'quantity']
+
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Miqdor musbat bo'lishi kerak")
+        return value
+
+
+class StockTransferSerializer(serializers.ModelSerializer):
+    items = StockTransferItemSerializer(many=True)
+    fromWarehouseId = serializers.PrimaryKeyRelatedField(queryset=Warehouse.objects.all(), source='fromWarehouse')
+    toWarehouseId = serializers.PrimaryKeyRelatedField(queryset=Warehouse.objects.all(), source='toWarehouse')
+
+    class Meta:
+        model = StockTransfer
+        fields = ['id', 'date', 'fromWarehouseId', 'toWarehouseId', 'comment', 'items']
+        read_only_fields = ['id', 'date']
+
+    def to_internal_value(self, data):
+        # Barcha qatorlardagi mahsulotlar bitta so'rovda yuklanadi
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list) and 'transfer_products' not in self.context:
+            self.context['transfer_products'] = Product.objects.in_bulk(sale_product_ids([data]))
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        if attrs['fromWarehouse'] == attrs['toWarehouse']:
+            raise serializers.ValidationError("Manba va qabul qiluvchi ombor bir xil bo'lmasligi kerak")
+        if not attrs['items']:
+            raise serializers.ValidationError({'items': "Kamida bitta qator bo'lishi kerak"})
+        return attrs
+
+    def create(self, validated_data):
+        employee = validated_data.pop('employee', None)
+        with transaction.atomic():
+            try:
+                return create_transfer(validated_data, employee)
+            except InsufficientStock as e:
+                products = {item['product'].pk: item['product'] for item in validated_data['items']}
+                raise serializers.ValidationError(insufficient_stock_message(e, products))
+
+
 class GoodsReceiptItemSerializer(serializers.ModelSerializer):
-    productId = serializers.PrimaryKeyRelatedField(
+    productId = PrefetchedPrimaryKeyRelatedField(
+        cache_key='receipt_products',
         queryset=Product.objects.all(),
         source='product',
         write_only=True
     )
     product = ProductSerializer(read_only=True)
+    quantity = serializers.FloatField(max_value=1e9)
+    purchasePrice = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
 
     class Meta:
         model = GoodsReceiptItem
         fields = ['productId', 'product', 'quantity', 'purchasePrice']
 
+    def validate_quantity(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Miqdor musbat bo'lishi kerak")
+        return value
+
 
 class GoodsReceiptSerializer(serializers.ModelSerializer):
     items = GoodsReceiptItemSerializer(many=True)
@@ -252,36 +477,79 @@ class GoodsReceiptSerializer(serializers.ModelSerializer):
         fields = ['id', 'date', 'supplier', 'supplierId', 'docNumber', 'items', 'totalAmount', 'warehouse', 'warehouseId']
         read_only_fields = ['id', 'date', 'supplier', 'warehouse']
 
+    def to_internal_value(self, data):
+        # Barcha qatorlardagi mahsulotlar bitta so'rovda yuklanadi
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list) and 'receipt_products' not in self.context:
+            self.context['receipt_products'] = Product.objects.in_bulk(sale_product_ids([data]))
+        return super().to_internal_value(data)
+
     def create(self, validated_data):
         with transaction.atomic():
-            items_data = validated_data.pop('items')
-            receipt_id = f"rcpt_{shortuuid.random(length=12)}"
-            receipt = GoodsReceipt.objects.create(id=receipt_id, **validated_data)
-
-            for item_data in items_data:
-                GoodsReceiptItem.objects.create(receipt=receipt, **item_data)
-                product = item_data['product']
-                product.stock += item_data['quantity']
-                product.purchasePrice = item_data['purchasePrice']
-                product.save()
-                
-                # Create stock movement record
-                StockMovement.objects.create(
-                    product=product,
-                    quantity=item_data['quantity'],
-                    type=StockMovement.MovementType.KIRIM,
-                    relatedId=receipt_id,
-                    comment=f"Omborga kirim: {receipt.docNumber or receipt_id}"
-                )
-
-            return receipt
+            receipt = create_goods_receipt(validated_data)
+        # Javobdagi mahsulotlar yangilangan qoldiq va tannarx bilan, qatorlar soniga bog'liq bo'lmagan so'rovlarda
+        prefetch_related_objects([receipt], Prefetch('items', queryset=GoodsReceiptItem.objects.select_related('product')))
+        return receipt
+
+
+class ProductRefSerializer(serializers.ModelSerializer):
+    """Ro'yxatlardagi qatorlar uchun mahsulotning qisqa ko'rinishi (to'liq ProductSerializer o'rniga)."""
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'barcode', 'unit']
+
+
+class GoodsReceiptLineSerializer(serializers.ModelSerializer):
+    product = ProductRefSerializer(read_only=True)
+
+    class Meta:
+        model = GoodsReceiptItem
+        fields = ['product', 'quantity', 'purchasePrice']
+
+
+class GoodsReceiptListSerializer(serializers.ModelSerializer):
+    """GET /api/goods-receipts/history/ va /api/goods-receipts/<id>/ javobi."""
+    items = GoodsReceiptLineSerializer(many=True, read_only=True)
+    supplierId = serializers.CharField(source='supplier_id', read_only=True)
+    supplierName = serializers.CharField(source='supplier.name', read_only=True)
+    warehouseId = serializers.CharField(source='warehouse_id', read_only=True)
+    warehouseName = serializers.CharField(source='warehouse.name', read_only=True, default=None)
+
+    class Meta:
+        model = GoodsReceipt
+        fields = ['id', 'date', 'supplierId', 'supplierName', 'warehouseId', 'warehouseName', 'docNumber',
+                  'totalAmount', 'items']
 
 
 class DebtPaymentSerializer(serializers.ModelSerializer):
+    customerId = serializers.PrimaryKeyRelatedField(queryset=Customer.objects.all(), source='customer')
+
     class Meta:
         model = DebtPayment
         fields = ['customerId', 'amount', 'paymentType']
-        extra_kwargs = {'customerId': {'source': 'customer_id'}}
+
+
+class ShiftSerializer(serializers.ModelSerializer):
+    """Smena va uning joriy hisoblagichlari (ochish javobi va /api/shifts/current/)."""
+    employeeId = serializers.CharField(source='employee_id', read_only=True)
+    warehouseId = serializers.PrimaryKeyRelatedField(
+        queryset=Warehouse.objects.all(), source='warehouse', required=False, allow_null=True,
+    )
+    openingCash = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=0, required=False)
+    payments = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Shift
+        fields = ['id', 'employeeId', 'warehouseId', 'openedAt', 'closedAt', 'openingCash', 'closingCash',
+                  'salesCount', 'total', 'discount', 'payments']
+        read_only_fields = ['id', 'openedAt', 'closedAt', 'closingCash', 'salesCount', 'total', 'discount']
+
+    def get_payments(self, shift):
+        return shift_payments(shift)
+
+
+class ShiftCloseSerializer(serializers.Serializer):
+    closingCash = serializers.DecimalField(max_digits=14, decimal_places=2, min_value=0)
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
@@ -336,3 +604,77 @@ class ExpenseSerializer(serializers.ModelSerializer):
         validated_data['id'] = f"exp_{shortuuid.random(length=10)}"
         return super().create(validated_data)
 
+
+
+# ========= Normalized ko'rinish: ichma-ich obyektlar o'rniga id havolalari =========
+# /api/data/initial/?normalized=1 da ishlatiladi; obyektlarning o'zi id bo'yicha jadvallarda keladi.
+
+class NormalizedEmployeeSerializer(serializers.ModelSerializer):
+    roleId = serializers.CharField(source='role_id', read_only=True)
+
+    class Meta:
+        model = Employee
+        fields = ['id', 'name', 'phone', 'roleId']
+
+
+class NormalizedCartItemSerializer(serializers.ModelSerializer):
+    productId = serializers.CharField(source='product_id', read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['productId', 'quantity', 'price']
+
+
+class NormalizedSaleSerializer(serializers.ModelSerializer):
+    items = NormalizedCartItemSerializer(many=True, read_only=True)
+    payments = SalePaymentSerializer(many=True, read_only=True)
+    customerId = serializers.CharField(source='customer_id', read_only=True)
+    sellerId = serializers.CharField(source='seller_id', read_only=True)
+
+    class Meta:
+        model = Sale
+        fields = ['id', 'date', 'items', 'subtotal', 'discount', 'total', 'payments', 'customerId', 'sellerId']
+
+
+class NormalizedGoodsReceiptItemSerializer(serializers.ModelSerializer):
+    productId = serializers.CharField(source='product_id', read_only=True)
+
+    class Meta:
+        model = GoodsReceiptItem
+        fields = ['productId', 'quantity', 'purchasePrice']
+
+
+class NormalizedGoodsReceiptSerializer(serializers.ModelSerializer):
+    items = NormalizedGoodsReceiptItemSerializer(many=True, read_only=True)
+    supplierId = serializers.CharField(source='supplier_id', read_only=True)
+    warehouseId = serializers.CharField(source='warehouse_id', read_only=True)
+
+    class Meta:
+        model = GoodsReceipt
+        fields = ['id', 'date', 'supplierId', 'docNumber', 'items', 'totalAmount', 'warehouseId']
+
+
+class NormalizedStockMovementSerializer(serializers.ModelSerializer):
+    productId = serializers.CharField(source='product_id', read_only=True)
+
+    class Meta:
+        model = StockMovement
+        fields = ['id', 'productId', 'quantity', 'type', 'date', 'relatedId', 'comment']
+
+
+class NormalizedWarehouseProductSerializer(serializers.ModelSerializer):
+    warehouseId = serializers.CharField(source='warehouse_id', read_only=True)
+    productId = serializers.CharField(source='product_id', read_only=True)
+
+    class Meta:
+        model = WarehouseProduct
+        fields = ['id', 'warehouseId', 'productId', 'quantity', 'reserved_quantity', 'created_at', 'updated_at']
+
+
+class NormalizedExpenseSerializer(serializers.ModelSerializer):
+    employeeId = serializers.CharField(source='employee_id', read_only=True)
+    typeId = serializers.CharField(source='type_id', read_only=True)
+
+    class Meta:
+        model = Expense
+        fields = ['id', 'employeeId', 'typeId', 'date', 'amount', 'description', 'created_at', 'updated_at']
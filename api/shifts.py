@@ -0,0 +1,168 @@
+"""
+Kassir smenalari: ochish/yopish, savdo saqlanganda hisoblagichlarni oshirish, Z-hisobot va
+sotuvchilar bo'yicha hisobot. Z-hisobot faqat smena qatoridagi hisoblagichlarni o'qiydi.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+import shortuuid
+
+from .fast_serializers import decimal_field
+from .models import Shift, Sale, SalePayment, Employee
+
+_money = decimal_field(Shift, 'total')
+
+
+class ShiftError(ValueError):
+    pass
+
+
+def money(value):
+    # Javoblarda pul summalari DRF DecimalField kabi satr ko'rinishida
+    return _money(value or 0, None)
+
+
+def open_shift(employee, opening_cash=0, warehouse=None):
+    """Xodim uchun yangi smena; ochiq smenasi bo'lsa ShiftError."""
+    try:
+        with transaction.atomic():
+            return Shift.objects.create(
+                id=f"shift_{shortuuid.random(length=12)}", employee=employee, warehouse=warehouse,
+                openingCash=opening_cash,
+            )
+    except IntegrityError:
+        raise ShiftError('Employee already has an open shift')
+
+
+def close_shift(shift, closing_cash):
+    """Smenani yopadi; parallel yopishda faqat bittasi muvaffaqiyatli bo'ladi."""
+    closed_at = timezone.now()
+    closed = Shift.objects.filter(pk=shift.pk, closedAt__isnull=True).update(closedAt=closed_at, closingCash=closing_cash)
+    if not closed:
+        raise ShiftError('Shift is already closed')
+    shift.refresh_from_db()
+    return shift
+
+
+def open_shifts(employee_ids):
+    """
+    {employee_id: (shift_id, openedAt)} - xodimlarning ochiq smenalari (bitta so'rov). Qatorlar
+    tranzaksiya oxirigacha qulflanadi: parallel close_shift savdo saqlangandan keyin yopadi,
+    shuning uchun yopilgan smena hisoblagichlari (berilgan Z-hisobot) o'zgarmaydi.
+    """
+    return {
+        employee_id: (shift_id, opened_at)
+        for employee_id, shift_id, opened_at in Shift.objects.select_for_update()
+        .filter(employee_id__in=list(employee_ids), closedAt__isnull=True)
+        .values_list('employee_id', 'id', 'openedAt')
+    }
+
+
+def sale_shift(shifts, sale):
+    """Savdo sotuvchining ochiq smenasiga faqat smena ochilgandan keyin qilingan bo'lsa tegishli (oflayn savdolar)."""
+    shift = shifts.get(sale.seller_id)
+    if shift is None or sale.date < shift[1]:
+        return None
+    return shift[0]
+
+
+def record_shift_sales(sales, payments, sign=1):
+    """
+    Saqlangan savdolar va to'lovlarni smena hisoblagichlariga qo'shadi: smenaga bitta atomar UPDATE
+    (sign=-1 - o'chirilayotgan savdolar ayiriladi). Yopilgan smenaning Z-hisoboti o'zgarmaydi.
+    """
+    sale_shifts = {sale.pk: sale.shift_id for sale in sales if sale.shift_id}
+    if not sale_shifts:
+        return
+    totals = defaultdict(lambda: {'salesCount': 0, 'total': Decimal(0), 'discount': Decimal(0),
+                                  **dict.fromkeys(Shift.PAYMENT_FIELDS.values(), Decimal(0))})
+    for sale in sales:
+        if sale.shift_id:
+            counters = totals[sale.shift_id]
+            counters['salesCount'] += 1
+            counters['total'] += Decimal(sale.total)
+            counters['discount'] += Decimal(sale.discount or 0)
+    for payment in payments:
+        shift_id = sale_shifts.get(payment.sale_id)
+        if shift_id:
+            totals[shift_id][Shift.PAYMENT_FIELDS[payment.type]] += Decimal(payment.amount)
+    for shift_id, counters in totals.items():
+        Shift.objects.filter(pk=shift_id, closedAt__isnull=True)\
+            .update(**{field: F(field) + sign * value for field, value in counters.items()})
+
+
+def shift_payments(shift):
+    return {payment_type: money(getattr(shift, field)) for payment_type, field in Shift.PAYMENT_FIELDS.items()}
+
+
+def z_report(shift):
+    """Smena yakuni: hisoblagichlar, kutilgan naqd pul (boshlang'ich + naqd to'lovlar) va farq."""
+    expected_cash = shift.openingCash + shift.cash
+    return {
+        'shiftId': shift.id,
+        'employeeId': shift.employee_id,
+        'employeeName': shift.employee.name if shift.employee else None,
+        'warehouseId': shift.warehouse_id,
+        'openedAt': shift.openedAt,
+        'closedAt': shift.closedAt,
+        'salesCount': shift.salesCount,
+        'total': money(shift.total),
+        'discount': money(shift.discount),
+        'averageTicket': money(shift.total / shift.salesCount if shift.salesCount else 0),
+        'payments': shift_payments(shift),
+        'openingCash': money(shift.openingCash),
+        'expectedCash': money(expected_cash),
+        'closingCash': money(shift.closingCash) if shift.closingCash is not None else None,
+        'cashDifference': money(shift.closingCash - expected_cash) if shift.closingCash is not None else None,
+    }
+
+
+def seller_performance(start, end):
+    """
+    [start, end] oralig'idagi savdolar sotuvchilar bo'yicha (SQL da guruhlangan): soni, jami,
+    chegirma, o'rtacha chek, to'lov turlari, shu oraliqda ochilgan smenalar soni va davomiyligi.
+    """
+    sales = Sale.objects.filter(date__gte=start, date__lte=end).values('seller_id').annotate(
+        salesCount=Count('pk'), total=Sum('total'), discount=Sum('discount'),
+    ).order_by()
+    payments = SalePayment.objects.filter(sale__date__gte=start, sale__date__lte=end)\
+        .values('sale__seller_id', 'type').annotate(amount=Sum('amount')).order_by()
+    shifts = Shift.objects.filter(openedAt__gte=start, openedAt__lte=end).values('employee_id').annotate(
+        shifts=Count('pk'),
+        duration=Sum(ExpressionWrapper(Coalesce('closedAt', Value(timezone.now())) - F('openedAt'),
+                                       output_field=DurationField())),
+    ).order_by()
+
+    rows = defaultdict(lambda: {
+        'salesCount': 0, 'total': Decimal(0), 'discount': Decimal(0),
+        'payments': dict.fromkeys(SalePayment.PaymentType.values, Decimal(0)), 'shifts': 0, 'hours': 0.0,
+    })
+    for row in sales:
+        rows[row['seller_id']].update(salesCount=row['salesCount'], total=row['total'] or Decimal(0),
+                                      discount=row['discount'] or Decimal(0))
+    for row in payments:
+        rows[row['sale__seller_id']]['payments'][row['type']] = row['amount'] or Decimal(0)
+    for row in shifts:
+        duration = row['duration']
+        rows[row['employee_id']].update(shifts=row['shifts'],
+                                        hours=round(duration.total_seconds() / 3600, 2) if duration else 0.0)
+    names = dict(Employee.objects.filter(pk__in=[pk for pk in rows if pk]).values_list('id', 'name'))
+    results = []
+    for seller_id, row in sorted(rows.items(), key=lambda item: item[1]['total'], reverse=True):
+        count = row['salesCount']
+        results.append({
+            'sellerId': seller_id,
+            'sellerName': names.get(seller_id),
+            'salesCount': count,
+            'total': money(row['total']),
+            'discount': money(row['discount']),
+            'averageTicket': money(row['total'] / count if count else 0),
+            'payments': {payment_type: money(amount) for payment_type, amount in row['payments'].items()},
+            'shifts': row['shifts'],
+            'hours': row['hours'],
+        })
+    return results
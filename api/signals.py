@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from . import role_cache
+from .rollups import record_expense, record_sales
+from .shifts import record_shift_sales
+from .models import (
+    Role, Employee, Product, Customer, Supplier, Sale, DebtPayment, Unit, GoodsReceipt, StockMovement,
+    Warehouse, WarehouseProduct, Expense, ExpenseType, StoreSettings, ChangeLog, CartItem, SalePayment,
+)
+
+# /api/data/initial/ da qaytariladigan va delta sinxronizatsiyada kuzatiladigan modellar
+TRACKED_MODELS = [
+    Role, Employee, Product, Customer, Supplier, Sale, DebtPayment, Unit, GoodsReceipt, StockMovement,
+    Warehouse, WarehouseProduct, Expense, ExpenseType, StoreSettings,
+]
+
+
+@receiver([post_save, post_delete], sender=Role)
+@receiver([post_save, post_delete], sender=Employee)
+def invalidate_role_cache(sender, **kwargs):
+    role_cache.invalidate()
+    # Boshqa thread va worker'lar tranzaksiya tugashidan oldin eski qiymatni yuklab olgan bo'lishi
+    # mumkin: versiya faqat commit'dan keyin almashadi, aks holda ular eski holatni yangi deb saqlaydi
+    transaction.on_commit(role_cache.publish_change)
+
+
+def record_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ChangeLog.record(sender, [instance.pk])
+
+
+def record_delete(sender, instance, **kwargs):
+    ChangeLog.record(sender, [instance.pk], action=ChangeLog.Action.DELETE)
+
+
+for model in TRACKED_MODELS:
+    post_save.connect(record_save, sender=model, dispatch_uid=f'changelog_save_{model._meta.model_name}')
+    post_delete.connect(record_delete, sender=model, dispatch_uid=f'changelog_delete_{model._meta.model_name}')
+
+
+@receiver(pre_save, sender=Expense)
+def remember_expense(sender, instance, raw=False, **kwargs):
+    # O'zgartirilayotgan xarajatning eski qiymati kunlik yig'indidan ayiriladi
+    instance._rollup_previous = None
+    if not raw and not instance._state.adding:
+        instance._rollup_previous = Expense.objects.filter(pk=instance.pk).values('date', 'type_id', 'amount').first()
+
+
+@receiver(post_save, sender=Expense)
+def rollup_expense_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is not None:
+        record_expense(previous['date'], previous['type_id'], previous['amount'], sign=-1)
+    record_expense(instance.date, instance.type_id, instance.amount)
+
+
+@receiver(post_delete, sender=Expense)
+def rollup_expense_delete(sender, instance, **kwargs):
+    record_expense(instance.date, instance.type_id, instance.amount, sign=-1)
+
+
+@receiver(pre_delete, sender=Sale)
+def rollup_sale_delete(sender, instance, **kwargs):
+    # Savdolar faqat create_sales orqali yoziladi (admin'da faqat o'qish), lekin o'chirilsa
+    # yig'indilar va ochiq smena hisoblagichlari qatorlar hali bor paytda kamaytiriladi
+    items = list(CartItem.objects.filter(sale=instance))
+    payments = list(SalePayment.objects.filter(sale=instance))
+    record_sales([instance], items, payments, sign=-1)
+    record_shift_sales([instance], payments, sign=-1)
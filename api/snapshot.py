@@ -0,0 +1,42 @@
+import gzip
+import threading
+
+
+# /api/data/initial/ javobining tayyor (render va gzip qilingan) nusxalari, har bir ko'rinish
+# (variant) uchun alohida. Versiya sifatida xavfsiz ChangeLog kursori (ChangeLog.safe_cursor)
+# ishlatiladi: har qanday save/delete xavfsizlik oynasi o'tgach uni oshiradi va nusxa eskiradi.
+_lock = threading.Lock()
+_snapshots = {}
+
+
+class Snapshot:
+    def __init__(self, version, body, variant='default'):
+        self.version = version
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+        self.etag = make_etag(version, variant)
+
+
+def make_etag(version, variant='default'):
+    return f'W/"initial-{variant}-{version}"'
+
+
+def get_snapshot(version, build, variant='default'):
+    """
+    version uchun tayyor nusxani qaytaradi. Nusxa eskirgan bo'lsa uni faqat bitta so'rov
+    build(version) orqali qayta quradi, qolganlari o'sha natijani kutadi.
+    """
+    snapshot = _snapshots.get(variant)
+    if snapshot is not None and snapshot.version >= version:
+        return snapshot
+    with _lock:
+        snapshot = _snapshots.get(variant)
+        if snapshot is not None and snapshot.version >= version:
+            return snapshot
+        snapshot = _snapshots[variant] = Snapshot(version, build(version), variant)
+        return snapshot
+
+
+def invalidate():
+    with _lock:
+        _snapshots.clear()
@@ -0,0 +1,423 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+import shortuuid
+
+from .models import (
+    Product, ChangeLog, StockMovement, StockReservation, StockSnapshot, StockSnapshotBalance, WarehouseProduct,
+)
+
+# Bitta UPDATE dagi mahsulotlar soni (SQLite ifoda chuqurligi chegarasi)
+STOCK_UPDATE_CHUNK_SIZE = 200
+
+
+class _NotAllUpdated(Exception):
+    pass
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, available, requested, warehouse_id=None):
+        self.product_id = product_id
+        self.available = available
+        self.requested = requested
+        self.warehouse_id = warehouse_id
+        super().__init__(product_id)
+
+
+def group_by_quantity(keys, quantities):
+    """
+    {miqdor: [kalitlar]}: bir xil miqdordagi qatorlar bitta When(key__in=...) bo'ladi. Savatlarda
+    miqdorlar ko'pincha takrorlanadi (1, 2, ...), shuning uchun CASE ifodasi ancha qisqaradi.
+    """
+    groups = defaultdict(list)
+    for key in keys:
+        groups[quantities[key]].append(key)
+    return groups
+
+
+def guarded_update(queryset, key, quantities, field, change, guard, available):
+    """
+    queryset dagi har bir key qatorining field maydonini change(miqdor) ga o'zgartiradi, faqat
+    guard(miqdor) sharti bajarilsa. Bitta qator ham shartdan o'tmasa (yoki qator yo'q bo'lsa), o'sha
+    bo'lakdagi hech bir qator o'zgarmaydi va InsufficientStock (available ifodasidagi joriy qiymat
+    bilan) ko'tariladi. transaction.atomic() ichida chaqirilishi kerak, aks holda oldingi bo'laklar
+    qaytarilmaydi.
+    """
+    keys = list(quantities)
+    now = timezone.now()
+
+    def chunk_condition(chunk):
+        condition = Q()
+        for quantity, group in group_by_quantity(chunk, quantities).items():
+            condition |= Q(**{f'{key}__in': group}) & guard(quantity)
+        return condition
+
+    def apply_chunk(chunk):
+        whens = [When(**{f'{key}__in': group}, then=change(quantity))
+                 for quantity, group in group_by_quantity(chunk, quantities).items()]
+        with transaction.atomic():
+            updated = queryset.filter(chunk_condition(chunk)).update(
+                **{field: Case(*whens, output_field=FloatField())}, updated_at=now
+            )
+            if updated != len(chunk):
+                raise _NotAllUpdated
+
+    for start in range(0, len(keys), STOCK_UPDATE_CHUNK_SIZE):
+        chunk = keys[start:start + STOCK_UPDATE_CHUNK_SIZE]
+        try:
+            apply_chunk(chunk)
+        except _NotAllUpdated:
+            # Savepoint qaytarildi. Qatorlar qulflanib qayta tekshiriladi: shartdan o'tmagan yoki yo'q
+            # qator - InsufficientStock; hammasi o'tsa (parallel o'zgarish shartni vaqtincha buzgan)
+            # UPDATE qulf ostida bir marta takrorlanadi.
+            current = dict(queryset.filter(**{f'{key}__in': chunk}).select_for_update().order_by(key)
+                           .annotate(_available=available).values_list(key, '_available'))
+            passing = set(queryset.filter(chunk_condition(chunk)).values_list(key, flat=True))
+            failing = [item_key for item_key in chunk if item_key not in passing]
+            if not failing:
+                try:
+                    apply_chunk(chunk)
+                    continue
+                except _NotAllUpdated:
+                    failing = chunk
+            raise InsufficientStock(failing[0], current.get(failing[0], 0), quantities[failing[0]])
+
+
+def warehouse_total():
+    """Mahsulotning barcha omborlardagi qoldig'i (Product qatoriga bog'langan subquery)."""
+    return Coalesce(Subquery(
+        WarehouseProduct.objects.filter(product_id=OuterRef('pk')).order_by().values('product_id')
+        .annotate(total=Sum('quantity')).values('total')
+    ), Value(0.0), output_field=FloatField())
+
+
+def decrement_stock(quantities):
+    """
+    Product.stock ni shartli atomar UPDATE bilan kamaytiradi: qoldiq yetmasa hech bir qator
+    o'zgarmaydi va InsufficientStock ko'tariladi. transaction.atomic() ichida chaqirilishi kerak.
+    """
+    guarded_update(
+        Product.objects.all(), 'pk', quantities, 'stock',
+        change=lambda quantity: F('stock') - quantity,
+        guard=lambda quantity: Q(stock__gte=quantity),
+        available=F('stock'),
+    )
+    # queryset.update() signal yubormaydi
+    ChangeLog.record(Product, list(quantities))
+
+
+def adjust_product_stock(deltas):
+    """Product.stock ni {product_id: o'zgarish} bo'yicha shartsiz set-based UPDATE bilan o'zgartiradi."""
+    guarded_update(
+        Product.objects.all(), 'pk', deltas, 'stock',
+        change=lambda delta: F('stock') + delta,
+        guard=lambda delta: Q(),
+        available=F('stock'),
+    )
+    ChangeLog.record(Product, list(deltas))
+
+
+def record_warehouse_changes(changes):
+    """
+    Ombor qatori qo'lda yaratilgan/tahrirlangan/o'chirilganda: {(product_id, warehouse_id): farq}.
+    Product.stock barcha qoldiq (omborlarga biriktirilmagani ham), shuning uchun u omborlardan
+    qayta hisoblanmaydi - faqat farq F() bilan qo'shiladi va har bir farq inventarizatsiya
+    harakati sifatida yoziladi (stock_as_of va snapshot'lar ombor qoldig'i bilan mos qoladi).
+    """
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return
+    deltas = defaultdict(float)
+    for (product_id, _), delta in changes.items():
+        deltas[product_id] += delta
+    adjust_product_stock({product_id: delta for product_id, delta in deltas.items() if delta})
+    movements = StockMovement.objects.bulk_create([
+        StockMovement(
+            product_id=product_id, warehouse_id=warehouse_id, quantity=abs(delta),
+            type=StockMovement.MovementType.INVENTAR_ORTIQCHA if delta > 0 else StockMovement.MovementType.INVENTAR_KAMOMAD,
+            comment="Ombor qoldig'i tahrirlandi",
+        )
+        for (product_id, warehouse_id), delta in changes.items()
+    ])
+    ChangeLog.record(StockMovement, [movement.pk for movement in movements])
+
+
+def reconcile_stock():
+    """
+    Omborlardagi yig'indisi Product.stock dan katta bo'lgan mahsulotlar: [(product_id, stock, omborlar)].
+    Omborsiz savdolar umumiy qoldiqdan oladi, shuning uchun bunday farq ombor qatorlari eskirganini
+    bildiradi; ular inventarizatsiya bilan tuzatiladi (Product.stock omborlardan qayta hisoblanmaydi).
+    """
+    return [
+        (product_id, stock, total)
+        for product_id, stock, total in Product.objects.annotate(_total=warehouse_total())
+        .filter(_total__gt=F('stock') + 1e-9).order_by('pk').values_list('pk', 'stock', '_total')
+        .iterator(chunk_size=2000)
+    ]
+
+
+def warehouse_available():
+    return F('quantity') - F('reserved_quantity')
+
+
+def decrement_warehouse_stock(warehouse_id, quantities):
+    """
+    Ombordagi WarehouseProduct.quantity ni kamaytiradi: bron qilinmagan qoldiq
+    (quantity - reserved_quantity) yetmasa InsufficientStock. Product.stock ni o'zgartirmaydi.
+    """
+    queryset = WarehouseProduct.objects.filter(warehouse_id=warehouse_id)
+    try:
+        guarded_update(
+            queryset, 'product_id', quantities, 'quantity',
+            change=lambda quantity: F('quantity') - quantity,
+            guard=lambda quantity: Q(quantity__gte=F('reserved_quantity') + quantity),
+            available=warehouse_available(),
+        )
+    except InsufficientStock as e:
+        e.warehouse_id = warehouse_id
+        raise
+    ChangeLog.record(WarehouseProduct, queryset.filter(product_id__in=list(quantities)).values_list('pk', flat=True))
+
+
+def increment_warehouse_stock(warehouse_id, quantities):
+    """
+    Ombordagi WarehouseProduct.quantity ni oshiradi; yetishmayotgan qatorlar oldin bitta
+    bulk_create (ignore_conflicts) bilan yaratiladi. Product.stock ni o'zgartirmaydi.
+    """
+    WarehouseProduct.objects.bulk_create([
+        WarehouseProduct(id=f"wh_prod_{shortuuid.random(length=10)}", warehouse_id=warehouse_id, product_id=product_id)
+        for product_id in quantities
+    ], batch_size=STOCK_UPDATE_CHUNK_SIZE * 5, ignore_conflicts=True)
+    queryset = WarehouseProduct.objects.filter(warehouse_id=warehouse_id)
+    guarded_update(
+        queryset, 'product_id', quantities, 'quantity',
+        change=lambda quantity: F('quantity') + quantity,
+        guard=lambda quantity: Q(),
+        available=F('quantity'),
+    )
+    ChangeLog.record(WarehouseProduct, queryset.filter(product_id__in=list(quantities)).values_list('pk', flat=True))
+
+
+def reserve_warehouse_stock(warehouse_id, quantities):
+    """reserved_quantity ni oshiradi, faqat bron qilinmagan qoldiq yetarli bo'lsa."""
+    queryset = WarehouseProduct.objects.filter(warehouse_id=warehouse_id)
+    try:
+        guarded_update(
+            queryset, 'product_id', quantities, 'reserved_quantity',
+            change=lambda quantity: F('reserved_quantity') + quantity,
+            guard=lambda quantity: Q(quantity__gte=F('reserved_quantity') + quantity),
+            available=warehouse_available(),
+        )
+    except InsufficientStock as e:
+        e.warehouse_id = warehouse_id
+        raise
+    ChangeLog.record(WarehouseProduct, queryset.filter(product_id__in=list(quantities)).values_list('pk', flat=True))
+
+
+def release_reservations(reservations):
+    """
+    Bronlarni o'chiradi va reserved_quantity ni har bir ombor uchun bitta UPDATE bilan
+    kamaytiradi. Boshqa jarayon qulflagan bronlar o'tkazib yuboriladi (skip_locked), shuning
+    uchun bir nechta jarayon bir vaqtda ishlaganda bir-birini kutmaydi. Bo'shatilgan
+    bronlar soni qaytariladi; transaction.atomic() ichida chaqirilishi kerak.
+    """
+    rows = list(reservations.select_for_update(skip_locked=True).values_list('pk', 'warehouse_id', 'product_id', 'quantity'))
+    if not rows:
+        return 0
+    totals = defaultdict(lambda: defaultdict(float))
+    for _, warehouse_id, product_id, quantity in rows:
+        totals[warehouse_id][product_id] += quantity
+    ids = [row[0] for row in rows]
+    for start in range(0, len(ids), STOCK_UPDATE_CHUNK_SIZE * 5):
+        StockReservation.objects.filter(pk__in=ids[start:start + STOCK_UPDATE_CHUNK_SIZE * 5]).delete()
+
+    now = timezone.now()
+    for warehouse_id, quantities in totals.items():
+        product_ids = list(quantities)
+        for start in range(0, len(product_ids), STOCK_UPDATE_CHUNK_SIZE):
+            chunk = product_ids[start:start + STOCK_UPDATE_CHUNK_SIZE]
+            WarehouseProduct.objects.filter(warehouse_id=warehouse_id, product_id__in=chunk).update(
+                reserved_quantity=Greatest(Case(
+                    *[When(product_id__in=group, then=F('reserved_quantity') - quantity)
+                      for quantity, group in group_by_quantity(chunk, quantities).items()],
+                    output_field=FloatField(),
+                ), Value(0.0)),
+                updated_at=now,
+            )
+        ChangeLog.record(WarehouseProduct, WarehouseProduct.objects.filter(
+            warehouse_id=warehouse_id, product_id__in=product_ids).values_list('pk', flat=True))
+    return len(rows)
+
+
+def release_expired_reservations(now=None, batch_size=1000):
+    """Muddati o'tgan bronlarni batch_size tadan qisqa tranzaksiyalarda bo'shatadi."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        with transaction.atomic():
+            batch = StockReservation.objects.filter(
+                pk__in=list(StockReservation.objects.filter(expires_at__lte=now).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            )
+            count = release_reservations(batch)
+        released += count
+        if count < batch_size:
+            return released
+
+
+# Kunlik snapshot chegarasi shuncha vaqt o'tgandan keyin quriladi: chegaradan oldin
+# boshlangan tranzaksiyalardagi harakatlar shu vaqt ichida yozib bo'linadi
+STOCK_SNAPSHOT_LAG = timedelta(minutes=10)
+
+
+def signed_quantity():
+    return Case(
+        When(type__in=StockMovement.INCOMING_TYPES, then=F('quantity')),
+        default=-F('quantity'),
+        output_field=FloatField(),
+    )
+
+
+def movement_totals(movements, warehouse_id=None, per_warehouse=False):
+    """
+    Harakatlarning sof yig'indisi {(product_id, warehouse_id): miqdor}. warehouse_id=None -
+    mahsulotning umumiy qoldig'i (barcha harakatlar); per_warehouse=True - barcha omborlar
+    bo'yicha alohida.
+    """
+    if per_warehouse:
+        movements = movements.filter(warehouse__isnull=False)
+        rows = movements.values('product_id', 'warehouse_id')
+    elif warehouse_id is not None:
+        rows = movements.filter(warehouse_id=warehouse_id).values('product_id', 'warehouse_id')
+    else:
+        rows = movements.values('product_id')
+    return {
+        (row['product_id'], row.get('warehouse_id')): row['net']
+        for row in rows.annotate(net=Sum(signed_quantity())).order_by()
+    }
+
+
+def current_balances(product_ids=None, warehouse_id=None, per_warehouse=False):
+    """Product.stock / WarehouseProduct.quantity dagi joriy qoldiqlar, movement_totals kalitlari bilan."""
+    if per_warehouse or warehouse_id is not None:
+        queryset = WarehouseProduct.objects.all()
+        if warehouse_id is not None:
+            queryset = queryset.filter(warehouse_id=warehouse_id)
+        if product_ids is not None:
+            queryset = queryset.filter(product_id__in=product_ids)
+        return {(p, w): q for p, w, q in queryset.values_list('product_id', 'warehouse_id', 'quantity')}
+    queryset = Product.objects.all()
+    if product_ids is not None:
+        queryset = queryset.filter(pk__in=product_ids)
+    return {(p, None): q for p, q in queryset.values_list('id', 'stock')}
+
+
+def snapshot_balances(snapshot, product_ids=None, warehouse_id=None, per_warehouse=False):
+    queryset = snapshot.balances.all()
+    if per_warehouse:
+        queryset = queryset.filter(warehouse__isnull=False)
+    else:
+        queryset = queryset.filter(warehouse_id=warehouse_id) if warehouse_id is not None \
+            else queryset.filter(warehouse__isnull=True)
+    if product_ids is not None:
+        queryset = queryset.filter(product_id__in=product_ids)
+    return {(p, w): q for p, w, q in queryset.values_list('product_id', 'warehouse_id', 'quantity')}
+
+
+def apply_totals(balances, totals, sign=1):
+    for key, net in totals.items():
+        balances[key] = balances.get(key, 0) + sign * net
+    return balances
+
+
+def stock_as_of(moment, product_ids=None, warehouse_id=None):
+    """
+    moment vaqtidagi qoldiqlar {(product_id, warehouse_id): miqdor} va asos qilingan snapshot.
+    Eng yaqin oldingi snapshot'ga undan keyingi harakatlar qo'shiladi; oldingi snapshot bo'lmasa
+    keyingi snapshot (yoki joriy qoldiq)dan moment dan keyingi harakatlar ayiriladi. Shuning
+    uchun o'qiladigan harakatlar soni tarix uzunligiga emas, snapshot oralig'iga bog'liq.
+    """
+    movements = StockMovement.objects.all()
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+    scope = {'product_ids': product_ids, 'warehouse_id': warehouse_id}
+
+    snapshot = StockSnapshot.objects.filter(date__lte=moment).order_by('-date').first()
+    if snapshot is not None:
+        balances = snapshot_balances(snapshot, **scope)
+        totals = movement_totals(movements.filter(date__gte=snapshot.date, date__lte=moment), warehouse_id)
+        return apply_totals(balances, totals), snapshot
+
+    snapshot = StockSnapshot.objects.filter(date__gt=moment).order_by('date').first()
+    if snapshot is not None:
+        balances = snapshot_balances(snapshot, **scope)
+        movements = movements.filter(date__gt=moment, date__lt=snapshot.date)
+    else:
+        balances = current_balances(**scope)
+        movements = movements.filter(date__gt=moment)
+    return apply_totals(balances, movement_totals(movements, warehouse_id), sign=-1), snapshot
+
+
+def snapshot_boundary(day):
+    """day kunining boshlanishi (joriy timezone'da) - kunlik snapshot vaqti."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def save_snapshot(date, balances):
+    with transaction.atomic():
+        snapshot = StockSnapshot.objects.create(date=date)
+        StockSnapshotBalance.objects.bulk_create([
+            StockSnapshotBalance(snapshot=snapshot, product_id=product_id, warehouse_id=warehouse_id, quantity=quantity)
+            for (product_id, warehouse_id), quantity in balances.items()
+            if abs(quantity) > 1e-9
+        ], batch_size=1000)
+    return snapshot
+
+
+def all_balances(source):
+    """source(per_warehouse) ni ikkala darajada chaqirib, natijalarni birlashtiradi."""
+    balances = source(per_warehouse=False)
+    balances.update(source(per_warehouse=True))
+    return balances
+
+
+def build_stock_snapshots(backfill_days=0, now=None):
+    """
+    Kunlik snapshot'larni oxirgisidan boshlab bugungi kungacha quradi: har bir yangi snapshot
+    oldingisiga oradagi harakatlarni qo'shish bilan hisoblanadi. Snapshot hali bo'lmasa,
+    birinchisi joriy qoldiqdan keyingi harakatlarni ayirib olinadi. backfill_days eng eski
+    snapshot'dan orqaga shuncha kun qo'shimcha snapshot quradi. Yaratilgan snapshot'lar qaytariladi.
+    """
+    now = now or timezone.now()
+    last_day = timezone.localdate(now - STOCK_SNAPSHOT_LAG)
+    created = []
+
+    latest = StockSnapshot.objects.order_by('-date').first()
+    if latest is None:
+        boundary = snapshot_boundary(last_day)
+        balances = all_balances(current_balances)
+        after = StockMovement.objects.filter(date__gte=boundary)
+        apply_totals(balances, all_balances(lambda per_warehouse: movement_totals(after, per_warehouse=per_warehouse)), -1)
+        created.append(save_snapshot(boundary, balances))
+    else:
+        balances = all_balances(lambda per_warehouse: snapshot_balances(latest, per_warehouse=per_warehouse))
+        day = timezone.localdate(latest.date)
+        while day < last_day:
+            start, day = snapshot_boundary(day), day + timedelta(days=1)
+            between = StockMovement.objects.filter(date__gte=start, date__lt=snapshot_boundary(day))
+            apply_totals(balances, all_balances(lambda per_warehouse: movement_totals(between, per_warehouse=per_warehouse)))
+            created.append(save_snapshot(snapshot_boundary(day), balances))
+
+    if backfill_days:
+        earliest = StockSnapshot.objects.order_by('date').first()
+        balances = all_balances(lambda per_warehouse: snapshot_balances(earliest, per_warehouse=per_warehouse))
+        day = timezone.localdate(earliest.date)
+        for _ in range(backfill_days):
+            end, day = snapshot_boundary(day), day - timedelta(days=1)
+            between = StockMovement.objects.filter(date__gte=snapshot_boundary(day), date__lt=end)
+            apply_totals(balances, all_balances(lambda per_warehouse: movement_totals(between, per_warehouse=per_warehouse)), -1)
+            created.append(save_snapshot(snapshot_boundary(day), balances))
+    return created
@@ -0,0 +1,156 @@
+"""
+Inventarizatsiya (sanoq) faylini oqim sifatida import qilish. Fayl qatorlari STOCKTAKE_CHUNK_SIZE
+tadan o'qiladi: har bir bo'lak uchun shtrix-kodlar bitta so'rovda topiladi, farqlar hisoblanadi
+va tuzatuvchi harakatlar hamda qoldiq o'zgarishlari bulk amallar bilan yoziladi. Xotirada faqat
+joriy bo'lak va fayldagi mahsulotlar id'lari saqlanadi.
+"""
+import csv
+import json
+import time
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+import shortuuid
+
+from .models import Product, WarehouseProduct, StockMovement, ChangeLog
+from .stock import InsufficientStock, adjust_product_stock, increment_warehouse_stock
+from .utils import iter_chunks
+
+STOCKTAKE_CHUNK_SIZE = 1000
+# Hisobotda ko'rsatiladigan topilmagan shtrix-kodlar soni
+UNKNOWN_BARCODES_LIMIT = 100
+
+
+class StocktakeFormatError(ValueError):
+    pass
+
+
+def decode_lines(lines):
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8-sig')
+        line = line.strip('\ufeff\r\n')
+        if line.strip():
+            yield line
+
+
+def parse_quantity(value, line_number):
+    try:
+        quantity = float(value)
+    except (TypeError, ValueError):
+        raise StocktakeFormatError(f"Line {line_number}: invalid quantity {value!r}")
+    if quantity < 0:
+        raise StocktakeFormatError(f"Line {line_number}: quantity cannot be negative")
+    return quantity
+
+
+def iter_count_rows(lines, file_format='csv'):
+    """(shtrix-kod, sanalgan miqdor) juftliklari. CSV: barcode,quantity (sarlavha ixtiyoriy); jsonl: {"barcode", "quantity"}."""
+    lines = decode_lines(lines)
+    if file_format == 'jsonl':
+        for line_number, line in enumerate(lines, 1):
+            try:
+                row = json.loads(line)
+                barcode, quantity = row['barcode'], row['quantity']
+            except (ValueError, KeyError, TypeError):
+                raise StocktakeFormatError(f"Line {line_number}: invalid JSON, expected {{\"barcode\", \"quantity\"}}")
+            yield str(barcode).strip(), parse_quantity(quantity, line_number)
+    elif file_format == 'csv':
+        for line_number, row in enumerate(csv.reader(lines), 1):
+            if len(row) < 2:
+                raise StocktakeFormatError(f"Line {line_number}: expected barcode,quantity")
+            if line_number == 1 and row[0].strip().lower() == 'barcode':
+                continue
+            yield row[0].strip(), parse_quantity(row[1], line_number)
+    else:
+        raise StocktakeFormatError(f"Unknown file format: {file_format}")
+
+
+def check_reservations(warehouse_id, product_ids, chunk_size=STOCKTAKE_CHUNK_SIZE):
+    """
+    Sanalgan qoldiq faol bronlardan kam bo'lsa InsufficientStock (ko'chirishlardagi kabi): bron
+    qilingan tovar savdoda olinadi, shuning uchun ombor qoldig'i bronlardan past tushmasligi kerak.
+    Tekshiruv fayl oxirida: mahsulot keyingi bo'laklarda yana sanalishi mumkin.
+    """
+    for chunk in iter_chunks(product_ids, chunk_size):
+        below = WarehouseProduct.objects.filter(
+            warehouse_id=warehouse_id, product_id__in=chunk, quantity__lt=F('reserved_quantity') - 1e-9,
+        ).order_by('product_id').values_list('product_id', 'quantity', 'reserved_quantity').first()
+        if below is not None:
+            raise InsufficientStock(*below, warehouse_id=warehouse_id)
+
+
+def apply_stocktake(rows, warehouse_id=None, chunk_size=STOCKTAKE_CHUNK_SIZE):
+    """
+    Sanoq natijalarini qo'llaydi. warehouse_id berilsa farq WarehouseProduct.quantity ga nisbatan
+    hisoblanadi (Product.stock ham shu farqqa o'zgaradi), aks holda Product.stock ga nisbatan.
+    Bir mahsulot bir necha qatorda kelsa (masalan, turli javonlar), miqdorlar qo'shiladi.
+    Butun fayl bitta tranzaksiyada qo'llanadi: fayl o'rtasida StocktakeFormatError bo'lsa yoki
+    ombordagi sanoq bronlardan kam bo'lsa (InsufficientStock) hech narsa yozilmaydi, shuning uchun
+    tuzatilgan faylni qayta yuklash farqlarni ikki marta qo'shmaydi.
+    Hisobot (dict) qaytariladi.
+    """
+    stocktake_id = f"inv_{shortuuid.random(length=12)}"
+    comment = f"Inventarizatsiya: {stocktake_id}"
+    counted_products = set()
+    report = {
+        'id': stocktake_id, 'warehouseId': warehouse_id, 'lines': 0, 'matched': 0, 'unknown': 0,
+        'unknownBarcodes': [], 'adjusted': 0, 'surplus': 0.0, 'shortage': 0.0,
+    }
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        for chunk in iter_chunks(rows, chunk_size):
+            report['lines'] += len(chunk)
+            counted = defaultdict(float)
+            for barcode, quantity in chunk:
+                counted[barcode] += quantity
+            products = dict(Product.objects.filter(barcode__in=list(counted)).values_list('barcode', 'id'))
+            for barcode in counted:
+                if barcode not in products:
+                    report['unknown'] += 1
+                    if len(report['unknownBarcodes']) < UNKNOWN_BARCODES_LIMIT:
+                        report['unknownBarcodes'].append(barcode)
+
+            quantities = {products[barcode]: quantity for barcode, quantity in counted.items() if barcode in products}
+            report['matched'] += len(quantities)
+            if warehouse_id is not None:
+                current = dict(WarehouseProduct.objects.filter(warehouse_id=warehouse_id, product_id__in=list(quantities))
+                               .values_list('product_id', 'quantity'))
+            else:
+                current = dict(Product.objects.filter(pk__in=list(quantities)).values_list('id', 'stock'))
+            deltas = {}
+            for product_id, quantity in quantities.items():
+                # Oldingi bo'laklarda sanalgan mahsulot: yangi qator qo'shimcha miqdor
+                delta = quantity if product_id in counted_products else quantity - current.get(product_id, 0)
+                counted_products.add(product_id)
+                if abs(delta) > 1e-9:
+                    deltas[product_id] = delta
+            if not deltas:
+                continue
+
+            if warehouse_id is not None:
+                increment_warehouse_stock(warehouse_id, deltas)
+            adjust_product_stock(deltas)
+            movements = [
+                StockMovement(
+                    product_id=product_id, warehouse_id=warehouse_id, quantity=abs(delta),
+                    type=StockMovement.MovementType.INVENTAR_ORTIQCHA if delta > 0 else StockMovement.MovementType.INVENTAR_KAMOMAD,
+                    relatedId=stocktake_id, comment=comment,
+                )
+                for product_id, delta in deltas.items()
+            ]
+            StockMovement.objects.bulk_create(movements, batch_size=chunk_size)
+            ChangeLog.record(StockMovement, [movement.pk for movement in movements])
+            report['adjusted'] += len(deltas)
+            report['surplus'] += sum(delta for delta in deltas.values() if delta > 0)
+            report['shortage'] += sum(-delta for delta in deltas.values() if delta < 0)
+
+        if warehouse_id is not None:
+            check_reservations(warehouse_id, counted_products)
+
+    elapsed = time.perf_counter() - started
+    report['seconds'] = round(elapsed, 3)
+    report['linesPerSecond'] = round(report['lines'] / elapsed) if elapsed else report['lines']
+    return report
@@ -1,3 +1,922 @@
-from django.test import TestCase
+import csv
+import json
+import zipfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum
+from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.admin.sites import site as admin_site
+from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import dashboard, role_cache, snapshot
+from .authentication import token_for_employee
+from .debts import post_debt_entries
+from .exports import export_stream, sale_rows
+from .fast_serializers import *
+from .models import *
+from .permissions import has_permission
+from .receipts import receive_product_stock
+from .rollups import rebuild_rollups
+from .serializers import *
+from .shifts import record_shift_sales
+from .stock import (
+    InsufficientStock, adjust_product_stock, build_stock_snapshots, decrement_stock, guarded_update, reconcile_stock,
+    stock_as_of,
+)
+from .stocktake import StocktakeFormatError, apply_stocktake, iter_count_rows
+
+
+class FastSerializerEquivalenceTests(TestCase):
+    """fast_serializers natijasi DRF serializerlari bilan baytma-bayt bir xil bo'lishi kerak."""
+
+    @classmethod
+    def setUpTestData(cls):
+        role = Role.objects.create(id='role_t', name='Kassir', permissions=['use_sales_terminal', 'view_dashboard'])
+        cls.seller = Employee.objects.create_user(phone='901', name='Ali', password='1234', role=role, id='emp_t')
+        no_role = Employee.objects.create_user(phone='902', name=None, password='4321', id='emp_norole')
+        cls.customer = Customer.objects.create(id='cust_t', name='Vali', phone='903', debt=Decimal('12.5'))
+        p1 = Product.objects.create(id='prod_1', name='Non', barcode='111', unit='dona', purchasePrice=Decimal('1000'),
+                                    salePrice=Decimal('1250.50'), stock=10, minStock=2.5, image='product_images/non.png')
+        p2 = Product.objects.create(id='prod_2', name="Sut 1'L", unit='litr', purchasePrice=Decimal('0.1'),
+                                    salePrice=Decimal('9999999999.99'), stock=-1.25, minStock=0, description='Yangi')
+        sale = Sale.objects.create(id='sale_1', subtotal=Decimal('2500'), discount=Decimal('0.5'), total=Decimal('2499.5'),
+                                   customer=cls.customer, seller=cls.seller)
+        CartItem.objects.create(sale=sale, product=p1, quantity=2, price=Decimal('1250.50'))
+        CartItem.objects.create(sale=sale, product=p2, quantity=0.5, price=Decimal('3'))
+        SalePayment.objects.create(sale=sale, type=SalePayment.PaymentType.CASH, amount=Decimal('2000'))
+        SalePayment.objects.create(sale=sale, type=SalePayment.PaymentType.DEBT, amount=Decimal('499.5'))
+        Sale.objects.create(id='sale_2', subtotal=Decimal('1'), total=Decimal('1'), seller=no_role)
+        Sale.objects.create(id='sale_3', subtotal=Decimal('1'), total=Decimal('1'))
+        StockMovement.objects.create(product=p1, quantity=2, type=StockMovement.MovementType.SAVDO, relatedId='sale_1')
+        StockMovement.objects.create(product=p2, quantity=5.5, type=StockMovement.MovementType.KIRIM)
+        warehouse = Warehouse.objects.create(id='wh_1', name='Asosiy', location='Toshkent')
+        WarehouseProduct.objects.create(id='whp_1', warehouse=warehouse, product=p1, quantity=4, reserved_quantity=1)
+        WarehouseProduct.objects.create(id='whp_2', warehouse=warehouse, product=p2)
+
+    def assertSameJSON(self, drf_data, fast_data):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(drf_data), renderer.render(fast_data))
+
+    def test_product(self):
+        queryset = Product.objects.order_by('id')
+        self.assertSameJSON(ProductSerializer(queryset, many=True).data, FastProductSerializer(queryset).data)
+
+    def test_product_with_request_builds_absolute_image_url(self):
+        context = {'request': RequestFactory().get('/api/products/')}
+        queryset = Product.objects.order_by('id')
+        self.assertSameJSON(ProductSerializer(queryset, many=True, context=context).data,
+                            FastProductSerializer(queryset, context=context).data)
+
+    def test_customer(self):
+        queryset = Customer.objects.all()
+        self.assertSameJSON(CustomerSerializer(queryset, many=True).data, FastCustomerSerializer(queryset).data)
+
+    def test_sale_with_items_payments_and_null_relations(self):
+        queryset = Sale.objects.order_by('id')
+        drf = SaleSerializer(queryset.select_related('seller__role', 'customer').prefetch_related('items__product', 'payments'), many=True).data
+        self.assertSameJSON(drf, FastSaleSerializer(queryset).data)
+
+    def test_stock_movement(self):
+        queryset = StockMovement.objects.order_by('-date')
+        self.assertSameJSON(StockMovementSerializer(queryset, many=True).data, FastStockMovementSerializer(queryset).data)
+
+    def test_warehouse_product(self):
+        queryset = WarehouseProduct.objects.order_by('id')
+        self.assertSameJSON(WarehouseProductSerializer(queryset, many=True).data, FastWarehouseProductSerializer(queryset).data)
+
+
+def make_product(pk, stock=0, **fields):
+    fields = {'name': pk, 'purchasePrice': Decimal('1000'), 'salePrice': Decimal('1250'), 'minStock': 0, **fields}
+    return Product.objects.create(id=pk, stock=stock, **fields)
+
+
+def authorized_client(*permissions, phone='900'):
+    role = Role.objects.create(id=f'role_{phone}', name=f'Rol {phone}', permissions=list(permissions))
+    employee = Employee.objects.create_user(phone=phone, name=f'Xodim {phone}', password='1234', role=role,
+                                            id=f'emp_{phone}')
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_for_employee(employee).access_token}')
+    return client, employee
+
+
+def sale_payload(*items, **extra):
+    """items: (product_id, miqdor); narx 1250, to'liq naqd to'lov."""
+    total = str(sum(Decimal('1250') * Decimal(str(quantity)) for _, quantity in items))
+    return {'items': [{'productId': product_id, 'quantity': quantity, 'price': '1250'} for product_id, quantity in items],
+            'subtotal': total, 'total': total, 'payments': [{'type': 'naqd', 'amount': total}], **extra}
+
+
+class GuardedStockUpdateTests(TestCase):
+    """stock.guarded_update: shartli UPDATE, yetishmaslikda hech narsa o'zgarmasligi va qayta urinish."""
+
+    def setUp(self):
+        self.p1 = make_product('prod_1', stock=5)
+        self.p2 = make_product('prod_2', stock=1)
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock
+
+    def test_decrement_updates_all_rows(self):
+        with transaction.atomic():
+            decrement_stock({'prod_1': 2, 'prod_2': 1})
+        self.assertEqual((self.stock(self.p1), self.stock(self.p2)), (3, 0))
+
+    def test_insufficient_stock_changes_nothing(self):
+        with self.assertRaises(InsufficientStock) as raised, transaction.atomic():
+            decrement_stock({'prod_1': 2, 'prod_2': 3})
+        self.assertEqual((raised.exception.product_id, raised.exception.available, raised.exception.requested),
+                         ('prod_2', 1, 3))
+        self.assertEqual((self.stock(self.p1), self.stock(self.p2)), (5, 1))
+
+    def test_missing_row_raises_insufficient_stock(self):
+        with self.assertRaises(InsufficientStock) as raised, transaction.atomic():
+            adjust_product_stock({'prod_1': -1, 'prod_deleted': -5})
+        self.assertEqual(raised.exception.product_id, 'prod_deleted')
+        self.assertEqual(self.stock(self.p1), 5)
+
+    def test_guard_failing_only_on_first_attempt_is_retried(self):
+        # Birinchi UPDATE paytida parallel o'zgarish shartni buzgan, qayta tekshirishda esa o'tadi
+        calls = []
+
+        def guard(quantity):
+            calls.append(quantity)
+            return Q(pk__in=[]) if len(calls) == 1 else Q(stock__gte=quantity)
+
+        with transaction.atomic():
+            guarded_update(Product.objects.all(), 'pk', {'prod_1': 2}, 'stock',
+                           change=lambda quantity: F('stock') - quantity, guard=guard, available=F('stock'))
+        self.assertEqual(self.stock(self.p1), 3)
+
+
+class WarehouseStockTests(TestCase):
+    """Ombor qatorlari Product.stock ga farq sifatida qo'shilishi, omborsiz savdolar va bronlar egasi."""
+
+    def setUp(self):
+        self.product = make_product('prod_1', stock=10)
+        self.warehouse = Warehouse.objects.create(id='wh_1', name='Asosiy')
+        self.client, self.employee = authorized_client('manage_warehouse', 'use_sales_terminal')
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock
+
+    def create_row(self, quantity):
+        response = self.client.post('/api/warehouse-products/', {
+            'warehouseId': 'wh_1', 'productId': 'prod_1', 'quantity': quantity}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def test_warehouse_rows_apply_deltas(self):
+        row_id = self.create_row(5)
+        self.assertEqual(self.stock(), 15)
+        response = self.client.patch(f'/api/warehouse-products/{row_id}/', {'quantity': 5}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.stock(), 15)
+        self.client.patch(f'/api/warehouse-products/{row_id}/', {'quantity': 2}, format='json')
+        self.assertEqual(self.stock(), 12)
+        self.assertEqual(sorted(StockMovement.objects.filter(warehouse_id='wh_1').values_list('type', 'quantity')),
+                         [('inventar_kamomad', 3.0), ('inventar_ortiqcha', 5.0)])
+        balances, _ = stock_as_of(timezone.now(), warehouse_id='wh_1')
+        self.assertEqual(balances[('prod_1', 'wh_1')], 2)
+
+    def test_destroy_subtracts_quantity(self):
+        row_id = self.create_row(6)
+        self.assertEqual(self.client.delete(f'/api/warehouse-products/{row_id}/').status_code, 204)
+        self.assertEqual(self.stock(), 10)
+
+    def test_sale_without_warehouse_takes_total_stock(self):
+        self.create_row(10)
+        response = self.client.post('/api/sales/', sale_payload(('prod_1', 15)), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.stock(), 5)
+        self.assertEqual(WarehouseProduct.objects.get().quantity, 10)
+        response = self.client.post('/api/sales/', sale_payload(('prod_1', 1), warehouseId='wh_1'), format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((self.stock(), WarehouseProduct.objects.get().quantity), (4, 9))
+        self.assertEqual(self.client.post('/api/sales/', sale_payload(('prod_1', 5)), format='json').status_code, 400)
+
+    def test_reconcile_stock_reports_stale_warehouse_rows(self):
+        self.create_row(10)
+        Product.objects.filter(pk='prod_1').update(stock=4)
+        self.assertEqual(reconcile_stock(), [('prod_1', 4, 10)])
+        call_command('reconcile_stock', stdout=StringIO())
+        self.assertEqual(self.stock(), 4)
+
+    def test_only_owner_releases_reservation(self):
+        self.create_row(10)
+        cashier, _ = authorized_client('use_sales_terminal', phone='901')
+        response = cashier.post('/api/reservations/', {
+            'cartId': 'cart_1', 'warehouseId': 'wh_1', 'items': [{'productId': 'prod_1', 'quantity': 3}]}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        other, _ = authorized_client('use_sales_terminal', phone='902')
+        self.assertEqual(other.delete('/api/reservations/cart_1/').status_code, 404)
+        response = other.post('/api/reservations/', {
+            'cartId': 'cart_1', 'warehouseId': 'wh_1', 'items': [{'productId': 'prod_1', 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(cashier.delete('/api/reservations/cart_1/').status_code, 204)
+        self.assertEqual(WarehouseProduct.objects.get().reserved_quantity, 0)
+
+
+class DebtLedgerTests(TestCase):
+    """Qarz daftari: Customer.debt bilan moslik, hisob-kitob varag'i, qarz yoshi va reconcile_debts."""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(id='cust_1', name='Vali', phone='903')
+        make_product('prod_1', stock=100)
+        self.client, _ = authorized_client('use_sales_terminal', 'manage_customers', 'view_reports')
+
+    def debt(self):
+        return Customer.objects.get(pk='cust_1').debt
+
+    def ledger_total(self):
+        return DebtLedgerEntry.objects.filter(customer_id='cust_1').aggregate(total=Sum('amount'))['total']
+
+    def post_entry(self, amount, days_ago=0, kind=DebtLedgerEntry.Kind.SALE):
+        post_debt_entries([DebtLedgerEntry(customer_id='cust_1', amount=Decimal(amount), kind=kind,
+                                           date=timezone.now() - timedelta(days=days_ago))])
+
+    def test_sale_and_payment_are_posted(self):
+        payload = sale_payload(('prod_1', 2), customerId='cust_1')
+        payload['payments'] = [{'type': 'nasiya', 'amount': payload['total']}]
+        sale = self.client.post('/api/sales/', payload, format='json')
+        self.assertEqual(sale.status_code, 201, sale.data)
+        payment = self.client.post('/api/debt-payments/', {'customerId': 'cust_1', 'amount': '1000', 'paymentType': 'naqd'},
+                                   format='json')
+        self.assertEqual(payment.status_code, 201, payment.data)
+        self.assertEqual(self.debt(), Decimal('1500'))
+        self.assertEqual(self.ledger_total(), Decimal('1500'))
+        self.assertEqual(list(DebtLedgerEntry.objects.order_by('id').values_list('kind', 'relatedId')),
+                         [('savdo', sale.data['id']), ('tolov', DebtPayment.objects.get().id)])
+
+    def test_update_does_not_overwrite_concurrent_debt_change(self):
+        stale = Customer.objects.get(pk='cust_1')
+        # So'rov mijozni o'qigandan keyin parallel nasiya savdo qarzni oshiradi
+        self.post_entry('500')
+        serializer = CustomerSerializer(stale, data={'name': 'Vali aka'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(self.debt(), Decimal('500'))
+        serializer = CustomerSerializer(stale, data={'debt': '1200'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        self.assertEqual(serializer.save().debt, Decimal('1200'))
+        self.assertEqual(self.ledger_total(), Decimal('1200'))
+        self.assertEqual(DebtLedgerEntry.objects.get(kind='tuzatish').amount, Decimal('700'))
+
+    def test_statement_running_balance(self):
+        self.post_entry('1000', days_ago=40)
+        self.post_entry('300', days_ago=5)
+        self.post_entry('-200', days_ago=1, kind=DebtLedgerEntry.Kind.PAYMENT)
+        response = self.client.get('/api/customers/cust_1/statement/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['openingBalance'], response.data['closingBalance']), ('1000.00', '1100.00'))
+        self.assertEqual([entry['balance'] for entry in response.data['entries']], ['1300.00', '1100.00'])
+
+    def test_aging_allocates_balance_to_newest_debits(self):
+        self.post_entry('1000', days_ago=100)
+        self.post_entry('400', days_ago=45)
+        self.post_entry('300', days_ago=5)
+        self.post_entry('-1100', days_ago=2, kind=DebtLedgerEntry.Kind.PAYMENT)
+        response = self.client.get('/api/reports/debt-aging/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], '600.00')
+        self.assertEqual(response.data['buckets'], {'0-30': '300.00', '31-60': '300.00', '61-90': '0.00', '90+': '0.00'})
+
+    def test_reconcile_debts(self):
+        self.post_entry('800')
+        Customer.objects.filter(pk='cust_1').update(debt=Decimal('50'))
+        call_command('reconcile_debts', stdout=StringIO())
+        self.assertEqual(self.debt(), Decimal('50'))
+        call_command('reconcile_debts', '--fix', stdout=StringIO())
+        self.assertEqual(self.debt(), Decimal('800'))
+
+
+class StocktakeImportTests(TestCase):
+    """Sanoq fayli: farqlar, takroriy qatorlar va xatoli faylda hech narsa qo'llanmasligi."""
+
+    def setUp(self):
+        make_product('prod_1', stock=10, barcode='111')
+        make_product('prod_2', stock=5, barcode='222')
+        self.client, _ = authorized_client('manage_warehouse')
+
+    def stocks(self):
+        return dict(Product.objects.values_list('id', 'stock'))
+
+    def test_variances_from_request_body(self):
+        body = b'barcode,quantity\n111,7\n222,4\n999,1\n222,3\n'
+        response = self.client.post('/api/stocktake/?file_format=csv', data=body, content_type='text/csv')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['adjusted'], response.data['surplus'], response.data['shortage']), (2, 2.0, 3.0))
+        self.assertEqual(response.data['unknownBarcodes'], ['999'])
+        self.assertEqual(self.stocks(), {'prod_1': 7, 'prod_2': 7})
+        self.assertEqual(set(StockMovement.objects.values_list('product_id', 'type', 'quantity')), {
+            ('prod_1', StockMovement.MovementType.INVENTAR_KAMOMAD, 3),
+            ('prod_2', StockMovement.MovementType.INVENTAR_ORTIQCHA, 2),
+        })
+
+    def test_format_error_applies_nothing(self):
+        rows = iter_count_rows([b'111,7\n', b'222,4\n', b'111,abc\n'], 'csv')
+        with self.assertRaises(StocktakeFormatError):
+            apply_stocktake(rows, chunk_size=1)
+        self.assertEqual(self.stocks(), {'prod_1': 10, 'prod_2': 5})
+        self.assertFalse(StockMovement.objects.exists())
+        response = self.client.post('/api/stocktake/?file_format=csv', data=b'111,7\n222,x\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stocks(), {'prod_1': 10, 'prod_2': 5})
+
+    def test_count_below_reservations_is_rejected(self):
+        Warehouse.objects.create(id='wh_1', name='Asosiy')
+        WarehouseProduct.objects.create(id='wp_1', warehouse_id='wh_1', product_id='prod_1', quantity=10,
+                                        reserved_quantity=4)
+        url = '/api/stocktake/?file_format=csv&warehouse_id=wh_1'
+        # Mahsulot ikki bo'lakda sanaladi: yig'indi (2 + 3) bronlardan kam
+        with self.assertRaises(InsufficientStock):
+            apply_stocktake(iter_count_rows([b'111,2\n', b'222,4\n', b'111,1\n'], 'csv'), warehouse_id='wh_1',
+                            chunk_size=1)
+        response = self.client.post(url, data=b'111,3\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual((WarehouseProduct.objects.get().quantity, self.stocks()['prod_1']), (10, 10))
+        self.assertFalse(StockMovement.objects.exists())
+        response = self.client.post(url, data=b'111,2\n111,3\n', content_type='text/csv')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((WarehouseProduct.objects.get().quantity, self.stocks()['prod_1']), (5, 5))
+
+
+class StockTransferTests(TestCase):
+    """Omborlar orasida ko'chirish: qoldiqlar, yetishmaslik va qatorlar soniga bog'liq bo'lmagan so'rovlar soni."""
+
+    def setUp(self):
+        Warehouse.objects.create(id='wh_from', name='Manba')
+        Warehouse.objects.create(id='wh_to', name='Qabul qiluvchi')
+        for i in range(300):
+            make_product(f'prod_{i}', stock=10)
+            WarehouseProduct.objects.create(id=f'whp_{i}', warehouse_id='wh_from', product_id=f'prod_{i}', quantity=10)
+        self.client, _ = authorized_client('manage_warehouse')
+
+    def transfer(self, items):
+        return self.client.post('/api/stock-transfers/', {
+            'fromWarehouseId': 'wh_from', 'toWarehouseId': 'wh_to',
+            'items': [{'productId': product_id, 'quantity': quantity} for product_id, quantity in items],
+        }, format='json')
+
+    def quantities(self, warehouse_id):
+        return dict(WarehouseProduct.objects.filter(warehouse_id=warehouse_id).values_list('product_id', 'quantity'))
+
+    def test_moves_stock_between_warehouses(self):
+        WarehouseProduct.objects.filter(pk='whp_1').update(reserved_quantity=2)
+        response = self.transfer([('prod_0', 4), ('prod_1', 3), ('prod_0', 1)])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((self.quantities('wh_from')['prod_0'], self.quantities('wh_from')['prod_1']), (5, 7))
+        self.assertEqual(self.quantities('wh_to'), {'prod_0': 5, 'prod_1': 3})
+        self.assertEqual(StockMovement.objects.filter(relatedId=response.data['id']).count(), 4)
+        self.assertEqual(Product.objects.get(pk='prod_0').stock, 10)
+
+    def test_insufficient_unreserved_stock_rolls_back(self):
+        WarehouseProduct.objects.filter(pk='whp_1').update(reserved_quantity=8)
+        response = self.transfer([('prod_0', 4), ('prod_1', 3)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.quantities('wh_from')['prod_0'], 10)
+        self.assertEqual(self.quantities('wh_to'), {})
+        self.assertFalse(StockTransfer.objects.exists())
+
+    def test_query_count_does_not_depend_on_line_count(self):
+        # SQLite uchun Django bulk_create ni 999 parametrlik bo'laklarga bo'ladi; Postgres'dagidek
+        # har bir INSERT bitta so'rov bo'lishi uchun chegara oshiriladi
+        counts = []
+        self.transfer([('prod_299', 1)])  # rollar keshini isitish
+        with mock.patch.object(connection.features, 'max_query_params', 100000):
+            for size, offset in ((3, 0), (250, 40)):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.transfer([(f'prod_{offset + i}', 1) for i in range(size)])
+                self.assertEqual(response.status_code, 201, response.data)
+                counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class SaleBatchSyncTests(TestCase):
+    """Oflayn paket: tana shakli, paket ichidagi va avval saqlangan clientId takrorlari."""
+
+    def setUp(self):
+        make_product('prod_1', stock=5)
+        self.client, _ = authorized_client('use_sales_terminal')
+
+    def sync(self, sales):
+        return self.client.post('/api/sales/batch/', {'sales': sales}, format='json')
+
+    def test_body_must_be_an_object(self):
+        response = self.client.post('/api/sales/batch/', [sale_payload(('prod_1', 1), clientId='c1')], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_duplicates_inside_batch_and_across_batches(self):
+        response = self.sync([sale_payload(('prod_1', 1), clientId='c1'), sale_payload(('prod_1', 1), clientId='c1')])
+        first, repeat = response.data['results']
+        self.assertEqual(first['status'], 'created')
+        self.assertEqual((repeat['status'], repeat['id']), ('duplicate', first['id']))
+        again = self.sync([sale_payload(('prod_1', 1), clientId='c1')]).data['results'][0]
+        self.assertEqual((again['status'], again['id']), ('duplicate', first['id']))
+        self.assertEqual(Product.objects.get(pk='prod_1').stock, 4)
+
+    def test_repeat_of_rejected_sale_is_rejected(self):
+        response = self.sync([sale_payload(('prod_1', 9), clientId='c1'), sale_payload(('prod_1', 9), clientId='c1'),
+                              sale_payload(('prod_1', 2), clientId='c2')])
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['rejected', 'rejected', 'created'])
+        self.assertTrue(response.data['results'][1]['errors'])
+        self.assertEqual(Product.objects.get(pk='prod_1').stock, 3)
+
+
+class ShiftCounterTests(TestCase):
+    """Smena hisoblagichlari: savdolar qo'shiladi, eski oflayn savdolar va yopilgan smena o'zgarmaydi."""
+
+    def setUp(self):
+        make_product('prod_1', stock=100)
+        self.client, self.employee = authorized_client('use_sales_terminal')
+        response = self.client.post('/api/shifts/open/', {'openingCash': '10000'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.shift_id = response.data['id']
+
+    def shift(self):
+        return Shift.objects.get(pk=self.shift_id)
+
+    def test_sales_increment_open_shift(self):
+        self.client.post('/api/sales/', sale_payload(('prod_1', 2)), format='json')
+        payload = sale_payload(('prod_1', 1))
+        payload['payments'] = [{'type': 'plastik', 'amount': payload['total']}]
+        self.client.post('/api/sales/', payload, format='json')
+        shift = self.shift()
+        self.assertEqual((shift.salesCount, shift.total, shift.cash, shift.card),
+                         (2, Decimal('3750'), Decimal('2500'), Decimal('1250')))
+        report = self.client.get(f'/api/shifts/{self.shift_id}/z-report/').data
+        self.assertEqual((report['expectedCash'], report['averageTicket']), ('12500.00', '1875.00'))
+
+    def test_offline_sale_before_shift_opened_is_not_attached(self):
+        old = (timezone.now() - timedelta(days=3)).isoformat()
+        response = self.client.post('/api/sales/batch/', {'sales': [sale_payload(('prod_1', 1), clientId='c1', date=old)]},
+                                    format='json')
+        self.assertEqual(response.data['results'][0]['status'], 'created')
+        self.assertIsNone(Sale.objects.get(clientId='c1').shift_id)
+        self.assertEqual(self.shift().salesCount, 0)
+
+    def test_closed_shift_counters_do_not_change(self):
+        self.client.post('/api/sales/', sale_payload(('prod_1', 1)), format='json')
+        response = self.client.post(f'/api/shifts/{self.shift_id}/close/', {'closingCash': '11250'}, format='json')
+        self.assertEqual(response.data['cashDifference'], '0.00')
+        self.client.post('/api/sales/', sale_payload(('prod_1', 1)), format='json')
+        record_shift_sales([Sale(id='sale_late', shift_id=self.shift_id, total=Decimal('500'))], [])
+        self.assertEqual((self.shift().salesCount, self.shift().total), (1, Decimal('1250')))
+
+
+class SaleReceiptTests(TestCase):
+    """?response=receipt: chekdagi qoldiq UPDATE dan keyingi haqiqiy qiymat."""
+
+    def test_receipt_stock_reflects_concurrent_sales(self):
+        make_product('prod_1', stock=10)
+        seller = Employee.objects.create_user(phone='901', name='Ali', password='1234', id='emp_1')
+        serializer = SaleSerializer(data=sale_payload(('prod_1', 2)))
+        serializer.is_valid(raise_exception=True)
+        # Tekshiruvdan keyin parallel savdo qoldiqni kamaytirdi
+        Product.objects.filter(pk='prod_1').update(stock=7)
+        sale = serializer.save(seller=seller)
+        receipt = SaleReceiptSerializer.for_sale(sale, serializer.validated_data).data
+        self.assertEqual(receipt['stock'], {'prod_1': 5.0})
+
+
+class WeightedAverageCostTests(TestCase):
+    """receipts.receive_product_stock: o'rtacha tannarx Decimal da, manfiy qoldiq nol deb olinadi."""
+
+    def cost(self, pk):
+        return Product.objects.get(pk=pk).averageCost
+
+    def test_average_cost_is_exact_decimal(self):
+        make_product('prod_1', stock=3, averageCost=Decimal('1000.1'))
+        receive_product_stock({'prod_1': 7}, {'prod_1': Decimal('7') * Decimal('1234.57')}, {'prod_1': Decimal('1234.57')})
+        # (1000.1 * 3 + 1234.57 * 7) / 10
+        self.assertEqual(self.cost('prod_1'), Decimal('1164.229'))
+        self.assertEqual(Product.objects.get(pk='prod_1').stock, 10)
+
+    def test_repeated_receipts_do_not_drift(self):
+        make_product('prod_1', stock=0, averageCost=Decimal('0'))
+        for _ in range(50):
+            receive_product_stock({'prod_1': 0.1}, {'prod_1': Decimal('33.33') * Decimal('0.1')}, {'prod_1': Decimal('33.33')})
+        self.assertEqual(self.cost('prod_1'), Decimal('33.33'))
+
+    def test_negative_stock_counts_as_zero(self):
+        make_product('prod_1', stock=-4, averageCost=Decimal('500'))
+        receive_product_stock({'prod_1': 2}, {'prod_1': Decimal('1500')}, {'prod_1': Decimal('750')})
+        product = Product.objects.get(pk='prod_1')
+        self.assertEqual((product.averageCost, product.stock, product.purchasePrice), (Decimal('750'), -2, Decimal('750')))
+
+
+class RoleCacheTests(TestCase):
+    """JWT role/perms claim'lari: so'rovsiz avtorizatsiya va o'zgarishlarning worker'larga tarqalishi."""
+
+    def setUp(self):
+        role_cache.invalidate()
+        self.client, self.employee = authorized_client('manage_settings')
+        self.assertEqual(self.client.get('/api/units/').status_code, 200)
+
+    def other_worker_commits(self, **changes):
+        # Boshqa worker'dagi o'zgarish: bu jarayonning signallari ishlamaydi, faqat umumiy versiya almashadi
+        Employee.objects.filter(pk=self.employee.pk).update(**changes)
+        cache.set(role_cache.VERSION_KEY, 'other-worker')
+
+    def test_authorized_request_makes_no_auth_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/api/units/').status_code, 200)
+        # /api/units/ ning o'zi bitta so'rov
+        self.assertEqual(len(ctx), 1)
+
+    def test_deactivation_in_other_worker_applies_immediately(self):
+        self.other_worker_commits(is_active=False)
+        self.assertEqual(self.client.get('/api/units/').status_code, 401)
+
+    def test_commit_publishes_new_version(self):
+        version = cache.get(role_cache.VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.role.permissions = ['view_reports']
+            self.employee.role.save()
+        self.assertNotEqual(cache.get(role_cache.VERSION_KEY), version)
+        self.assertEqual(self.client.get('/api/units/').status_code, 403)
+
+    def test_unknown_permission_is_denied(self):
+        with self.assertLogs('api.permissions', 'WARNING'):
+            self.assertFalse(has_permission(self.employee, 'manage_setings'))
+        # Rolda qolib ketgan noma'lum ruxsat qolgan ruxsatlarni buzmaydi
+        Role.objects.filter(pk=self.employee.role_id).update(permissions=['manage_settings', 'eski_ruxsat'])
+        role_cache.publish_change()
+        with self.assertLogs('api.models', 'WARNING'):
+            self.assertEqual(self.client.get('/api/units/').status_code, 200)
+        serializer = RoleSerializer(data={'name': 'Yangi', 'permissions': ['manage_settings', 'manage_setings']})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('permissions', serializer.errors)
+
+
+class PinLoginTests(TestCase):
+    """LoginView: PIN digest bo'yicha topiladi; digest'siz eski xodimlar birinchi kirishda uni oladi."""
+
+    def setUp(self):
+        cache.clear()
+        self.employee = Employee.objects.create_user(phone='901', name='Ali', password='1234', id='emp_1')
+        self.legacy = Employee.objects.create_user(phone='902', name='Vali', password='5678', id='emp_2')
+        Employee.objects.filter(pk='emp_2').update(pin_lookup=None)
+
+    def login(self, pin, **extra):
+        return APIClient().post('/api/auth/login/', {'pin': pin, **extra}, format='json')
+
+    def test_login_by_digest(self):
+        with mock.patch.object(Employee, 'check_password', autospec=True, return_value=True) as check_password:
+            response = self.login('1234')
+        self.assertEqual((response.status_code, response.data['employee']['id']), (200, 'emp_1'))
+        self.assertEqual(check_password.call_count, 1)
+
+    def test_legacy_employee_first_login_sets_digest(self):
+        response = self.login('5678')
+        self.assertEqual((response.status_code, response.data['employee']['id']), (200, 'emp_2'))
+        self.legacy.refresh_from_db()
+        self.assertEqual(self.legacy.pin_lookup, make_pin_lookup('5678'))
+        out = StringIO()
+        call_command('legacy_pins', stdout=out)
+        self.assertNotIn('emp_2', out.getvalue())
+
+    def test_phone_scopes_legacy_check(self):
+        self.assertEqual(self.login('5678', phone='901').status_code, 401)
+        self.assertEqual(self.login('5678', phone='902').status_code, 200)
+
+    def test_legacy_scan_is_rate_limited(self):
+        with self.settings(LEGACY_PIN_SCANS_PER_MINUTE=2):
+            self.assertEqual([self.login('0000').status_code for _ in range(3)], [401, 401, 429])
+            # Telefon bilan tekshiruv bitta xodim bilan cheklangan, limitga tushmaydi
+            self.assertEqual(self.login('5678', phone='902').status_code, 200)
+            # Hamma digest olgach eski xodimlar qolmaydi: noto'g'ri PIN oddiy 401
+            self.assertEqual(self.login('0000').status_code, 401)
+
+
+class DeltaSyncTests(TestCase):
+    """?since=<cursor>: kursor xavfsizlik oynasidan o'tmaydi, eski kursor 410 oladi."""
+
+    def setUp(self):
+        self.client, _ = authorized_client('manage_settings')
+        self.age(3600)
+        self.base = ChangeLog.current_cursor()
+
+    def delta(self, since):
+        return self.client.get('/api/data/initial/', {'since': since})
+
+    def age(self, seconds):
+        ChangeLog.objects.update(date=timezone.now() - timedelta(seconds=seconds))
+
+    def product_ids(self, response):
+        return [row['id'] for row in response.data['products']]
+
+    def test_cursor_stops_before_safety_window(self):
+        make_product('prod_1')
+        self.age(3600)
+        settled = ChangeLog.current_cursor()
+        make_product('prod_2')
+        response = self.delta(self.base)
+        self.assertEqual(response.data['cursor'], settled)
+        self.assertEqual(set(self.product_ids(response)), {'prod_1', 'prod_2'})
+        # Oynadagi yozuv (masalan, kech commit bo'lgan kichik id) keyingi so'rovda yana o'qiladi
+        self.assertEqual(self.product_ids(self.delta(settled)), ['prod_2'])
+
+    def test_late_commit_below_cursor_is_not_skipped(self):
+        make_product('prod_1')
+        make_product('prod_2')
+        first = ChangeLog.objects.filter(object_id='prod_1').get()
+        # prod_1 yozuvi hali commit bo'lmagan: terminal faqat prod_2 ni ko'radi
+        first.delete()
+        response = self.delta(self.base)
+        self.assertEqual(self.product_ids(response), ['prod_2'])
+        ChangeLog.objects.create(id=first.id, model_name='product', object_id='prod_1')
+        self.assertIn('prod_1', self.product_ids(self.delta(response.data['cursor'])))
+
+    def test_pruned_cursor_gets_gone(self):
+        for index in range(3):
+            make_product(f'prod_{index}')
+        self.age(40 * 24 * 3600)
+        make_product('prod_new')
+        out = StringIO()
+        call_command('prune_changelog', stdout=out)
+        self.assertEqual(ChangeLog.objects.count(), 1)
+        self.assertEqual(self.delta(self.base).status_code, 410)
+        self.assertEqual(self.product_ids(self.delta(ChangeLog.current_cursor() - 1)), ['prod_new'])
+
+
+    def test_snapshot_is_rebuilt_after_late_commit(self):
+        snapshot.invalidate()
+        # Do'kon sozlamalari birinchi so'rovda yaratiladi
+        self.client.get('/api/data/initial/')
+        self.age(3600)
+        # prod_1 yozuvi kichik id oldi, lekin ma'lumoti prod_2 dan keyin commit bo'ladi
+        ChangeLog.objects.create(model_name='product', object_id='prod_1')
+        make_product('prod_2')
+        first = self.client.get('/api/data/initial/')
+        self.assertNotIn('prod_1', [row['id'] for row in json.loads(first.content)['products']])
+        Product.objects.bulk_create([Product(id='prod_1', name='prod_1', unit='dona', purchasePrice=1, salePrice=1,
+                                             stock=0, minStock=0)])
+        self.age(3600)
+        response = self.client.get('/api/data/initial/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertIn('prod_1', [row['id'] for row in body['products']])
+        self.assertEqual(body['cursor'], ChangeLog.current_cursor())
+
+# {model: kalit maydonlari}; qolgan maydonlari nol bo'lgan qatorlar hisobga olinmaydi
+ROLLUP_KEYS = {
+    DailySalesRollup: ('date',),
+    HourlySalesRollup: ('hour',),
+    HourlySellerSalesRollup: ('seller_id', 'hour'),
+    DailyProductSales: ('date', 'product_id'),
+    DailyPaymentRollup: ('date', 'type'),
+    DailyExpenseRollup: ('date', 'expenseTypeId'),
+}
+
+
+def rollup_state():
+    """Barcha yig'indi jadvallari {kalit: qiymatlar}: rebuild_rollups natijasi bilan solishtirish uchun."""
+    state = {}
+    for model, keys in ROLLUP_KEYS.items():
+        values = [field.attname for field in model._meta.concrete_fields if not field.primary_key and field.attname not in keys]
+        state[model.__name__] = {
+            row[:len(keys)]: row[len(keys):] for row in model.objects.values_list(*keys, *values) if any(row[len(keys):])
+        }
+    return state
+
+
+class SalesRollupTests(TestCase):
+    """Kunlik/soatlik yig'indilar savdo, xarajat va savdoni o'chirishda qayta hisoblangani bilan teng qoladi."""
+
+    def setUp(self):
+        make_product('prod_1', stock=100, averageCost=Decimal('800'))
+        make_product('prod_2', stock=100, averageCost=Decimal('900'))
+        self.client, self.employee = authorized_client('use_sales_terminal')
+
+    def sell(self, *items, payment_type='naqd', **extra):
+        payload = sale_payload(*items, **extra)
+        payload['payments'] = [{'type': payment_type, 'amount': payload['total']}]
+        response = self.client.post('/api/sales/', payload, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['id']
+
+    def assertMatchesRebuild(self):
+        incremental = rollup_state()
+        rebuild_rollups()
+        self.assertEqual(incremental, rollup_state())
+
+    def test_sales_and_expenses_match_rebuild(self):
+        self.sell(('prod_1', 2), ('prod_2', 1))
+        self.sell(('prod_1', 1.5), payment_type='plastik', date=(timezone.now() - timedelta(days=2)).isoformat())
+        expense_type = ExpenseType.objects.create(id='et_1', name='ijara', display_name='Ijara')
+        expense = Expense.objects.create(id='exp_1', amount=Decimal('300'), type=expense_type)
+        expense.amount = Decimal('450')
+        expense.save()
+        Expense.objects.create(id='exp_2', amount=Decimal('50'))
+        self.assertEqual(DailySalesRollup.objects.aggregate(total=Sum('total'))['total'], Decimal('5625'))
+        self.assertMatchesRebuild()
+
+    def test_deleted_sale_is_subtracted(self):
+        response = self.client.post('/api/shifts/open/', {'openingCash': '0'}, format='json')
+        shift = Shift.objects.get(pk=response.data['id'])
+        kept = self.sell(('prod_1', 1))
+        removed = self.sell(('prod_2', 3), payment_type='plastik')
+        Sale.objects.get(pk=removed).delete()
+        self.assertMatchesRebuild()
+        shift.refresh_from_db()
+        self.assertEqual((shift.salesCount, shift.total, shift.card), (1, Decimal('1250'), Decimal('0')))
+        self.assertTrue(Sale.objects.filter(pk=kept).exists())
+
+    def test_top_products_are_grouped_by_product(self):
+        make_product('prod_3', stock=100, name='prod_1')
+        self.sell(('prod_1', 2), ('prod_3', 1), ('prod_2', 1.5))
+        top = dashboard.compute_stats()['top_products']
+        self.assertEqual(top, [{'name': 'prod_1', 'total_sold': 2.0}, {'name': 'prod_2', 'total_sold': 1.5},
+                               {'name': 'prod_1', 'total_sold': 1.0}])
+
+    def test_admin_cannot_change_sales(self):
+        request = RequestFactory().get('/admin/api/sale/')
+        request.user = Employee.objects.create_superuser(phone='999', name='Admin', password='1234', id='emp_admin')
+        sale_admin = admin_site._registry[Sale]
+        self.assertFalse(sale_admin.has_change_permission(request))
+        self.assertFalse(sale_admin.has_delete_permission(request))
+
+
+class SalesTimeseriesTests(TestCase):
+    """/api/reports/timeseries/: soatlik yig'indilardan (seller_id bilan ham) Sale jadvali bilan bir xil natija."""
+
+    def setUp(self):
+        make_product('prod_1', stock=100)
+        self.client, self.employee = authorized_client('use_sales_terminal', 'view_reports')
+        self.other_client, self.other = authorized_client('use_sales_terminal', phone='901')
+        self.now = timezone.now().replace(minute=30, second=0, microsecond=0)
+        for index, (client, quantity, hours_ago) in enumerate(((self.client, 1, 0), (self.client, 2, 0),
+                                                               (self.other_client, 4, 0), (self.client, 1, 26))):
+            payload = sale_payload(('prod_1', quantity), clientId=f'c{index}',
+                                   date=(self.now - timedelta(hours=hours_ago)).isoformat())
+            response = client.post('/api/sales/batch/', {'sales': [payload]}, format='json')
+            self.assertEqual(response.data['results'][0]['status'], 'created')
+
+    def series(self, bucket, **params):
+        start = timezone.localdate(self.now - timedelta(days=2)).isoformat()
+        response = self.client.get('/api/reports/timeseries/', {'bucket': bucket, 'tz': 'Asia/Tashkent',
+                                                                 'start_date': start, **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def nonempty(self, data):
+        return [(row['start'], row['count'], row['total'], row['payments']) for row in data['results'] if row['count']]
+
+    def test_seller_filter_reads_seller_rollups(self):
+        for bucket in ('hour', 'day'):
+            data = self.series(bucket, seller_id=self.employee.pk)
+            self.assertEqual(data['source'], 'rollup')
+            self.assertEqual([(count, total) for _, count, total, _ in self.nonempty(data)],
+                             [(1, 1250.0), (2, 3750.0)])
+
+    def test_rollups_match_sales_table(self):
+        # Mijoz filtri Sale jadvalidan o'qiydi: barcha savdolar bitta mijozniki bo'lsa natija bir xil
+        customer = Customer.objects.create(id='cust_1', name='Mijoz', phone='1')
+        Sale.objects.update(customer=customer)
+        for bucket in ('hour', 'day', 'month'):
+            from_rollups, from_sales = self.series(bucket), self.series(bucket, customer_id='cust_1')
+            self.assertEqual((from_rollups['source'], from_sales['source']), ('rollup', 'sales'))
+            self.assertEqual(self.nonempty(from_rollups), self.nonempty(from_sales))
+
+
+class ExportTests(TestCase):
+    """Eksport: formula bilan boshlangan matn zararsizlantiriladi, sonlar o'zgarmaydi, bo'laklarda savdo takrorlanmaydi."""
+
+    def setUp(self):
+        make_product('prod_1', stock=100, name='=HYPERLINK("http://x","y")')
+        make_product('prod_2', stock=100, name='-Chegirma')
+        self.client, self.employee = authorized_client('use_sales_terminal', 'view_reports')
+        self.start = timezone.now() - timedelta(days=1)
+        for index, product_id in enumerate(('prod_1', 'prod_2', 'prod_1')):
+            response = self.client.post('/api/sales/', sale_payload((product_id, index + 1)), format='json')
+            self.assertEqual(response.status_code, 201, response.data)
+        StockMovement.objects.create(product_id='prod_1', quantity=-2, comment='@SUM(A1)',
+                                     type=StockMovement.MovementType.KIRIM)
+
+    def export(self, dataset, file_format):
+        stream, _ = export_stream(dataset, file_format, self.start, timezone.now())
+        return b''.join(stream)
+
+    def test_csv_neutralizes_formulas(self):
+        response = self.client.get('/api/exports/movements/', {'file_format': 'csv'})
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        names = {row[4] for row in rows[1:]}
+        self.assertEqual(names, {'\'=HYPERLINK("http://x","y")', "'-Chegirma"})
+        manual = next(row for row in rows[1:] if row[8].startswith("'"))
+        self.assertEqual((manual[6], manual[8]), ('-2.0', "'@SUM(A1)"))
+
+    def test_xlsx_neutralizes_formulas(self):
+        with zipfile.ZipFile(BytesIO(self.export('sales', 'xlsx'))) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn("<t xml:space=\"preserve\">'=HYPERLINK(\"http://x\",\"y\")</t>", sheet)
+        self.assertIn("<t xml:space=\"preserve\">'-Chegirma</t>", sheet)
+        self.assertNotIn('<t xml:space="preserve">=', sheet)
+
+    def test_sale_chunks_with_equal_dates(self):
+        # Bo'laklar sana oralig'i bo'yicha olinadi: chegaradagi bir xil sanali savdolar ikki marta chiqmasligi kerak
+        Sale.objects.update(date=timezone.now() - timedelta(hours=1))
+        rows = list(sale_rows(self.start, timezone.now(), chunk_size=2))[1:]
+        self.assertEqual(sorted((row[0], row[-3]) for row in rows),
+                         sorted(CartItem.objects.values_list('sale_id', 'quantity')))
+
+
+class IdempotencyKeyTests(TestCase):
+    """Idempotency-Key: takroriy so'rov saqlangan javobni oladi, savdo va qoldiq ikki marta yozilmaydi."""
+
+    def setUp(self):
+        self.product = make_product('prod_1', stock=10)
+        self.client, self.employee = authorized_client('use_sales_terminal')
+
+    def post(self, payload, key='key-1'):
+        return self.client.post('/api/sales/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response(self):
+        payload = sale_payload(('prod_1', 2))
+        first, second = self.post(payload), self.post(payload)
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Sale.objects.count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 8)
+
+    def test_key_reused_with_different_body(self):
+        self.assertEqual(self.post(sale_payload(('prod_1', 1))).status_code, 201)
+        self.assertEqual(self.post(sale_payload(('prod_1', 3))).status_code, 422)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_in_progress_key_conflicts(self):
+        payload = sale_payload(('prod_1', 1))
+        self.assertEqual(self.post(payload, key='key-2').status_code, 201)
+        IdempotencyKey.objects.filter(key='key-2').update(response_status=None, response_body=None)
+        # Boshqa so'rov hali bajarilayotgandek: ish qayta bajarilmaydi
+        response = self.post(payload, key='key-2')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Sale.objects.count(), 1)
+
+    def test_failed_request_releases_key(self):
+        self.assertEqual(self.post(sale_payload(('prod_1', 20))).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        response = self.post(sale_payload(('prod_1', 20)))
+        self.assertEqual(response.status_code, 400)
+
+
+class StockAsOfTests(TestCase):
+    """stock_as_of: snapshot + keyingi harakatlar natijasi butun harakatlar tarixini yig'ish bilan teng."""
+
+    def setUp(self):
+        self.product = make_product('prod_1')
+        self.warehouse = Warehouse.objects.create(id='wh_1', name='Ombor')
+        self.today = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        Kind = StockMovement.MovementType
+        for days_ago, kind, quantity, warehouse in ((4, Kind.KIRIM, 10, self.warehouse), (3, Kind.SAVDO, 3, None),
+                                                    (2, Kind.KIRIM, 5, self.warehouse), (1, Kind.CHIQIM, 2, None),
+                                                    (0, Kind.SAVDO, 1, None)):
+            movement = StockMovement.objects.create(product=self.product, type=kind, quantity=quantity,
+                                                    warehouse=warehouse)
+            StockMovement.objects.filter(pk=movement.pk).update(date=self.today - timedelta(days=days_ago))
+        Product.objects.filter(pk='prod_1').update(stock=9)
+        WarehouseProduct.objects.create(id='wp_1', warehouse=self.warehouse, product=self.product, quantity=15)
+
+    def expected(self, moment, warehouse_id=None):
+        movements = StockMovement.objects.filter(date__lte=moment)
+        if warehouse_id is not None:
+            movements = movements.filter(warehouse_id=warehouse_id)
+        return sum(m.quantity if m.type in StockMovement.INCOMING_TYPES else -m.quantity for m in movements)
+
+    def assertMatchesHistory(self):
+        for hours_ago in range(0, 5 * 24 + 1, 7):
+            moment = self.today - timedelta(hours=hours_ago)
+            for warehouse_id in (None, 'wh_1'):
+                balances, _ = stock_as_of(moment, warehouse_id=warehouse_id)
+                self.assertAlmostEqual(balances.get(('prod_1', warehouse_id), 0),
+                                       self.expected(moment, warehouse_id), msg=(moment, warehouse_id))
+
+    def test_without_snapshots(self):
+        self.assertMatchesHistory()
+
+    def test_with_snapshots(self):
+        call_command('build_stock_snapshots', backfill_days=4, stdout=StringIO())
+        self.assertEqual(StockSnapshot.objects.count(), 5)
+        self.assertMatchesHistory()
+
+    def test_incremental_build_matches_full_build(self):
+        build_stock_snapshots(backfill_days=4)
+        full = set(StockSnapshotBalance.objects.values_list('snapshot__date', 'product_id', 'warehouse_id', 'quantity'))
+        StockSnapshot.objects.exclude(pk=StockSnapshot.objects.order_by('date').first().pk).delete()
+        build_stock_snapshots()
+        self.assertEqual(set(StockSnapshotBalance.objects.values_list(
+            'snapshot__date', 'product_id', 'warehouse_id', 'quantity')), full)
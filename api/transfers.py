@@ -0,0 +1,67 @@
+from collections import defaultdict
+
+from django.db.models import F, FloatField, OuterRef, Subquery
+from django.utils import timezone
+import shortuuid
+
+from .models import StockTransfer, StockTransferItem, StockMovement, WarehouseProduct, ChangeLog
+from .stock import InsufficientStock, warehouse_available
+
+
+def create_transfer(validated_data, employee=None):
+    """
+    Ko'chirish hujjatini saqlaydi: avval hujjat qatorlari yoziladi, so'ng ikkala ombordagi qoldiq
+    shu qatorlarni subquery orqali o'qiydigan bittadan set-based UPDATE bilan o'zgartiriladi, shuning
+    uchun so'rovlar soni qatorlar soniga bog'liq emas (faqat bulk_create ning backend parametrlari
+    chegarasidagi bo'laklari). Manba ombor qatorlari qulflanib tekshiriladi: bron qilinmagan qoldiq
+    yetmasa yoki qator yo'q bo'lsa InsufficientStock. Product.stock o'zgarmaydi.
+    transaction.atomic() ichida chaqirilishi kerak.
+    """
+    data = dict(validated_data)
+    items_data = data.pop('items')
+    transfer = StockTransfer(id=f"trf_{shortuuid.random(length=12)}", employee=employee, **data)
+    quantities = defaultdict(float)
+    for item_data in items_data:
+        quantities[item_data['product'].pk] += item_data['quantity']
+    source, destination = transfer.fromWarehouse_id, transfer.toWarehouse_id
+
+    transfer.save(force_insert=True)
+    StockTransferItem.objects.bulk_create([
+        StockTransferItem(transfer=transfer, product_id=product_id, quantity=quantity)
+        for product_id, quantity in quantities.items()
+    ])
+    product_ids = StockTransferItem.objects.filter(transfer=transfer).values('product_id')
+    moved = Subquery(StockTransferItem.objects.filter(transfer=transfer, product_id=OuterRef('product_id'))
+                     .values('quantity')[:1], output_field=FloatField())
+    now = timezone.now()
+
+    available = dict(WarehouseProduct.objects.select_for_update().filter(warehouse_id=source, product_id__in=product_ids)
+                     .order_by('product_id').annotate(_available=warehouse_available())
+                     .values_list('product_id', '_available'))
+    for product_id, quantity in quantities.items():
+        if available.get(product_id, 0) < quantity:
+            raise InsufficientStock(product_id, available.get(product_id, 0), quantity, warehouse_id=source)
+    WarehouseProduct.objects.filter(warehouse_id=source, product_id__in=product_ids)\
+        .update(quantity=F('quantity') - moved, updated_at=now)
+
+    existing = set(WarehouseProduct.objects.filter(warehouse_id=destination, product_id__in=product_ids)
+                   .values_list('product_id', flat=True))
+    WarehouseProduct.objects.bulk_create([
+        WarehouseProduct(id=f"wh_prod_{shortuuid.random(length=10)}", warehouse_id=destination, product_id=product_id)
+        for product_id in quantities if product_id not in existing
+    ], ignore_conflicts=True)
+    WarehouseProduct.objects.filter(warehouse_id=destination, product_id__in=product_ids)\
+        .update(quantity=F('quantity') + moved, updated_at=now)
+    ChangeLog.record(WarehouseProduct, WarehouseProduct.objects.filter(
+        warehouse_id__in=[source, destination], product_id__in=product_ids).values_list('pk', flat=True))
+
+    comment = f"Ko'chirish: {transfer.id}"
+    movements = []
+    for product_id, quantity in quantities.items():
+        movements.append(StockMovement(product_id=product_id, warehouse_id=source, quantity=quantity,
+                                       type=StockMovement.MovementType.KOCHIRISH_CHIQIM, relatedId=transfer.id, comment=comment))
+        movements.append(StockMovement(product_id=product_id, warehouse_id=destination, quantity=quantity,
+                                       type=StockMovement.MovementType.KOCHIRISH_KIRIM, relatedId=transfer.id, comment=comment))
+    StockMovement.objects.bulk_create(movements)
+    ChangeLog.record(StockMovement, [movement.pk for movement in movements])
+    return transfer
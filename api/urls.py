@@ -20,9 +20,31 @@ urlpatterns = [
     path('auth/login/', LoginView.as_view(), name='login'),
     path('auth/me/', MeView.as_view(), name='me'),
     path('data/initial/', InitialDataView.as_view(), name='initial-data'),
+    path('data/initial/stream/', InitialDataStreamView.as_view(), name='initial-data-stream'),
     path('settings/', SettingsView.as_view(), name='settings'),
     path('sales/', SaleCreateView.as_view(), name='create-sale'),
+    path('sales/history/', SalesHistoryView.as_view(), name='sales-history'),
+    path('sales/batch/', SaleBatchSyncView.as_view(), name='sale-batch-sync'),
+    path('reservations/', StockReservationCreateView.as_view(), name='create-reservation'),
+    path('reservations/<str:cart_id>/', StockReservationReleaseView.as_view(), name='release-reservation'),
+    path('stock-transfers/', StockTransferCreateView.as_view(), name='create-stock-transfer'),
     path('goods-receipts/', GoodsReceiptCreateView.as_view(), name='create-goods-receipt'),
+    path('goods-receipts/history/', GoodsReceiptHistoryView.as_view(), name='goods-receipt-history'),
+    path('goods-receipts/<str:pk>/', GoodsReceiptDetailView.as_view(), name='goods-receipt-detail'),
     path('debt-payments/', DebtPaymentCreateView.as_view(), name='create-debt-payment'),
+    path('stocktake/', StocktakeImportView.as_view(), name='stocktake-import'),
+    path('stock/as-of/', StockAsOfView.as_view(), name='stock-as-of'),
+    path('reports/top-products/', TopProductsReportView.as_view(), name='report-top-products'),
+    path('reports/gross-margin/', GrossMarginReportView.as_view(), name='report-gross-margin'),
+    path('reports/abc/', AbcReportView.as_view(), name='report-abc'),
+    path('reports/timeseries/', SalesTimeseriesView.as_view(), name='report-timeseries'),
+    path('shifts/open/', ShiftOpenView.as_view(), name='open-shift'),
+    path('shifts/current/', CurrentShiftView.as_view(), name='current-shift'),
+    path('shifts/<str:pk>/close/', ShiftCloseView.as_view(), name='close-shift'),
+    path('shifts/<str:pk>/z-report/', ZReportView.as_view(), name='shift-z-report'),
+    path('reports/sellers/', SellerPerformanceReportView.as_view(), name='report-sellers'),
+    path('reports/debt-aging/', DebtAgingReportView.as_view(), name='report-debt-aging'),
+    path('customers/<str:pk>/statement/', CustomerStatementView.as_view(), name='customer-statement'),
+    path('exports/<str:dataset>/', ExportView.as_view(), name='export'),
     path('dashboard/stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
 ]
\ No newline at end of file
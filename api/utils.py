@@ -0,0 +1,11 @@
+from itertools import islice
+
+
+def iter_chunks(iterable, size):
+    """iterable ni size elementli ro'yxatlarga bo'ladi (oxirgisi qisqaroq bo'lishi mumkin)."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
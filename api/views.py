@@ -2,15 +2,66 @@ from rest_framework import viewsets, status, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.db import transaction
-from django.db.models import Sum, Count
+from rest_framework.renderers import JSONRenderer
+from rest_framework.exceptions import NotFound, ValidationError
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.db.models import Sum, Count, Exists, F, OuterRef, Prefetch
 from django.utils import timezone
-from datetime import timedelta
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+import zoneinfo
 import shortuuid
 from .models import *
 from .serializers import *
-from .permissions import HasPermission
+from .fast_serializers import (
+    FastProductSerializer, FastCustomerSerializer, FastSaleSerializer, FastStockMovementSerializer,
+    FastWarehouseProductSerializer, decimal_field,
+)
+from .pagination import KeysetPagination
+from .permissions import HasPermission, has_permission
+from .idempotency import IdempotentCreateMixin
+from .sales import create_sales
+from .stock import InsufficientStock, adjust_product_stock, record_warehouse_changes, release_reservations, stock_as_of
+from .stocktake import StocktakeFormatError, apply_stocktake, iter_count_rows
+from .utils import iter_chunks
+from .analytics import TimeseriesError, sales_timeseries
+from .exports import CONTENT_TYPES, ExportError, export_stream
+from .shifts import ShiftError, close_shift, open_shift, seller_performance, z_report
+from .debts import customer_statement, debt_aging, post_debt_entries
+from . import dashboard, snapshot
+from .authentication import token_for_employee
+
+def legacy_pin_candidates(request):
+    """
+    pin_lookup'siz (digest joriy qilinishidan oldingi) faol xodimlar: PIN digest bo'yicha topilmasa
+    ular orasidan tekshiriladi. phone berilsa faqat o'sha xodim, aks holda har IP manzil uchun
+    daqiqasiga LEGACY_PIN_SCANS_PER_MINUTE marta (har tekshiruv ularning hammasini xeshlaydi).
+    Limitdan oshsa None. Xodim birinchi muvaffaqiyatli kirishda digest oladi, shuning uchun ro'yxat kamayib boradi.
+    """
+    legacy = Employee.objects.filter(pin_lookup__isnull=True, is_active=True)
+    phone = request.data.get('phone')
+    if phone:
+        return legacy.filter(phone=phone)
+    if not legacy.exists():
+        return legacy
+    key = f"api.login.legacy_scan.{request.META.get('REMOTE_ADDR')}"
+    cache.add(key, 0, timeout=60)
+    try:
+        attempts = cache.incr(key)
+    except ValueError:
+        # Kalit shu orada muddati o'tib o'chdi
+        cache.set(key, 1, timeout=60)
+        attempts = 1
+    if attempts > getattr(settings, 'LEGACY_PIN_SCANS_PER_MINUTE', 10):
+        return None
+    return legacy
+
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
@@ -18,12 +69,24 @@ class LoginView(APIView):
         pin = request.data.get('pin')
         if not pin: return Response({'error': 'PIN is required'}, status=status.HTTP_400_BAD_REQUEST)
         user = None
-        for employee in Employee.objects.all():
+        for employee in Employee.objects.filter(pin_lookup=make_pin_lookup(pin)):
             if employee.check_password(pin):
                 user = employee
                 break
+        if user is None:
+            candidates = legacy_pin_candidates(request)
+            if candidates is None:
+                return Response({'error': 'Too many login attempts, try again later'},
+                                status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': '60'})
+            for employee in candidates:
+                if employee.check_password(pin):
+                    user = employee
+                    # Keyingi kirishlar digest bo'yicha topiladi
+                    user.pin_lookup = make_pin_lookup(pin)
+                    user.save(update_fields=['pin_lookup'])
+                    break
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = token_for_employee(user)
             employee_data = EmployeeSerializer(user).data
             return Response({'token': str(refresh.access_token), 'employee': employee_data})
         return Response({'error': 'Invalid PIN'}, status=status.HTTP_401_UNAUTHORIZED)
@@ -31,138 +94,265 @@ class LoginView(APIView):
 class MeView(generics.RetrieveAPIView):
     serializer_class = EmployeeSerializer
     permission_classes = [IsAuthenticated]
-    def get_object(self): return self.request.user
+    def get_object(self): return Employee.objects.select_related('role').get(pk=self.request.user.pk)
+
+class DataSection:
+    """
+    /api/data/initial/ javobidagi bitta ro'yxat: kalit, queryset va serializer.
+    normalized rejimda ichma-ich obyektlar o'rniga id'lar qaytadi, keyed bo'limlar esa
+    {id: obyekt} jadvali ko'rinishida beriladi.
+    """
+
+    def __init__(self, key, model, queryset, serializer_class, limit=None,
+                 normalized_queryset=None, normalized_serializer_class=None, keyed=False,
+                 fast_serializer_class=None):
+        self.key = key
+        self.model = model
+        self.queryset = queryset
+        self.serializer_class = serializer_class
+        self.limit = limit
+        self.normalized_queryset = normalized_queryset or queryset
+        self.normalized_serializer_class = normalized_serializer_class or serializer_class
+        self.keyed = keyed
+        self.fast_serializer_class = fast_serializer_class
+
+    def base_queryset(self, normalized=False):
+        return self.normalized_queryset() if normalized else self.queryset()
+
+    def get_queryset(self, normalized=False):
+        queryset = self.base_queryset(normalized)
+        if self.limit:
+            queryset = queryset[:self.limit]
+        return queryset
+
+    def is_table(self, normalized):
+        return normalized and self.keyed
+
+    def serialize(self, objects, normalized=False):
+        if not normalized:
+            return self.serializer_class(objects, many=True).data
+        data = self.normalized_serializer_class(objects, many=True).data
+        if self.keyed:
+            return {row['id']: row for row in data}
+        return data
+
+    def serialize_queryset(self, queryset, normalized=False):
+        # Oddiy ko'rinishda values_list asosidagi tezkor serializer (natija bir xil)
+        if self.fast_serializer_class and not normalized:
+            return self.fast_serializer_class(queryset).data
+        return self.serialize(queryset, normalized)
+
+    def iter_serialized(self, chunk_size, normalized=False):
+        """Bo'limni chunk_size qatorlik bo'laklarda serializatsiya qiladi (.iterator() bilan)."""
+        if self.fast_serializer_class and not normalized:
+            fast = self.fast_serializer_class(None)
+            rows = fast.values(self.base_queryset())
+            if self.limit:
+                rows = rows[:self.limit]
+            for chunk in iter_chunks(rows.iterator(chunk_size=chunk_size), chunk_size):
+                yield fast.serialize_rows(chunk)
+            return
+        for chunk in iter_chunks(self.get_queryset(normalized).iterator(chunk_size=chunk_size), chunk_size):
+            yield self.serialize(chunk, normalized)
+
+
+def get_store_settings():
+    settings_obj, _ = StoreSettings.objects.get_or_create(id='singleton', defaults={'name': 'My Store', 'currency': 'UZS', 'address': 'Default Address', 'phone': 'Default Phone'})
+    return settings_obj
+
+
+# Javobdagi kalitlar tartibi frontend kutgani bilan bir xil; 'settings' alohida obyekt
+INITIAL_DATA_SECTIONS = [
+    DataSection('products', Product, lambda: Product.objects.all(), ProductSerializer, keyed=True,
+                fast_serializer_class=FastProductSerializer),
+    DataSection('customers', Customer, lambda: Customer.objects.all(), CustomerSerializer, keyed=True,
+                fast_serializer_class=FastCustomerSerializer),
+    DataSection('suppliers', Supplier, lambda: Supplier.objects.all(), SupplierSerializer, keyed=True),
+    DataSection('sales', Sale, lambda: Sale.objects.select_related('seller', 'seller__role', 'customer').prefetch_related('items__product', 'payments').order_by('-date'), SaleSerializer, limit=200,
+                normalized_queryset=lambda: Sale.objects.prefetch_related('items', 'payments').order_by('-date'),
+                normalized_serializer_class=NormalizedSaleSerializer, fast_serializer_class=FastSaleSerializer),
+    DataSection('debtPayments', DebtPayment, lambda: DebtPayment.objects.order_by('-date'), DebtPaymentSerializer, limit=200),
+    DataSection('settings', StoreSettings, None, StoreSettingsSerializer),
+    DataSection('units', Unit, lambda: Unit.objects.all(), UnitSerializer, keyed=True),
+    DataSection('goodsReceipts', GoodsReceipt, lambda: GoodsReceipt.objects.select_related('supplier', 'warehouse').prefetch_related('items__product').order_by('-date'), GoodsReceiptSerializer, limit=100,
+                normalized_queryset=lambda: GoodsReceipt.objects.prefetch_related('items').order_by('-date'),
+                normalized_serializer_class=NormalizedGoodsReceiptSerializer),
+    DataSection('roles', Role, lambda: Role.objects.all(), RoleSerializer, keyed=True),
+    DataSection('employees', Employee, lambda: Employee.objects.select_related('role').all(), EmployeeSerializer, keyed=True,
+                normalized_queryset=lambda: Employee.objects.all(),
+                normalized_serializer_class=NormalizedEmployeeSerializer),
+    DataSection('stockMovements', StockMovement, lambda: StockMovement.objects.select_related('product').order_by('-date'), StockMovementSerializer, limit=200,
+                normalized_queryset=lambda: StockMovement.objects.order_by('-date'),
+                normalized_serializer_class=NormalizedStockMovementSerializer, fast_serializer_class=FastStockMovementSerializer),
+    DataSection('warehouses', Warehouse, lambda: Warehouse.objects.all(), WarehouseSerializer, keyed=True),
+    DataSection('warehouseProducts', WarehouseProduct, lambda: WarehouseProduct.objects.select_related('warehouse', 'product').all(), WarehouseProductSerializer,
+                normalized_queryset=lambda: WarehouseProduct.objects.all(),
+                normalized_serializer_class=NormalizedWarehouseProductSerializer, fast_serializer_class=FastWarehouseProductSerializer),
+    DataSection('expenses', Expense, lambda: Expense.objects.select_related('type', 'employee', 'employee__role').order_by('-date'), ExpenseSerializer, limit=200,
+                normalized_queryset=lambda: Expense.objects.order_by('-date'),
+                normalized_serializer_class=NormalizedExpenseSerializer),
+    DataSection('expenseTypes', ExpenseType, lambda: ExpenseType.objects.all(), ExpenseTypeSerializer, keyed=True),
+]
+
+# SQLite bitta so'rovdagi parametrlar soniga chegara qo'yadi
+DELTA_CHUNK_SIZE = 500
+
 
 class InitialDataView(APIView):
+    """
+    Barcha ma'lumotlar. To'liq javob versiyalangan tayyor nusxadan (snapshot.py) ETag va gzip
+    bilan beriladi. ?since=<cursor> berilsa faqat shu kursordan keyin qo'shilgan, o'zgargan
+    yoki o'chirilgan yozuvlar qaytadi; har ikki holatda ham javobda yangi 'cursor' bor.
+    ?normalized=1 bilan obyektlar id bo'yicha jadvallarda bir martadan keladi (DataSection).
+    """
     permission_classes = [IsAuthenticated]
+
     def get(self, request, *args, **kwargs):
-        try:
-            settings_obj, _ = StoreSettings.objects.get_or_create(id='singleton', defaults={'name': 'My Store', 'currency': 'UZS', 'address': 'Default Address', 'phone': 'Default Phone'})
-            
-            # Safely fetch each dataset with error handling
-            try:
-                goods_receipts_qs = GoodsReceipt.objects.select_related('supplier').prefetch_related('items__product').order_by('-date')[:100]
-                goods_receipts_data = GoodsReceiptSerializer(goods_receipts_qs, many=True).data
-            except Exception as e:
-                print(f'Error fetching goods receipts: {e}')
-                goods_receipts_data = []
-            
-            try:
-                sales_qs = Sale.objects.select_related('seller', 'seller__role', 'customer').prefetch_related('items__product').order_by('-date')[:200]
-                sales_data = SaleSerializer(sales_qs, many=True).data
-            except Exception as e:
-                print(f'Error fetching sales: {e}')
-                sales_data = []
-            
-            try:
-                employees_qs = Employee.objects.select_related('role').all()
-                employees_data = EmployeeSerializer(employees_qs, many=True).data
-            except Exception as e:
-                print(f'Error fetching employees: {e}')
-                employees_data = []
-            
-            try:
-                stock_movements_qs = StockMovement.objects.select_related('product').order_by('-date')[:200]
-                stock_movements_data = StockMovementSerializer(stock_movements_qs, many=True).data
-            except Exception as e:
-                print(f'Error fetching stock movements: {e}')
-                stock_movements_data = []
-            
-            try:
-                warehouses_qs = Warehouse.objects.all()
-                warehouses_data = WarehouseSerializer(warehouses_qs, many=True).data
-            except Exception as e:
-                print(f'Error fetching warehouses: {e}')
-                warehouses_data = []
-            
+        normalized = is_normalized(request)
+        since = request.query_params.get('since')
+        if since is not None:
             try:
-                warehouse_products_qs = WarehouseProduct.objects.select_related('warehouse', 'product').all()
-                warehouse_products_data = WarehouseProductSerializer(warehouse_products_qs, many=True).data
-            except Exception as e:
-                print(f'Error fetching warehouse products: {e}')
-                warehouse_products_data = []
-            
-            try:
-                expenses_qs = Expense.objects.select_related('employee', 'employee__role').order_by('-date')[:200]
-                expenses_data = ExpenseSerializer(expenses_qs, many=True).data
-            except Exception as e:
-                print(f'Error fetching expenses: {e}')
-                expenses_data = []
-            
-            try:
-                expense_types_data = ExpenseTypeSerializer(ExpenseType.objects.all(), many=True).data
-            except Exception as e:
-                print(f'Error fetching expense types: {e}')
-                expense_types_data = []
-            
-            # Fetch other data sets
-            try:
-                products_data = ProductSerializer(Product.objects.all(), many=True).data
-            except Exception as e:
-                print(f'Error fetching products: {e}')
-                products_data = []
-            
-            try:
-                customers_data = CustomerSerializer(Customer.objects.all(), many=True).data
-            except Exception as e:
-                print(f'Error fetching customers: {e}')
-                customers_data = []
-            
-            try:
-                suppliers_data = SupplierSerializer(Supplier.objects.all(), many=True).data
-            except Exception as e:
-                print(f'Error fetching suppliers: {e}')
-                suppliers_data = []
-            
-            try:
-                debt_payments_data = DebtPaymentSerializer(DebtPayment.objects.order_by('-date')[:200], many=True).data
-            except Exception as e:
-                print(f'Error fetching debt payments: {e}')
-                debt_payments_data = []
-            
+                since = int(since)
+            except ValueError:
+                return Response({'error': 'since must be an integer cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            if ChangeLog.is_expired(since):
+                return Response({'error': 'Cursor has expired, reload initial data'}, status=status.HTTP_410_GONE)
+            return Response(self.get_delta(since, normalized))
+        try:
+            # Ma'lumotlar versiyasi - xavfsiz ChangeLog kursori (deltadagi kabi): undan kichik id'li
+            # yozuvlarning hammasi commit bo'lgan, shuning uchun kech commit bo'lgan kichik id nusxani
+            # eskirgan holda qoldirmaydi (eng katta id esa o'zgarmasdan qolishi mumkin edi). O'zgarmagan
+            # bo'lsa terminal 304 oladi; oynadagi o'zgarishlar deltada keladi.
+            variant = 'normalized' if normalized else 'default'
+            version = ChangeLog.safe_cursor()
+            etag = snapshot.make_etag(version, variant)
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                return response
+            # Javobdagi kursor - nusxa versiyasi: oxirgi oynadagi o'zgarishlar deltada qayta keladi
+            current = snapshot.get_snapshot(
+                version, lambda cursor: b''.join(stream_initial_data(cursor=cursor, normalized=normalized)), variant
+            )
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = HttpResponse(current.gzipped, content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(current.body, content_type='application/json')
+            response['ETag'] = current.etag
+            response['Cache-Control'] = 'no-cache'
+            patch_vary_headers(response, ['Accept-Encoding'])
+            return response
+        except Exception as e:
+            print(f'Critical error in InitialDataView: {e}')
+            return Response({'error': 'Failed to load initial data'}, status=500)
+
+    def get_delta(self, since, normalized=False):
+        changes = ChangeLog.objects.filter(id__gt=since).order_by('id')\
+            .values_list('id', 'model_name', 'object_id', 'action', 'date')
+        # Kursor faqat xavfsizlik oynasidan eski yozuvlargacha suriladi: oynadagi yozuvlar orasida
+        # hali commit bo'lmagan kichik id bo'lishi mumkin, shuning uchun ular keyingi so'rovda qayta
+        # o'qiladi (upsert/delete takrorlansa ham natija o'zgarmaydi)
+        settled_before = ChangeLog.settled_before()
+        cursor = since
+        settled = True
+        # Har bir obyekt uchun oxirgi amal hisobga olinadi
+        latest = {}
+        for change_id, model_name, object_id, action, date in changes.iterator(chunk_size=2000):
+            latest.setdefault(model_name, {})[object_id] = action
+            settled = settled and date <= settled_before
+            if settled:
+                cursor = change_id
+
+        data = {}
+        deleted = {}
+        for section in INITIAL_DATA_SECTIONS:
+            actions = latest.get(section.model._meta.model_name, {})
+            upserted = [pk for pk, action in actions.items() if action == ChangeLog.Action.UPSERT]
+            removed = [pk for pk, action in actions.items() if action == ChangeLog.Action.DELETE]
+            if removed:
+                deleted[section.key] = removed
+            if section.key == 'settings':
+                if upserted:
+                    data['settings'] = StoreSettingsSerializer(get_store_settings()).data
+                continue
+            rows = {} if section.is_table(normalized) else []
+            for start in range(0, len(upserted), DELTA_CHUNK_SIZE):
+                chunk = upserted[start:start + DELTA_CHUNK_SIZE]
+                serialized = section.serialize_queryset(section.base_queryset(normalized).filter(pk__in=chunk), normalized)
+                if isinstance(rows, dict):
+                    rows.update(serialized)
+                else:
+                    rows.extend(serialized)
+            data[section.key] = rows
+        data['deleted'] = deleted
+        data['cursor'] = cursor
+        return data
+
+
+# Streaming javobda har bir bo'lak shuncha qatordan serializatsiya qilinadi
+STREAM_CHUNK_SIZE = 2000
+
+
+def is_normalized(request):
+    return request.query_params.get('normalized') in ('1', 'true')
+
+
+def stream_initial_data(chunk_size=STREAM_CHUNK_SIZE, cursor=None, normalized=False):
+    """
+    InitialDataView bilan bir xil JSON'ni bo'limma-bo'lim hosil qiladi. Querysetlar
+    .iterator() bilan o'qiladi, shuning uchun xotirada bir vaqtda bitta bo'lak turadi.
+    """
+    renderer = JSONRenderer()
+    if cursor is None:
+        # Ma'lumotlar o'qilishidan oldin: kursorgacha bo'lgan o'zgarishlar javobda albatta bor
+        cursor = ChangeLog.safe_cursor()
+    for index, section in enumerate(INITIAL_DATA_SECTIONS):
+        prefix = b'{' if index == 0 else b','
+        yield prefix + renderer.render(section.key) + b':'
+        if section.key == 'settings':
             try:
-                settings_data = StoreSettingsSerializer(settings_obj).data
+                yield renderer.render(StoreSettingsSerializer(get_store_settings()).data)
             except Exception as e:
                 print(f'Error fetching settings: {e}')
-                settings_data = {}
-            
-            try:
-                units_data = UnitSerializer(Unit.objects.all(), many=True).data
-            except Exception as e:
-                print(f'Error fetching units: {e}')
-                units_data = []
-            
-            try:
-                roles_data = RoleSerializer(Role.objects.all(), many=True).data
-            except Exception as e:
-                print(f'Error fetching roles: {e}')
-                roles_data = []
-            
-            data = {
-                'products': products_data,
-                'customers': customers_data,
-                'suppliers': suppliers_data,
-                'sales': sales_data,
-                'debtPayments': debt_payments_data,
-                'settings': settings_data,
-                'units': units_data,
-                'goodsReceipts': goods_receipts_data,
-                'roles': roles_data,
-                'employees': employees_data,
-                'stockMovements': stock_movements_data,
-                'warehouses': warehouses_data,
-                'warehouseProducts': warehouse_products_data,
-                'expenses': expenses_data,
-                'expenseTypes': expense_types_data,
-            }
-            return Response(data)
+                yield b'{}'
+            continue
+
+        opening, closing = (b'{', b'}') if section.is_table(normalized) else (b'[', b']')
+        yield opening
+        try:
+            separator = b''
+            for serialized in section.iter_serialized(chunk_size, normalized):
+                # Tashqi qavslarni olib tashlab, bo'laklarni bitta ro'yxat/jadvalga ulaymiz
+                yield separator + renderer.render(serialized)[1:-1]
+                separator = b','
         except Exception as e:
-            print(f'Critical error in InitialDataView: {e}')
-            return Response({'error': 'Failed to load initial data'}, status=500)
+            print(f'Error fetching {section.key}: {e}')
+        yield closing
+    yield b',"cursor":' + renderer.render(cursor) + b'}'
+
+
+class InitialDataStreamView(APIView):
+    """InitialDataView'ning streaming varianti: katta kataloglarda xotira cho'qqisini kamaytiradi."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return StreamingHttpResponse(stream_initial_data(normalized=is_normalized(request)), content_type='application/json')
+
+
+class FastListMixin:
+    """list() javobini fast_serializer_class (values_list asosida) bilan quradi."""
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.fast_serializer_class(queryset, context=self.get_serializer_context()).data)
+
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    fast_serializer_class = FastProductSerializer
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'manage_products'
     
@@ -188,9 +378,10 @@ class ProductViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save()
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
+    fast_serializer_class = FastCustomerSerializer
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'manage_customers'
 
@@ -228,7 +419,8 @@ class SettingsView(generics.RetrieveUpdateAPIView):
         obj, _ = StoreSettings.objects.get_or_create(id='singleton')
         return obj
 
-class SaleCreateView(generics.CreateAPIView):
+class SaleCreateView(IdempotentCreateMixin, generics.CreateAPIView):
+    """?response=receipt bilan to'liq savdo o'rniga qisqa chek (SaleReceiptSerializer) qaytariladi."""
     serializer_class = SaleSerializer
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'use_sales_terminal'
@@ -236,16 +428,278 @@ class SaleCreateView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         instance = serializer.save(seller=self.request.user)
+        if request.query_params.get('response') == 'receipt':
+            return Response(SaleReceiptSerializer.for_sale(instance, serializer.validated_data).data,
+                            status=status.HTTP_201_CREATED)
+        # Javob uchun bog'liq obyektlar oldindan yuklanadi: so'rovlar soni savat hajmiga bog'liq emas
+        instance = Sale.objects.select_related('seller__role', 'customer').prefetch_related('items__product', 'payments').get(pk=instance.pk)
         response_serializer = self.get_serializer(instance)
         headers = self.get_success_headers(response_serializer.data)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class GoodsReceiptCreateView(generics.CreateAPIView):
+def parse_date_param(request, name, end=False, tz=None):
+    """
+    ?start_date= / ?end_date= qiymatini aware datetime'ga o'giradi. Faqat sana berilsa,
+    end=True uchun kunning oxiri (23:59:59.999999) olinadi. Vaqt zonasisiz qiymatlar tz
+    (berilmasa - joriy zona) bo'yicha talqin qilinadi.
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    # parse_datetime faqat sanani ham qabul qiladi (yarim tun), shuning uchun avval sana tekshiriladi
+    try:
+        day = parse_date(value)
+        parsed = datetime.combine(day, time.max if end else time.min) if day else parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Invalid date'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, tz)
+    return parsed
+
+
+class SalesHistoryView(generics.ListAPIView):
+    """
+    Savdolar tarixi: sana oralig'i, sotuvchi, mijoz va to'lov turi bo'yicha filtrlar,
+    (date, id) bo'yicha keyset pagination. Birinchi sahifa bilan birga butun filtrlangan
+    oraliq uchun summary (soni, jami summa, to'lov turlari bo'yicha summalar) qaytadi;
+    keyingi sahifalarda ?summary=1 bilan so'raladi.
+    """
+    serializer_class = SaleSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'view_sales_history'
+
+    def get_queryset(self):
+        queryset = Sale.objects.all()
+        params = self.request.query_params
+        start_date = parse_date_param(self.request, 'start_date')
+        end_date = parse_date_param(self.request, 'end_date', end=True)
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        if params.get('seller_id'):
+            queryset = queryset.filter(seller_id=params['seller_id'])
+        if params.get('customer_id'):
+            queryset = queryset.filter(customer_id=params['customer_id'])
+        if params.get('payment_type'):
+            queryset = queryset.filter(Exists(
+                SalePayment.objects.filter(sale=OuterRef('pk'), type=params['payment_type'])
+            ))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        data = FastSaleSerializer(
+            page.select_related('customer', 'seller__role'), context=self.get_serializer_context()
+        ).data
+        extra = {}
+        if request.query_params.get('summary', '1' if 'cursor' not in request.query_params else '0') == '1':
+            extra['summary'] = self.get_summary(queryset)
+        return self.paginator.get_paginated_response(data, **extra)
+
+    def get_summary(self, queryset):
+        to_decimal = decimal_field(Sale, 'total')
+        totals = queryset.aggregate(count=Count('pk'), total=Sum('total'))
+        payments = SalePayment.objects.filter(sale__in=queryset.values('pk')).values('type')\
+            .annotate(amount=Sum('amount')).order_by('type')
+        return {
+            'count': totals['count'],
+            'total': to_decimal(totals['total'] or 0, None),
+            'payments': {row['type']: to_decimal(row['amount'], None) for row in payments},
+        }
+
+
+# Bitta paketdagi savdolar soni va bitta tranzaksiyadagi savdolar soni
+SALE_BATCH_MAX_SIZE = 500
+SALE_BATCH_CHUNK_SIZE = 50
+
+
+class SaleBatchSyncView(APIView):
+    """
+    Oflayn navbatdagi savdolarni bitta so'rovda qabul qiladi. Har bir savdo uchun natija:
+    created, duplicate (shu clientId bilan avval saqlangan) yoki rejected (sabab bilan).
+    Savdolar SALE_BATCH_CHUNK_SIZE tadan tranzaksiyalarda, qoldiq va qarzlar esa har bir
+    bo'lak uchun jamlangan holda yoziladi.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'use_sales_terminal'
+
+    def post(self, request, *args, **kwargs):
+        sales_data = request.data.get('sales') if isinstance(request.data, dict) else None
+        if not isinstance(sales_data, list):
+            return Response({'error': 'sales must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(sales_data) > SALE_BATCH_MAX_SIZE:
+            return Response({'error': f'At most {SALE_BATCH_MAX_SIZE} sales per batch'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Butun paket uchun mahsulotlar, mijozlar, omborlar va mavjud clientId'lar bittadan so'rovda
+        customer_ids = {str(data['customerId']) for data in sales_data if isinstance(data, dict) and data.get('customerId')}
+        client_ids = [str(data['clientId']) for data in sales_data if isinstance(data, dict) and data.get('clientId')]
+        warehouse_ids = {str(data['warehouseId']) for data in sales_data if isinstance(data, dict) and data.get('warehouseId')}
+        context = self.get_serializer_context()
+        context['sale_products'] = Product.objects.in_bulk(sale_product_ids(sales_data))
+        context['sale_customers'] = Customer.objects.in_bulk(customer_ids)
+        context['sale_warehouses'] = Warehouse.objects.in_bulk(warehouse_ids)
+        existing = dict(Sale.objects.filter(clientId__in=client_ids).values_list('clientId', 'id'))
+
+        results = [None] * len(sales_data)
+        pending = []
+        # Paket ichida takrorlangan clientId: {takror indeksi: birinchi nusxa indeksi}
+        first_index = {}
+        repeats = {}
+        for index, data in enumerate(sales_data):
+            serializer = OfflineSaleSerializer(data=data, context=context)
+            if not serializer.is_valid():
+                client_id = data.get('clientId') if isinstance(data, dict) else None
+                results[index] = {'clientId': client_id, 'status': 'rejected', 'errors': serializer.errors}
+                continue
+            client_id = serializer.validated_data['clientId']
+            if client_id in existing:
+                results[index] = {'clientId': client_id, 'status': 'duplicate', 'id': existing[client_id]}
+                continue
+            if client_id in first_index:
+                repeats[index] = first_index[client_id]
+                continue
+            first_index[client_id] = index
+            pending.append((index, dict(serializer.validated_data, seller=request.user)))
+
+        for start in range(0, len(pending), SALE_BATCH_CHUNK_SIZE):
+            self.commit_chunk(pending[start:start + SALE_BATCH_CHUNK_SIZE], results, context['sale_products'])
+
+        # Takror birinchi nusxa natijasini oladi: saqlangan bo'lsa duplicate (o'sha id bilan), aks holda rejected
+        for index, first in repeats.items():
+            result = results[first]
+            if result['status'] == 'rejected':
+                results[index] = dict(result)
+            else:
+                results[index] = {'clientId': result['clientId'], 'status': 'duplicate', 'id': result['id']}
+        return Response({'results': results})
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'format': self.format_kwarg, 'view': self}
+
+    def commit_chunk(self, chunk, results, products):
+        try:
+            with transaction.atomic():
+                sales = create_sales([validated for _, validated in chunk])
+        except (InsufficientStock, IntegrityError):
+            # Bo'lakdagi qaysi savdo muammoli ekanini aniqlash uchun ularni birma-bir saqlaymiz
+            for entry in chunk:
+                self.commit_one(entry, results, products)
+            return
+        for (index, validated), sale in zip(chunk, sales):
+            results[index] = {'clientId': validated['clientId'], 'status': 'created', 'id': sale.id}
+
+    def commit_one(self, entry, results, products):
+        index, validated = entry
+        client_id = validated['clientId']
+        try:
+            with transaction.atomic():
+                sale = create_sales([validated])[0]
+        except InsufficientStock as e:
+            results[index] = {'clientId': client_id, 'status': 'rejected', 'errors': [insufficient_stock_message(e, products)]}
+        except IntegrityError:
+            # Parallel so'rov shu clientId bilan savdoni allaqachon saqlagan
+            existing_id = Sale.objects.filter(clientId=client_id).values_list('id', flat=True).first()
+            results[index] = {'clientId': client_id, 'status': 'duplicate', 'id': existing_id}
+        else:
+            results[index] = {'clientId': client_id, 'status': 'created', 'id': sale.id}
+
+
+class StockReservationCreateView(generics.CreateAPIView):
+    """Savat uchun ombordagi tovarni bron qiladi (yoki shu cartId dagi bronni almashtiradi)."""
+    serializer_class = StockReservationSerializer
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'use_sales_terminal'
+
+
+class StockReservationReleaseView(APIView):
+    """DELETE /api/reservations/<cartId>/: savat bekor qilinganda xodimning o'z bronini bo'shatadi."""
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'use_sales_terminal'
+
+    def delete(self, request, cart_id, *args, **kwargs):
+        reservations = StockReservation.objects.filter(cartId=cart_id)
+        # Kassir faqat o'z bronini bo'shatadi; ombor boshqaruvchisi istalganini
+        if not has_permission(request.user, 'manage_warehouse'):
+            reservations = reservations.filter(employee=request.user)
+        with transaction.atomic():
+            released = release_reservations(reservations)
+        if not released:
+            return Response({'error': 'Reservation not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class StockTransferCreateView(IdempotentCreateMixin, generics.CreateAPIView):
+    """Omborlar orasida ko'chirish hujjati (yuzlab qatorlar bitta tranzaksiyada)."""
+    serializer_class = StockTransferSerializer
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'manage_warehouse'
+
+    def perform_create(self, serializer):
+        serializer.save(employee=self.request.user)
+
+
+class GoodsReceiptCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = GoodsReceiptSerializer
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'manage_warehouse'
 
-class DebtPaymentCreateView(generics.CreateAPIView):
+def goods_receipt_items():
+    # Qatorlar mahsulot bilan bitta so'rovda: so'rovlar soni sahifa hajmiga bog'liq emas
+    return Prefetch('items', queryset=GoodsReceiptItem.objects.select_related('product').only(
+        'receipt_id', 'quantity', 'purchasePrice', 'product__id', 'product__name', 'product__barcode', 'product__unit',
+    ))
+
+
+class GoodsReceiptHistoryView(generics.ListAPIView):
+    """
+    Kirimlar ro'yxati: yetkazib beruvchi, ombor, sana oralig'i va hujjat raqami (boshlanishi)
+    bo'yicha filtrlar, (date, id) bo'yicha keyset pagination.
+    """
+    serializer_class = GoodsReceiptListSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'manage_warehouse'
+
+    def get_queryset(self):
+        queryset = GoodsReceipt.objects.all()
+        params = self.request.query_params
+        start_date = parse_date_param(self.request, 'start_date')
+        end_date = parse_date_param(self.request, 'end_date', end=True)
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+        if params.get('supplier_id'):
+            queryset = queryset.filter(supplier_id=params['supplier_id'])
+        if params.get('warehouse_id'):
+            queryset = queryset.filter(warehouse_id=params['warehouse_id'])
+        if params.get('doc_number'):
+            # LIKE indeksdan foydalanmaydi: boshlanishi bo'yicha qidiruv diapazon sifatida
+            prefix = params['doc_number']
+            queryset = queryset.filter(docNumber__gte=prefix, docNumber__lt=prefix + '\U0010ffff')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        page = page.select_related('supplier', 'warehouse').prefetch_related(goods_receipt_items())
+        return self.paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+class GoodsReceiptDetailView(generics.RetrieveAPIView):
+    serializer_class = GoodsReceiptListSerializer
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'manage_warehouse'
+
+    def get_queryset(self):
+        return GoodsReceipt.objects.select_related('supplier', 'warehouse').prefetch_related(goods_receipt_items())
+
+
+class DebtPaymentCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = DebtPaymentSerializer
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'manage_customers'
@@ -253,22 +707,25 @@ class DebtPaymentCreateView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         with transaction.atomic():
-            customer_id = serializer.validated_data['customer_id']
+            customer = serializer.validated_data['customer']
             amount = serializer.validated_data['amount']
-            customer = Customer.objects.get(id=customer_id)
-            customer.debt -= amount
-            customer.save()
             payment = DebtPayment.objects.create(
                 id=f"debt_pay_{shortuuid.random(10)}",
                 customer=customer, amount=amount,
                 paymentType=serializer.validated_data['paymentType']
             )
+            # Daftar yozuvi va atomar UPDATE: parallel to'lovlar bir-birining natijasini yo'qotmaydi
+            post_debt_entries([DebtLedgerEntry(
+                customer=customer, date=payment.date, amount=-amount,
+                kind=DebtLedgerEntry.Kind.PAYMENT, relatedId=payment.id,
+            )])
         return Response(DebtPaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
 
 
-class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
+class StockMovementViewSet(FastListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = StockMovement.objects.select_related('product').order_by('-date')
     serializer_class = StockMovementSerializer
+    fast_serializer_class = FastStockMovementSerializer
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'manage_warehouse'
     
@@ -285,6 +742,256 @@ class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
+class StocktakeImportView(APIView):
+    """
+    POST /api/stocktake/?file_format=csv|jsonl[&warehouse_id=]: sanoq faylini (multipart 'file' yoki
+    so'rov tanasi) qatorma-qator o'qib qo'llaydi va hisobot qaytaradi.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'manage_warehouse'
+
+    def post(self, request, *args, **kwargs):
+        # ?format= DRF'da javob formatini tanlash uchun band
+        file_format = request.query_params.get('file_format', 'csv')
+        warehouse_id = request.query_params.get('warehouse_id') or None
+        if warehouse_id is not None and not Warehouse.objects.filter(pk=warehouse_id).exists():
+            return Response({'error': 'Warehouse not found'}, status=status.HTTP_400_BAD_REQUEST)
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+            lines = upload
+        else:
+            # Tana parser orqali o'qilmaydi: so'rov oqimi qatorma-qator iteratsiya qilinadi (bo'sh tana - None)
+            lines = request.stream or []
+        try:
+            report = apply_stocktake(iter_count_rows(lines, file_format), warehouse_id=warehouse_id)
+        except StocktakeFormatError as e:
+            # Import bitta tranzaksiyada: hech narsa qo'llanmagan
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as e:
+            return Response({'error': f"Counted quantity {e.available} of product {e.product_id} is below its reserved "
+                                      f"quantity {e.requested}; release the reservations first"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+
+# Hisobotlarda sana oralig'i berilmasa oxirgi shuncha kun olinadi
+REPORT_DEFAULT_DAYS = 30
+REPORT_MAX_LIMIT = 500
+# ABC tahlili: jami ulushning A - 80%, B - keyingi 15%, C - qolgan 5% i
+ABC_THRESHOLDS = (('A', Decimal('0.80')), ('B', Decimal('0.95')))
+PRODUCT_SALES_METRICS = ('quantity', 'revenue', 'cost', 'profit')
+
+
+class ProductSalesReportView(APIView):
+    """
+    DailyProductSales (mahsulot bo'yicha kunlik faktlar) ustidagi hisobotlar uchun umumiy qism:
+    ?start_date= / ?end_date= (sana, kiritilgan holda) oralig'i, sukut bo'yicha oxirgi 30 kun.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'view_reports'
+
+    def get_window(self):
+        start = parse_date_param(self.request, 'start_date')
+        end = parse_date_param(self.request, 'end_date', end=True)
+        end_day = timezone.localdate(end) if end else timezone.localdate()
+        start_day = timezone.localdate(start) if start else end_day - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+        return start_day, end_day
+
+    def get_facts(self, start_day, end_day):
+        return DailyProductSales.objects.filter(date__gte=start_day, date__lte=end_day)
+
+    def get_metric(self, default):
+        metric = self.request.query_params.get('metric', default)
+        if metric not in PRODUCT_SALES_METRICS:
+            raise ValidationError({'metric': f"Must be one of: {', '.join(PRODUCT_SALES_METRICS)}"})
+        return metric
+
+    def product_totals(self, start_day, end_day):
+        # Nomlar GROUP BY ga qo'shilmaydi (har bir fakt qatori uchun JOIN): natijadagi mahsulotlar uchun alohida
+        return self.get_facts(start_day, end_day).values('product_id').annotate(
+            quantity=Sum('quantity'), revenue=Sum('revenue'), cost=Sum('cost'),
+        ).annotate(profit=F('revenue') - F('cost'))
+
+    def product_names(self, rows):
+        return dict(Product.objects.filter(pk__in=[row['product_id'] for row in rows]).values_list('id', 'name'))
+
+    def money(self, value):
+        return decimal_field(DailyProductSales, 'revenue')(value or 0, None)
+
+
+class TopProductsReportView(ProductSalesReportView):
+    """GET /api/reports/top-products/?metric=quantity|revenue|cost|profit&limit=: eng ko'p sotilganlar."""
+
+    def get(self, request, *args, **kwargs):
+        start_day, end_day = self.get_window()
+        metric = self.get_metric('quantity')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), REPORT_MAX_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': 'Invalid limit'})
+        rows = list(self.product_totals(start_day, end_day).order_by(f'-{metric}', 'product_id')[:limit])
+        names = self.product_names(rows)
+        return Response({
+            'start_date': start_day,
+            'end_date': end_day,
+            'metric': metric,
+            'results': [{
+                'productId': row['product_id'],
+                'name': names.get(row['product_id']),
+                'quantity': row['quantity'],
+                'revenue': self.money(row['revenue']),
+                'cost': self.money(row['cost']),
+                'profit': self.money(row['profit']),
+            } for row in rows],
+        })
+
+
+class GrossMarginReportView(ProductSalesReportView):
+    """GET /api/reports/gross-margin/: oraliq bo'yicha tushum, tannarx, yalpi foyda va marja, kunlar kesimida."""
+
+    def get(self, request, *args, **kwargs):
+        start_day, end_day = self.get_window()
+        days = self.get_facts(start_day, end_day).values('date').annotate(
+            revenue=Sum('revenue'), cost=Sum('cost'),
+        ).order_by('date')
+        revenue = cost = Decimal(0)
+        series = []
+        for day in days:
+            revenue += day['revenue']
+            cost += day['cost']
+            series.append({'date': day['date'], **self.margin(day['revenue'], day['cost'])})
+        return Response({'start_date': start_day, 'end_date': end_day, **self.margin(revenue, cost), 'days': series})
+
+    def margin(self, revenue, cost):
+        profit = revenue - cost
+        return {
+            'revenue': self.money(revenue),
+            'cost': self.money(cost),
+            'grossProfit': self.money(profit),
+            'margin': round(float(profit / revenue), 4) if revenue else None,
+        }
+
+
+class AbcReportView(ProductSalesReportView):
+    """
+    GET /api/reports/abc/?metric=revenue|quantity|profit: mahsulotlar metrika bo'yicha kamayish
+    tartibida, jami ulushning birinchi 80% i - A, keyingi 15% i - B, qolgani - C.
+    """
+
+    def get(self, request, *args, **kwargs):
+        start_day, end_day = self.get_window()
+        metric = self.get_metric('revenue')
+        rows = list(self.product_totals(start_day, end_day).order_by(f'-{metric}', 'product_id'))
+        names = self.product_names(rows)
+        values = [max(Decimal(str(row[metric] or 0)), Decimal(0)) for row in rows]
+        total = sum(values, Decimal(0))
+        results = []
+        cumulative = Decimal(0)
+        counts = dict.fromkeys(['A', 'B', 'C'], 0)
+        for row, value in zip(rows, values):
+            # Mahsulot sinfi uning ulushi boshlanadigan nuqtaga qarab aniqlanadi
+            start_share = cumulative / total if total else Decimal(1)
+            cumulative += value
+            abc_class = next((name for name, threshold in ABC_THRESHOLDS if start_share < threshold), 'C')
+            counts[abc_class] += 1
+            results.append({
+                'productId': row['product_id'],
+                'name': names.get(row['product_id']),
+                'value': float(value) if metric == 'quantity' else self.money(value),
+                'share': round(float(value / total), 4) if total else 0,
+                'cumulativeShare': round(float(cumulative / total), 4) if total else 0,
+                'class': abc_class,
+            })
+        return Response({
+            'start_date': start_day,
+            'end_date': end_day,
+            'metric': metric,
+            'total': float(total) if metric == 'quantity' else self.money(total),
+            'counts': counts,
+            'results': results,
+        })
+
+
+class SalesTimeseriesView(APIView):
+    """
+    GET /api/reports/timeseries/?bucket=hour|day|week|month&tz=Asia/Tashkent&start_date=&end_date=
+    [&seller_id=][&customer_id=]: savdo, to'lov va xarajatlar vaqt bo'laklari bo'yicha (grafiklar uchun).
+    Sana oralig'i berilmasa oxirgi 30 kun.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'view_reports'
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            tz = zoneinfo.ZoneInfo(params['tz']) if params.get('tz') else timezone.get_current_timezone()
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            raise ValidationError({'tz': 'Unknown time zone'})
+        end = parse_date_param(request, 'end_date', end=True, tz=tz) or timezone.now()
+        start = parse_date_param(request, 'start_date', tz=tz) or end - timedelta(days=REPORT_DEFAULT_DAYS)
+        if start > end:
+            raise ValidationError({'start_date': 'start_date must not be after end_date'})
+        bucket = params.get('bucket', 'day')
+        try:
+            results, source = sales_timeseries(
+                bucket, tz, start, end, seller_id=params.get('seller_id'), customer_id=params.get('customer_id'),
+            )
+        except TimeseriesError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'bucket': bucket, 'tz': str(tz), 'source': source, 'results': results})
+
+
+class ExportView(APIView):
+    """
+    GET /api/exports/<sales|movements|expenses>/?file_format=csv|xlsx&start_date=&end_date=: hisobchilar
+    uchun fayl (oqim sifatida, xotira sarfi qatorlar soniga bog'liq emas). Sana oralig'i berilmasa oxirgi 30 kun.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'view_reports'
+
+    def get(self, request, dataset, *args, **kwargs):
+        end = parse_date_param(request, 'end_date', end=True) or timezone.now()
+        start = parse_date_param(request, 'start_date') or end - timedelta(days=REPORT_DEFAULT_DAYS)
+        if start > end:
+            raise ValidationError({'start_date': 'start_date must not be after end_date'})
+        file_format = request.query_params.get('file_format', 'csv')
+        try:
+            stream, filename = export_stream(dataset, file_format, start, end)
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(stream, content_type=CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class StockAsOfView(APIView):
+    """
+    GET /api/stock/as-of/?as_of=<sana yoki vaqt>[&warehouse_id=][&product_id=]: berilgan vaqtdagi
+    qoldiqlar (faqat sana berilsa - kun oxiridagi). warehouse_id bo'lmasa mahsulotning umumiy qoldig'i.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'manage_warehouse'
+
+    def get(self, request, *args, **kwargs):
+        moment = parse_date_param(request, 'as_of', end=True)
+        if moment is None:
+            return Response({'error': 'as_of is required'}, status=status.HTTP_400_BAD_REQUEST)
+        warehouse_id = request.query_params.get('warehouse_id') or None
+        product_ids = request.query_params.getlist('product_id') or None
+        balances, snapshot = stock_as_of(moment, product_ids=product_ids, warehouse_id=warehouse_id)
+        return Response({
+            'as_of': moment,
+            'warehouseId': warehouse_id,
+            'snapshot': snapshot.date if snapshot is not None else None,
+            'results': [
+                {'productId': product_id, 'quantity': quantity}
+                for (product_id, _), quantity in sorted(balances.items())
+            ],
+        })
+
+
 class WarehouseViewSet(viewsets.ModelViewSet):
     queryset = Warehouse.objects.all()
     serializer_class = WarehouseSerializer
@@ -292,9 +999,10 @@ class WarehouseViewSet(viewsets.ModelViewSet):
     required_permission = 'manage_warehouse'
 
 
-class WarehouseProductViewSet(viewsets.ModelViewSet):
+class WarehouseProductViewSet(FastListMixin, viewsets.ModelViewSet):
     queryset = WarehouseProduct.objects.select_related('warehouse', 'product').all()
     serializer_class = WarehouseProductSerializer
+    fast_serializer_class = FastWarehouseProductSerializer
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'manage_warehouse'
     
@@ -310,6 +1018,13 @@ class WarehouseProductViewSet(viewsets.ModelViewSet):
             
         return queryset
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            key, quantity = (instance.product_id, instance.warehouse_id), instance.quantity
+            instance.delete()
+            # Qatorning qoldig'i Product.stock dan chiqariladi va harakat sifatida yoziladi
+            record_warehouse_changes({key: -quantity})
+
 
 class ExpenseTypeViewSet(viewsets.ModelViewSet):
     queryset = ExpenseType.objects.all()
@@ -342,88 +1057,141 @@ class ExpenseViewSet(viewsets.ModelViewSet):
             
         return queryset
 
+    # Kunlik yig'indilar (signals) xarajat bilan bitta tranzaksiyada yangilanadi
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+
+
+class ShiftOpenView(APIView):
+    """POST /api/shifts/open/ {openingCash, warehouseId}: joriy xodim uchun smena ochadi."""
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'use_sales_terminal'
+
+    def post(self, request, *args, **kwargs):
+        serializer = ShiftSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            shift = open_shift(request.user, opening_cash=serializer.validated_data.get('openingCash', 0),
+                               warehouse=serializer.validated_data.get('warehouse'))
+        except ShiftError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(ShiftSerializer(shift).data, status=status.HTTP_201_CREATED)
+
+
+class CurrentShiftView(APIView):
+    """GET /api/shifts/current/: joriy xodimning ochiq smenasi va hisoblagichlari (X-hisobot)."""
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'use_sales_terminal'
+
+    def get(self, request, *args, **kwargs):
+        shift = Shift.objects.filter(employee_id=request.user.pk, closedAt__isnull=True).first()
+        if shift is None:
+            return Response({'error': 'No open shift'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ShiftSerializer(shift).data)
+
+
+class ShiftDetailMixin:
+    """Xodim o'z smenasini, view_reports ruxsati borlar esa istalgan smenani ko'radi/yopadi."""
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'use_sales_terminal'
+
+    def get_shift(self, pk):
+        shift = Shift.objects.select_related('employee').filter(pk=pk).first()
+        if shift is None or (shift.employee_id != self.request.user.pk
+                             and not has_permission(self.request.user, 'view_reports')):
+            raise NotFound('Shift not found')
+        return shift
+
+
+class ShiftCloseView(ShiftDetailMixin, APIView):
+    """POST /api/shifts/<id>/close/ {closingCash}: smenani yopadi va Z-hisobotni qaytaradi."""
+
+    def post(self, request, pk, *args, **kwargs):
+        shift = self.get_shift(pk)
+        serializer = ShiftCloseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            shift = close_shift(shift, serializer.validated_data['closingCash'])
+        except ShiftError as e:
+            return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+        return Response(z_report(shift))
+
+
+class ZReportView(ShiftDetailMixin, APIView):
+    """GET /api/shifts/<id>/z-report/: smena yakuni hisoblagichlardan (Sale jadvali skanlanmaydi)."""
+
+    def get(self, request, pk, *args, **kwargs):
+        return Response(z_report(self.get_shift(pk)))
+
+
+class SellerPerformanceReportView(APIView):
+    """
+    GET /api/reports/sellers/?start_date=&end_date=: sotuvchilarni taqqoslash (savdolar soni, jami,
+    o'rtacha chek, to'lov turlari, smenalar). Sana oralig'i berilmasa oxirgi 30 kun.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'view_reports'
+
+    def get(self, request, *args, **kwargs):
+        end = parse_date_param(request, 'end_date', end=True) or timezone.now()
+        start = parse_date_param(request, 'start_date') or end - timedelta(days=REPORT_DEFAULT_DAYS)
+        if start > end:
+            raise ValidationError({'start_date': 'start_date must not be after end_date'})
+        return Response({'start': start, 'end': end, 'results': seller_performance(start, end)})
+
+
+class CustomerStatementView(APIView):
+    """
+    GET /api/customers/<id>/statement/?start_date=&end_date=: mijoz qarzi daftaridan hisob-kitob
+    varag'i (boshlang'ich qoldiq, yozuvlar va har biridan keyingi qoldiq). Oraliq berilmasa oxirgi 30 kun.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'manage_customers'
+
+    def get(self, request, pk, *args, **kwargs):
+        customer = Customer.objects.filter(pk=pk).first()
+        if customer is None:
+            raise NotFound('Customer not found')
+        end = parse_date_param(request, 'end_date', end=True) or timezone.now()
+        start = parse_date_param(request, 'start_date') or end - timedelta(days=REPORT_DEFAULT_DAYS)
+        if start > end:
+            raise ValidationError({'start_date': 'start_date must not be after end_date'})
+        return Response(customer_statement(customer, start, end))
+
+
+class DebtAgingReportView(APIView):
+    """
+    GET /api/reports/debt-aging/?as_of=&customer_id=: mijozlar qarzi yoshi bo'yicha
+    (0-30, 31-60, 61-90, 90+ kun). as_of berilmasa hozirgi holat.
+    """
+    permission_classes = [IsAuthenticated, HasPermission]
+    required_permission = 'view_reports'
+
+    def get(self, request, *args, **kwargs):
+        as_of = parse_date_param(request, 'as_of', end=True)
+        return Response(debt_aging(as_of, customer_id=request.query_params.get('customer_id') or None))
+
 
 class DashboardStatsView(APIView):
+    """
+    Dashboard ko'rsatkichlari (dashboard.get_stats keshidan). cached_at - natija hisoblangan vaqt,
+    cache_age - uning yoshi (soniya); tez-tez so'rovlar agregatlarni qayta hisoblatmaydi.
+    """
     permission_classes = [IsAuthenticated, HasPermission]
     required_permission = 'view_dashboard'
-    
+
     def get(self, request, *args, **kwargs):
-        try:
-            # Calculate total sales
-            total_sales = Sale.objects.aggregate(
-                total=Sum('total')
-            )['total'] or 0
-            
-            # Calculate total expenses
-            total_expenses = Expense.objects.aggregate(
-                total=Sum('amount')
-            )['total'] or 0
-            
-            # Calculate net profit
-            net_profit = total_sales - total_expenses
-            
-            # Get recent sales (last 30 days)
-            thirty_days_ago = timezone.now() - timedelta(days=30)
-            recent_sales = Sale.objects.filter(date__gte=thirty_days_ago).aggregate(
-                total=Sum('total'),
-                count=Count('id')
-            )
-            
-            # Get recent expenses (last 30 days)
-            recent_expenses = Expense.objects.filter(date__gte=thirty_days_ago).aggregate(
-                total=Sum('amount'),
-                count=Count('id')
-            )
-            
-            # Get top selling products (with error handling)
-            try:
-                top_products = Product.objects.filter(
-                    items__sale__date__gte=thirty_days_ago
-                ).annotate(
-                    total_sold=Sum('items__quantity')
-                ).order_by('-total_sold')[:5]
-            except Exception:
-                top_products = []
-            
-            # Get expense breakdown by type
-            try:
-                expense_breakdown = Expense.objects.values('type').annotate(
-                    total=Sum('amount'),
-                    count=Count('id')
-                ).order_by('-total')
-            except Exception:
-                expense_breakdown = []
-            
-            data = {
-                'total_sales': float(total_sales),
-                'total_expenses': float(total_expenses),
-                'net_profit': float(net_profit),
-                'recent_sales_total': float(recent_sales['total'] or 0),
-                'recent_sales_count': recent_sales['count'] or 0,
-                'recent_expenses_total': float(recent_expenses['total'] or 0),
-                'recent_expenses_count': recent_expenses['count'] or 0,
-                'top_products': [{
-                    'name': getattr(product, 'name', 'Unknown'),
-                    'total_sold': float(getattr(product, 'total_sold', 0) or 0)
-                } for product in top_products],
-                'expense_breakdown': [{
-                    'type': item.get('type', ''),
-                    'total': float(item.get('total', 0) or 0),
-                    'count': item.get('count', 0)
-                } for item in expense_breakdown]
-            }
-            
-            return Response(data)
-        except Exception as e:
-            # Return default values if there's an error
-            return Response({
-                'total_sales': 0,
-                'total_expenses': 0,
-                'net_profit': 0,
-                'recent_sales_total': 0,
-                'recent_sales_count': 0,
-                'recent_expenses_total': 0,
-                'recent_expenses_count': 0,
-                'top_products': [],
-                'expense_breakdown': []
-            })
+        entry = dashboard.get_stats()
+        age = entry.age
+        response = Response({**entry.data, 'cached_at': entry.computed_at, 'cache_age': round(age, 1)})
+        response['Age'] = str(int(age))
+        return response
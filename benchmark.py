@@ -0,0 +1,665 @@
+#!/usr/bin/env python
+"""
+Vaqtinchalik test bazasida ishlaydigan benchmark'lar.
+
+    python benchmark.py                 # hammasi
+    python benchmark.py auth_queries    # faqat bittasi
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pos_backend.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import dashboard, role_cache, snapshot
+from api.authentication import token_for_employee
+from api.models import (
+    Employee, Role, Product, Customer, Sale, CartItem, SalePayment, StockMovement, Warehouse, WarehouseProduct,
+    Expense, ExpenseType, StockReservation, Supplier, GoodsReceipt, GoodsReceiptItem, DailySalesRollup,
+    DailyExpenseRollup, DebtLedgerEntry,
+)
+from api.fast_serializers import (
+    FastProductSerializer, FastCustomerSerializer, FastSaleSerializer, FastStockMovementSerializer,
+    FastWarehouseProductSerializer,
+)
+from api.serializers import (
+    ProductSerializer, CustomerSerializer, SaleSerializer, StockMovementSerializer, WarehouseProductSerializer,
+)
+from api.pagination import KeysetPagination
+from api.stock import build_stock_snapshots, release_expired_reservations
+from api.debts import reconcile_debts
+from api.rollups import day_start, rebuild_rollups
+from api.stocktake import apply_stocktake, iter_count_rows
+from api.views import get_store_settings, stream_initial_data
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def timed(func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def make_employee(permissions, phone='900000000', pin='1234'):
+    role = Role.objects.create(id=f'role_bench_{phone}', name=f'Bench {phone}', permissions=permissions)
+    return Employee.objects.create_user(phone=phone, name='Bench', password=pin, role=role, id=f'emp_bench_{phone}')
+
+
+def seed_catalog(products=20000, customers=2000):
+    Product.objects.bulk_create([
+        Product(id=f'prod_bench_{i}', name=f'Mahsulot {i}', barcode=f'478{i:010d}', unit='dona',
+                purchasePrice=Decimal('1000.00'), salePrice=Decimal('1250.00'), stock=100, minStock=5,
+                description='Benchmark uchun')
+        for i in range(products)
+    ], batch_size=1000)
+    Customer.objects.bulk_create([
+        Customer(id=f'cust_bench_{i}', name=f'Mijoz {i}', phone=f'99890{i:07d}', debt=Decimal('0'))
+        for i in range(customers)
+    ], batch_size=1000)
+
+
+def seed_store(products=500, customers=200, employees=30, sales=2000, items_per_sale=5, days=90):
+    """Bitta do'kon uchun realistik hajmdagi ma'lumotlar; savdolar oxirgi days kunga tarqalgan."""
+    seed_catalog(products, customers)
+    now = timezone.now()
+    step = timedelta(days=days) / max(sales, 1)
+    payment_types = SalePayment.PaymentType.values
+    roles = [Role.objects.create(id=f'role_store_{i}', name=f'Rol {i}', permissions=Role.Permission.values) for i in range(3)]
+    Employee.objects.bulk_create([
+        Employee(id=f'emp_store_{i}', phone=f'99891{i:07d}', name=f'Kassir {i}', role=roles[i % 3], password='!')
+        for i in range(employees)
+    ])
+    Sale.objects.bulk_create([
+        Sale(id=f'sale_store_{i}', date=now - step * i, subtotal=Decimal('6250.00'), total=Decimal('6250.00'),
+             seller_id=f'emp_store_{i % employees}', customer_id=f'cust_bench_{i % customers}' if i % 4 == 0 else None)
+        for i in range(sales)
+    ], batch_size=1000)
+    CartItem.objects.bulk_create([
+        CartItem(sale_id=f'sale_store_{i}', product_id=f'prod_bench_{(i * 7 + j) % products}', quantity=1, price=Decimal('1250.00'))
+        for i in range(sales) for j in range(items_per_sale)
+    ], batch_size=1000)
+    SalePayment.objects.bulk_create([
+        SalePayment(sale_id=f'sale_store_{i}', type=payment_types[i % len(payment_types)], amount=Decimal('6250.00'))
+        for i in range(sales)
+    ], batch_size=1000)
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=f'prod_bench_{i % products}', quantity=1, type=StockMovement.MovementType.SAVDO,
+                      relatedId=f'sale_store_{i}', comment=f'Savdo: sale_store_{i}')
+        for i in range(sales)
+    ], batch_size=1000)
+    warehouse = Warehouse.objects.create(id='wh_store', name='Asosiy ombor')
+    WarehouseProduct.objects.bulk_create([
+        WarehouseProduct(id=f'wh_prod_store_{i}', warehouse=warehouse, product_id=f'prod_bench_{i}', quantity=50)
+        for i in range(products)
+    ])
+    expense_type = ExpenseType.objects.create(id='exp_type_store', name='boshqa', display_name='Boshqa sarflar')
+    Expense.objects.bulk_create([
+        Expense(id=f'exp_store_{i}', amount=Decimal('10000.00'), type=expense_type, employee_id=f'emp_store_{i % employees}')
+        for i in range(200)
+    ])
+    # bulk_create kunlik yig'indilarni yangilamaydi
+    rebuild_rollups()
+
+
+@contextmanager
+def explicit_dates(model, field='date'):
+    """auto_now_add maydoniga bulk_create paytida o'tmishdagi sanalarni yozish uchun."""
+    date_field = model._meta.get_field(field)
+    date_field.auto_now_add = False
+    try:
+        yield
+    finally:
+        date_field.auto_now_add = True
+
+
+def seed_movements(count, products, days, warehouses=()):
+    """Oxirgi days kunga tarqalgan harakatlar (eng yangisi hozir)."""
+    now = timezone.now()
+    step = timedelta(days=days) / max(count, 1)
+    types = StockMovement.MovementType.values
+    with explicit_dates(StockMovement):
+        StockMovement.objects.bulk_create([
+            StockMovement(product_id=f'prod_bench_{i % products}', quantity=1 + i % 3, type=types[i % len(types)],
+                          warehouse_id=warehouses[i % len(warehouses)] if warehouses and i % 2 else None,
+                          date=now - step * i)
+            for i in range(count)
+        ], batch_size=1000)
+
+
+def authorized_client(*permissions, phone='900000000'):
+    employee = make_employee(list(permissions), phone=phone)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_for_employee(employee).access_token}')
+    return client, employee
+
+
+def measure_response(client, url):
+    """(birinchi bayt vaqti, to'liq vaqt, xotira cho'qqisi, body)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url)
+    if response.streaming:
+        chunks = iter(response.streaming_content)
+        body = [next(chunks)]
+        first_byte = time.perf_counter() - start
+        body.extend(chunks)
+        body = b''.join(body)
+    else:
+        body = response.content
+        first_byte = time.perf_counter() - start
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte, total, peak, body
+
+
+@benchmark
+def initial_data_stream():
+    """/api/data/initial/ va /api/data/initial/stream/: birinchi bayt vaqti va xotira cho'qqisi."""
+    seed_catalog()
+    client, _ = authorized_client()
+    results = {}
+    snapshot.invalidate()
+    for url in ('/api/data/initial/', '/api/data/initial/stream/'):
+        first_byte, total, peak, body = measure_response(client, url)
+        results[url] = json.loads(body)
+        results[url].pop('cursor')
+        print(f'{url:28} TTFB={first_byte * 1000:8.1f} ms  jami={total * 1000:8.1f} ms  '
+              f'xotira cho\'qqisi={peak / 1024 / 1024:7.1f} MiB  hajm={len(body) / 1024 / 1024:.1f} MiB')
+    print('javoblar bir xil:', results['/api/data/initial/'] == results['/api/data/initial/stream/'])
+
+
+@benchmark
+def initial_data_snapshot():
+    """/api/data/initial/: nusxani qurish, tayyor nusxa (gzip) va 304 javob vaqtlari."""
+    seed_catalog()
+    client, _ = authorized_client()
+    get_store_settings()  # aks holda birinchi qurish settings yaratib versiyani oshiradi
+    snapshot.invalidate()
+    cold, response = timed(lambda: client.get('/api/data/initial/', HTTP_ACCEPT_ENCODING='gzip'))
+    warm, response = timed(lambda: client.get('/api/data/initial/', HTTP_ACCEPT_ENCODING='gzip'), repeat=20)
+    etag = response['ETag']
+    not_modified, response_304 = timed(lambda: client.get('/api/data/initial/', HTTP_IF_NONE_MATCH=etag), repeat=20)
+    current = snapshot.get_snapshot(0, None)
+    print(f'qurish (birinchi so\'rov): {cold * 1000:8.1f} ms')
+    print(f'tayyor nusxa (gzip):      {warm * 1000:8.1f} ms  hajm={len(current.gzipped) / 1024:.0f} KiB '
+          f'(siqilmagan {len(current.body) / 1024:.0f} KiB)')
+    print(f'304 Not Modified:         {not_modified * 1000:8.1f} ms  status={response_304.status_code}')
+
+
+@benchmark
+def initial_data_normalized():
+    """Oddiy va ?normalized=1 ko'rinishdagi initial data: hajm va qurish vaqti."""
+    seed_store()
+    get_store_settings()
+    for normalized in (False, True):
+        elapsed, body = timed(lambda: b''.join(stream_initial_data(normalized=normalized)), repeat=3)
+        label = 'normalized' if normalized else 'oddiy'
+        print(f'{label:12} qurish={elapsed * 1000:8.1f} ms  hajm={len(body) / 1024:8.0f} KiB')
+
+
+@benchmark
+def fast_serializers():
+    """DRF ModelSerializer va values_list asosidagi tezkor serializerlar: qator/soniya."""
+    seed_store(products=900, customers=2000, sales=5000)
+    cases = [
+        ('Product', Product.objects.all(), ProductSerializer, FastProductSerializer),
+        ('Customer', Customer.objects.all(), CustomerSerializer, FastCustomerSerializer),
+        ('Sale (+items, payments)', Sale.objects.select_related('seller__role', 'customer').prefetch_related('items__product', 'payments'),
+         SaleSerializer, FastSaleSerializer),
+        ('StockMovement', StockMovement.objects.select_related('product'), StockMovementSerializer, FastStockMovementSerializer),
+        ('WarehouseProduct', WarehouseProduct.objects.select_related('warehouse', 'product'), WarehouseProductSerializer,
+         FastWarehouseProductSerializer),
+    ]
+    renderer = JSONRenderer()
+    for label, queryset, drf_class, fast_class in cases:
+        drf_time, drf_data = timed(lambda: drf_class(queryset.all(), many=True).data)
+        fast_time, fast_data = timed(lambda: fast_class(queryset.all()).data)
+        rows = len(drf_data)
+        same = renderer.render(drf_data) == renderer.render(fast_data)
+        print(f'{label:24} {rows:6} qator  DRF={rows / drf_time:9.0f} qator/s  tezkor={rows / fast_time:9.0f} qator/s  '
+              f'x{drf_time / fast_time:5.1f}  bir xil={same}')
+
+
+def sale_payload(size, offset=0, **extra):
+    items = [{'productId': f'prod_bench_{offset + i}', 'quantity': 1, 'price': '1250.00'} for i in range(size)]
+    total = str(Decimal('1250.00') * size)
+    return {'items': items, 'subtotal': total, 'total': total, 'payments': [{'type': 'naqd', 'amount': total}], **extra}
+
+
+@benchmark
+def sale_commit():
+    """POST /api/sales/: savat hajmiga qarab so'rovlar soni va vaqt."""
+    seed_catalog(products=1000, customers=10)
+    client, _ = authorized_client(Role.Permission.USE_SALES_TERMINAL)
+    for size in (1, 10, 30, 100):
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed, response = timed(lambda: client.post('/api/sales/', sale_payload(size), format='json'))
+        print(f'{size:4} qator  status={response.status_code}  so\'rovlar={len(ctx):3}  vaqt={elapsed * 1000:7.1f} ms')
+
+
+@benchmark
+def sale_receipt():
+    """POST /api/sales/: to'liq javob va ?response=receipt (qisqa chek) solishtirmasi."""
+    seed_catalog(products=1000, customers=10)
+    client, _ = authorized_client(Role.Permission.USE_SALES_TERMINAL)
+    repeat = 10
+    for size in (1, 10, 100):
+        for label, url in (('to\'liq', '/api/sales/'), ('chek', '/api/sales/?response=receipt')):
+            with CaptureQueriesContext(connection) as ctx:
+                elapsed, response = timed(lambda: client.post(url, sale_payload(size), format='json'), repeat=repeat)
+            print(f'{size:4} qator  {label:7} status={response.status_code} so\'rovlar={len(ctx) // repeat:3} '
+                  f'javob={len(response.content):7} bayt  vaqt={elapsed * 1000:7.1f} ms')
+
+
+@benchmark
+def sale_batch_sync():
+    """POST /api/sales/batch/: oflayn navbatni birma-bir va bitta paketda yuborish."""
+    seed_catalog(products=1000, customers=10)
+    client, _ = authorized_client(Role.Permission.USE_SALES_TERMINAL)
+    for count in (10, 100, 300):
+        sales = [sale_payload(3, offset=i % 900, clientId=f'bench_{count}_{i}') for i in range(count)]
+        with CaptureQueriesContext(connection) as ctx:
+            single, _ = timed(lambda: [client.post('/api/sales/', sale, format='json') for sale in sales])
+        single_queries = len(ctx)
+        Sale.objects.filter(clientId__isnull=True).delete()
+        with CaptureQueriesContext(connection) as ctx:
+            batch, response = timed(lambda: client.post('/api/sales/batch/', {'sales': sales}, format='json'))
+        created = sum(result['status'] == 'created' for result in response.data['results'])
+        print(f'{count:4} savdo  birma-bir: so\'rovlar={single_queries:5} vaqt={single * 1000:8.1f} ms   '
+              f'paket: so\'rovlar={len(ctx):4} vaqt={batch * 1000:7.1f} ms  created={created}')
+
+
+@benchmark
+def sales_history():
+    """GET /api/sales/history/: keyset pagination'da 1- va 10 000- sahifa, OFFSET bilan solishtirish."""
+    seed_store(products=500, customers=200, sales=50000, items_per_sale=2)
+    client, _ = authorized_client(Role.Permission.VIEW_SALES_HISTORY)
+    limit = 5
+    url = f'/api/sales/history/?limit={limit}&summary=0'
+    deep = Sale.objects.order_by('-date', '-id').values_list('date', 'id')[limit * 9999 - 1]
+    deep_cursor = KeysetPagination().encode_cursor(deep)
+    for label, page_url in (('1-sahifa', url), ('10 000-sahifa', f'{url}&cursor={deep_cursor}')):
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed, response = timed(lambda: client.get(page_url), repeat=20)
+        print(f'{label:14} keyset  status={response.status_code} so\'rovlar={len(ctx) // 20} vaqt={elapsed * 1000:6.2f} ms')
+    for label, offset in (('1-sahifa', 0), ('10 000-sahifa', limit * 9999)):
+        elapsed, _ = timed(lambda: list(Sale.objects.order_by('-date', '-id').values_list('id', flat=True)[offset:offset + limit]), repeat=20)
+        print(f'{label:14} OFFSET  faqat id\'lar:  vaqt={elapsed * 1000:6.2f} ms')
+    elapsed, response = timed(lambda: client.get('/api/sales/history/?payment_type=plastik'), repeat=5)
+    print(f'summary (50 000 savdo) vaqt={elapsed * 1000:6.1f} ms  {response.data["summary"]}')
+
+
+@benchmark
+def stock_as_of():
+    """Oy boshidagi qoldiq: snapshot'siz (butun tarix) va kunlik snapshot'lar bilan."""
+    seed_catalog(products=500, customers=1)
+    seed_movements(200000, products=500, days=365)
+    client, _ = authorized_client(Role.Permission.MANAGE_WAREHOUSE)
+    day = (timezone.localdate() - timedelta(days=200)).isoformat()
+    url = f'/api/stock/as-of/?as_of={day}'
+    elapsed, response = timed(lambda: client.get(url), repeat=3)
+    print(f'snapshot\'siz         vaqt={elapsed * 1000:7.1f} ms  mahsulotlar={len(response.data["results"])}')
+    elapsed, created = timed(lambda: build_stock_snapshots(backfill_days=365))
+    print(f'{len(created)} ta snapshot qurildi  vaqt={elapsed * 1000:7.1f} ms')
+    with_snapshots, snapshot_response = timed(lambda: client.get(url), repeat=3)
+    same = snapshot_response.data['results'] == response.data['results']
+    print(f'snapshot bilan       vaqt={with_snapshots * 1000:7.1f} ms  natija bir xil={same}')
+    elapsed, created = timed(build_stock_snapshots)
+    print(f'qayta ishga tushirish: {len(created)} ta yangi snapshot  vaqt={elapsed * 1000:7.1f} ms')
+
+
+@benchmark
+def reservation_expiry():
+    """Muddati o'tgan bronlarni ommaviy bo'shatish: so'rovlar soni bronlar soniga bog'liq emas."""
+    seed_catalog(products=500, customers=1)
+    warehouse = Warehouse.objects.create(id='wh_bench', name='Bench ombor')
+    WarehouseProduct.objects.bulk_create([
+        WarehouseProduct(id=f'wh_prod_bench_{i}', warehouse=warehouse, product_id=f'prod_bench_{i}', quantity=1000)
+        for i in range(500)
+    ])
+    client, _ = authorized_client(Role.Permission.USE_SALES_TERMINAL)
+    for carts in (10, 100, 400):
+        for cart in range(carts):
+            items = [{'productId': f'prod_bench_{(cart * 7 + j) % 500}', 'quantity': 1} for j in range(5)]
+            client.post('/api/reservations/', {'cartId': f'cart_{carts}_{cart}', 'warehouseId': warehouse.pk, 'items': items}, format='json')
+        StockReservation.objects.update(expires_at=timezone.now())
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed, released = timed(release_expired_reservations)
+        reserved = WarehouseProduct.objects.aggregate(total=Sum('reserved_quantity'))['total']
+        print(f'{carts:4} savat  {released:5} bron  so\'rovlar={len(ctx):3}  vaqt={elapsed * 1000:7.1f} ms  qolgan bron={reserved}')
+
+
+@benchmark
+def stock_transfer():
+    """POST /api/stock-transfers/: qatorlar soniga qarab so'rovlar soni va vaqt."""
+    seed_catalog(products=1000, customers=1)
+    source = Warehouse.objects.create(id='wh_bench_from', name='Manba')
+    Warehouse.objects.create(id='wh_bench_to', name='Qabul qiluvchi')
+    WarehouseProduct.objects.bulk_create([
+        WarehouseProduct(id=f'wh_prod_bench_{i}', warehouse=source, product_id=f'prod_bench_{i}', quantity=1000)
+        for i in range(1000)
+    ])
+    client, _ = authorized_client(Role.Permission.MANAGE_WAREHOUSE)
+    for size in (1, 10, 100, 500):
+        payload = {'fromWarehouseId': 'wh_bench_from', 'toWarehouseId': 'wh_bench_to',
+                   'items': [{'productId': f'prod_bench_{i}', 'quantity': 1 + i % 3} for i in range(size)]}
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed, response = timed(lambda: client.post('/api/stock-transfers/', payload, format='json'))
+        print(f'{size:4} qator  status={response.status_code}  so\'rovlar={len(ctx):3}  vaqt={elapsed * 1000:7.1f} ms')
+
+
+@benchmark
+def stocktake_import():
+    """apply_stocktake: 100 000 qatorli sanoq fayli, xotira cho'qqisi va qator/s."""
+    seed_catalog(products=20000, customers=1)
+
+    def count_lines():
+        return (f'478{i % 25000:010d},{i % 7}\n' for i in range(100000))  # ~20% topilmaydigan shtrix-kodlar
+
+    with CaptureQueriesContext(connection) as ctx:
+        report = apply_stocktake(iter_count_rows(count_lines(), 'csv'))
+    print(f"qatorlar={report['lines']}  topildi={report['matched']}  topilmadi={report['unknown']}  "
+          f"tuzatildi={report['adjusted']}  so'rovlar={len(ctx)}")
+    print(f"vaqt={report['seconds']:.2f} s  {report['linesPerSecond']} qator/s")
+    # tracemalloc ishni sekinlashtiradi, shuning uchun xotira alohida o'lchanadi
+    tracemalloc.start()
+    apply_stocktake(iter_count_rows(count_lines(), 'csv'))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"xotira cho'qqisi={peak / 1024 / 1024:.1f} MB")
+
+
+@benchmark
+def goods_receipt():
+    """POST /api/goods-receipts/: qatorlar soniga qarab so'rovlar soni va vaqt (omborli kirim)."""
+    seed_catalog(products=2000, customers=1)
+    Supplier.objects.create(id='sup_bench', name='Yetkazib beruvchi', phone='+998900000000')
+    Warehouse.objects.create(id='wh_bench', name='Asosiy')
+    client, _ = authorized_client(Role.Permission.MANAGE_WAREHOUSE)
+    for size in (1, 10, 100, 1000, 2000):
+        payload = {'supplierId': 'sup_bench', 'warehouseId': 'wh_bench', 'totalAmount': '0',
+                   'items': [{'productId': f'prod_bench_{i}', 'quantity': 1 + i % 5, 'purchasePrice': f'{1000 + i % 50}.00'}
+                             for i in range(size)]}
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed, response = timed(lambda: client.post('/api/goods-receipts/', payload, format='json'))
+        print(f'{size:5} qator  status={response.status_code}  so\'rovlar={len(ctx):3}  vaqt={elapsed * 1000:8.1f} ms')
+
+
+@benchmark
+def goods_receipt_history():
+    """GET /api/goods-receipts/history/: sahifa hajmiga qarab so'rovlar soni (har kirimda 20 qator)."""
+    seed_catalog(products=500, customers=1)
+    supplier = Supplier.objects.create(id='sup_bench', name='Yetkazib beruvchi', phone='+998900000000')
+    now = timezone.now()
+    with explicit_dates(GoodsReceipt):
+        receipts = GoodsReceipt.objects.bulk_create([
+            GoodsReceipt(id=f'rcpt_bench_{i}', supplier=supplier, docNumber=f'N-{i:05d}', totalAmount=0,
+                         date=now - timedelta(hours=i))
+            for i in range(2000)
+        ])
+    GoodsReceiptItem.objects.bulk_create([
+        GoodsReceiptItem(receipt=receipt, product_id=f'prod_bench_{(i * 20 + j) % 500}', quantity=1, purchasePrice=1000)
+        for i, receipt in enumerate(receipts) for j in range(20)
+    ], batch_size=1000)
+    client, _ = authorized_client(Role.Permission.MANAGE_WAREHOUSE)
+    for limit in (10, 50, 200):
+        url = f'/api/goods-receipts/history/?limit={limit}'
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed, response = timed(lambda: client.get(url))
+        print(f'limit={limit:3}  status={response.status_code}  so\'rovlar={len(ctx)}  vaqt={elapsed * 1000:6.1f} ms')
+    elapsed, response = timed(lambda: client.get('/api/goods-receipts/history/?doc_number=N-0123'), repeat=5)
+    print(f'doc_number=N-0123  topildi={len(response.data["results"])}  vaqt={elapsed * 1000:6.1f} ms')
+
+
+def stampede_refreshes(clients=50):
+    """Kesh bo'sh paytda bir vaqtda kelgan so'rovlar: agregatlar necha marta hisoblanadi."""
+    compute_stats = dashboard.compute_stats
+    calls = []
+
+    def slow_compute():
+        # Thread'lar test bazasining tranzaksiyasini ko'rmaydi: faqat keshning xatti-harakati o'lchanadi
+        calls.append(1)
+        time.sleep(0.2)
+        return {}
+
+    dashboard.compute_stats = slow_compute
+    try:
+        dashboard.invalidate()
+        threads = [threading.Thread(target=dashboard.get_stats) for _ in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        print(f"{clients} ta parallel so'rov (kesh bo'sh): hisoblashlar={len(calls)}  "
+              f"vaqt={(time.perf_counter() - started) * 1000:6.1f} ms")
+    finally:
+        dashboard.compute_stats = compute_stats
+        dashboard.invalidate()
+
+
+@benchmark
+def dashboard_stats():
+    """GET /api/dashboard/stats/: kunlik yig'indilardan va butun tarix bo'yicha agregatlar bilan."""
+    seed_store(products=500, customers=200, sales=100000, items_per_sale=1, days=3 * 365)
+    client, _ = authorized_client(Role.Permission.VIEW_DASHBOARD)
+    dashboard.invalidate()
+    elapsed, response = timed(lambda: client.get('/api/dashboard/stats/'))
+    print(f"dashboard endpoint (kesh bo'sh) vaqt={elapsed * 1000:7.1f} ms  total_sales={response.data['total_sales']}")
+    elapsed, response = timed(lambda: client.get('/api/dashboard/stats/'), repeat=20)
+    print(f"dashboard endpoint (keshdan)    vaqt={elapsed * 1000:7.1f} ms  cache_age={response.data['cache_age']}")
+    stampede_refreshes()
+    since = timezone.now() - timedelta(days=30)
+
+    def history_aggregates():
+        Sale.objects.aggregate(total=Sum('total'))
+        Expense.objects.aggregate(total=Sum('amount'))
+        Sale.objects.filter(date__gte=since).aggregate(total=Sum('total'), count=Count('id'))
+        Expense.objects.filter(date__gte=since).aggregate(total=Sum('amount'), count=Count('id'))
+        list(Expense.objects.values('type').annotate(total=Sum('amount'), count=Count('id')))
+    recent_since = timezone.localdate(since)
+
+    def rollup_aggregates():
+        DailySalesRollup.objects.aggregate(total=Sum('total'))
+        DailyExpenseRollup.objects.aggregate(total=Sum('amount'))
+        DailySalesRollup.objects.filter(date__gte=recent_since).aggregate(total=Sum('total'), count=Sum('count'))
+        DailyExpenseRollup.objects.filter(date__gte=recent_since).aggregate(total=Sum('amount'), count=Sum('count'))
+        list(DailyExpenseRollup.objects.values('expenseTypeId').annotate(total=Sum('amount'), count=Sum('count')))
+    for label, func in (('butun tarix (100k savdo)', history_aggregates), ("kunlik yig'indilar", rollup_aggregates)):
+        elapsed, _ = timed(func, repeat=20)
+        print(f"{label:26} agregatlar vaqti={elapsed * 1000:6.2f} ms")
+    elapsed, created = timed(rebuild_rollups)
+    print(f"rebuild_rollups: {created} qator  vaqt={elapsed * 1000:7.1f} ms")
+
+
+@benchmark
+def product_reports():
+    """Top mahsulotlar, yalpi marja va ABC: kunlik faktlardan va CartItem -> Sale JOIN bilan."""
+    seed_store(products=2000, customers=200, sales=100000, items_per_sale=3, days=365)
+    client, _ = authorized_client(Role.Permission.VIEW_REPORTS)
+    since = timezone.now() - timedelta(days=90)
+
+    def top_products_join():
+        return list(CartItem.objects.filter(sale__date__gte=since).values('product_id')
+                    .annotate(total_sold=Sum('quantity')).order_by('-total_sold')[:10])
+    elapsed, _ = timed(top_products_join, repeat=5)
+    print(f'top-10 (JOIN, 90 kun)    vaqt={elapsed * 1000:7.1f} ms')
+    start = timezone.localdate(since).isoformat()
+    for url in (f'/api/reports/top-products/?start_date={start}', f'/api/reports/gross-margin/?start_date={start}',
+                f'/api/reports/abc/?start_date={start}'):
+        with CaptureQueriesContext(connection) as ctx:
+            elapsed, response = timed(lambda: client.get(url), repeat=5)
+        print(f'{url.split("?")[0]:28} status={response.status_code} so\'rovlar={len(ctx) // 5} vaqt={elapsed * 1000:7.1f} ms')
+
+
+@benchmark
+def sales_timeseries():
+    """GET /api/reports/timeseries/: 1 000 000 savdo, bir yillik soatlik/kunlik/oylik bo'laklar."""
+    total = 1000000
+    make_employee([], phone='900000001')
+    now = timezone.now()
+    step = timedelta(days=365) / total
+    payment_types = SalePayment.PaymentType.values
+    for start in range(0, total, 50000):
+        chunk = range(start, min(start + 50000, total))
+        Sale.objects.bulk_create([
+            Sale(id=f'sale_ts_{i}', date=now - step * i, subtotal=Decimal('6250.00'), total=Decimal('6250.00'),
+                 seller_id='emp_bench_900000001')
+            for i in chunk
+        ], batch_size=5000)
+        SalePayment.objects.bulk_create([
+            SalePayment(sale_id=f'sale_ts_{i}', type=payment_types[i % len(payment_types)], amount=Decimal('6250.00'))
+            for i in chunk
+        ], batch_size=5000)
+    elapsed, created = timed(rebuild_rollups)
+    print(f"rebuild_rollups: {created} qator  vaqt={elapsed:.1f} s")
+    client, _ = authorized_client(Role.Permission.VIEW_REPORTS)
+    start = (timezone.localdate() - timedelta(days=364)).isoformat()
+    for bucket in ('hour', 'day', 'week', 'month'):
+        url = f'/api/reports/timeseries/?bucket={bucket}&tz=Asia/Tashkent&start_date={start}'
+        elapsed, response = timed(lambda: client.get(url), repeat=3)
+        print(f"{bucket:5}  bo'laklar={len(response.data['results']):5}  manba={response.data['source']}  "
+              f"vaqt={elapsed * 1000:7.1f} ms")
+    for bucket in ('hour', 'month'):
+        url = f'/api/reports/timeseries/?bucket={bucket}&tz=Asia/Tashkent&start_date={start}&seller_id=emp_bench_900000001'
+        elapsed, response = timed(lambda: client.get(url), repeat=3)
+        print(f"{bucket:5} + seller_id  manba={response.data['source']}  vaqt={elapsed * 1000:7.1f} ms")
+
+
+@benchmark
+def export_files():
+    """GET /api/exports/sales/: 1 kunlik va 100 kunlik oraliq, CSV/XLSX, xotira cho'qqisi va qator/s."""
+    seed_store(sales=20000, days=100)
+    client, _ = authorized_client(Role.Permission.VIEW_REPORTS)
+
+    def download(url):
+        response = client.get(url)
+        return sum(len(part) for part in response.streaming_content)
+
+    for days in (1, 10, 100):
+        start = timezone.localdate() - timedelta(days=days - 1)
+        lines = CartItem.objects.filter(sale__date__gte=day_start(start)).count()
+        for file_format in ('csv', 'xlsx'):
+            url = f'/api/exports/sales/?file_format={file_format}&start_date={start}'
+            elapsed, size = timed(lambda: download(url))
+            # tracemalloc ishni sekinlashtiradi, shuning uchun xotira alohida o'lchanadi
+            tracemalloc.start()
+            download(url)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{days:3} kun {file_format:4}  qatorlar={lines:6}  hajm={size / 1024:6.0f} KB  vaqt={elapsed:5.2f} s  "
+                  f"{lines / elapsed:6.0f} qator/s  xotira cho'qqisi={peak / 1024 / 1024:4.1f} MB")
+
+@benchmark
+def shift_reports():
+    """Z-hisobot (smena hisoblagichlari) va kunlik savdolarni skanlash; sotuvchilar hisoboti; savdoga qo'shimcha so'rovlar."""
+    seed_store(products=500, customers=200, sales=100000, items_per_sale=1, days=30)
+    client, employee = authorized_client(Role.Permission.USE_SALES_TERMINAL, Role.Permission.VIEW_REPORTS)
+    client.post('/api/sales/', sale_payload(1), format='json')  # keshlarni isitish
+    with CaptureQueriesContext(connection) as ctx:
+        client.post('/api/sales/', sale_payload(1), format='json')
+    print(f"savdo (smenasiz)  so'rovlar={len(ctx)}")
+    shift_id = client.post('/api/shifts/open/', {'openingCash': '100000'}, format='json').data['id']
+    with CaptureQueriesContext(connection) as ctx:
+        client.post('/api/sales/', sale_payload(1), format='json')
+    print(f"savdo (smenada)   so'rovlar={len(ctx)}")
+    for i in range(200):
+        client.post('/api/sales/', sale_payload(1, offset=i % 400), format='json')
+
+    elapsed, response = timed(lambda: client.get(f'/api/shifts/{shift_id}/z-report/'), repeat=20)
+    print(f"Z-hisobot (hisoblagichlar)  savdolar={response.data['salesCount']}  vaqt={elapsed * 1000:6.2f} ms")
+    day = day_start(timezone.localdate())
+
+    def scan_day():
+        Sale.objects.filter(date__gte=day).aggregate(total=Sum('total'), count=Count('id'))
+        list(SalePayment.objects.filter(sale__date__gte=day).values('type').annotate(amount=Sum('amount')))
+    elapsed, _ = timed(scan_day, repeat=5)
+    print(f"kunlik Sale/SalePayment skan  savdolar={Sale.objects.filter(date__gte=day).count()}  "
+          f"vaqt={elapsed * 1000:6.2f} ms")
+    elapsed, response = timed(lambda: client.get('/api/reports/sellers/'), repeat=3)
+    print(f"sotuvchilar hisoboti (30 kun, 100k savdo)  sotuvchilar={len(response.data['results'])}  "
+          f"vaqt={elapsed * 1000:6.1f} ms")
+
+
+@benchmark
+def debt_ledger():
+    """Qarz daftari: mijoz hisob-kitob varag'i, qarz yoshi hisoboti va Customer.debt ni solishtirish."""
+    seed_catalog(products=10, customers=2000)
+    now = timezone.now()
+    entries = []
+    for i in range(200000):
+        # Har 4-yozuv to'lov (-), qolganlari nasiya savdo (+); sanalar oxirgi 180 kunga yoyilgan
+        payment = i % 4 == 3
+        entries.append(DebtLedgerEntry(
+            customer_id=f'cust_bench_{i % 2000}', date=now - timedelta(minutes=i * 1.3),
+            amount=Decimal('-15000' if payment else '10000'),
+            kind=DebtLedgerEntry.Kind.PAYMENT if payment else DebtLedgerEntry.Kind.SALE,
+        ))
+    DebtLedgerEntry.objects.bulk_create(entries, batch_size=5000)
+    reconcile_debts(fix=True)
+    client, _ = authorized_client(Role.Permission.MANAGE_CUSTOMERS, Role.Permission.VIEW_REPORTS)
+
+    elapsed, response = timed(lambda: client.get('/api/customers/cust_bench_7/statement/'), repeat=10)
+    print(f"hisob-kitob varag'i (30 kun)  yozuvlar={len(response.data['entries'])}  vaqt={elapsed * 1000:6.2f} ms")
+    elapsed, response = timed(lambda: client.get('/api/reports/debt-aging/'), repeat=3)
+    print(f"qarz yoshi (200k yozuv)  mijozlar={len(response.data['customers'])}  {response.data['buckets']}  "
+          f"vaqt={elapsed * 1000:6.1f} ms")
+    elapsed, response = timed(lambda: client.get('/api/reports/debt-aging/', {'customer_id': 'cust_bench_7'}), repeat=10)
+    print(f"qarz yoshi (bitta mijoz)  vaqt={elapsed * 1000:6.2f} ms")
+    elapsed, mismatches = timed(reconcile_debts, repeat=3)
+    print(f"reconcile_debts  farqlar={len(mismatches)}  vaqt={elapsed * 1000:6.1f} ms")
+
+
+@benchmark
+def auth_queries():
+    """HasPermission bilan himoyalangan so'rovdagi autentifikatsiya so'rovlari soni."""
+    employee = make_employee([Role.Permission.MANAGE_SETTINGS])
+    tokens = {
+        'eski token (claim\'siz)': str(RefreshToken.for_user(employee).access_token),
+        'role/perms claim\'li token': str(token_for_employee(employee).access_token),
+    }
+    client = APIClient()
+    for label, token in tokens.items():
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        role_cache.invalidate()
+        client.get('/api/units/')  # keshni isitish
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/units/')
+        # /api/units/ ning o'zi bitta so'rov qiladi
+        print(f'{label:32} status={response.status_code} so\'rovlar={len(ctx)} (auth: {len(ctx) - 1})')
+
+
+if __name__ == '__main__':
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        print(f'== {name}')
+        with transaction.atomic():
+            BENCHMARKS[name]()
+            transaction.set_rollback(True)
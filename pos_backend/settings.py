@@ -156,7 +156,8 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # role/perms claim'li tokenlar uchun bazaga so'rovsiz autentifikatsiya
+        'api.authentication.RoleClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -197,6 +198,34 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=7),
 }
 
+# Rollar va xodimlar holatining har bir worker'dagi keshi qancha soniya yashaydi. O'zgarishlar
+# CACHES['default'] dagi versiya kaliti orqali darhol tarqaladi; bir necha worker bilan ishlaganda
+# CACHES umumiy bo'lishi kerak (jarayon ichidagi LocMemCache da TTL yagona chegara bo'lib qoladi)
+ROLE_CACHE_TTL = 60
+
+# ChangeLog: shu soniyadan yosh yozuvlar hali commit bo'lmagan tranzaksiyalar bilan aralashishi
+# mumkin, shuning uchun delta kursori ulardan o'tmaydi (eng uzun yozish tranzaksiyasidan katta bo'lsin)
+CHANGELOG_SAFETY_WINDOW = 60
+
+# prune_changelog sukut bo'yicha shuncha kundan eski ChangeLog yozuvlarini o'chiradi; undan eski
+# kursor bilan kelgan terminal 410 oladi va to'liq ma'lumotni qayta yuklaydi
+CHANGELOG_RETENTION_DAYS = 30
+
+# PIN digest bo'yicha topilmaganda pin_lookup'siz eski xodimlar orasidan tekshirish (telefonsiz)
+# har IP manzil uchun daqiqasiga shuncha marta ruxsat etiladi
+LEGACY_PIN_SCANS_PER_MINUTE = 10
+
+# Idempotency-Key bilan saqlangan javoblar qancha soniya qayta beriladi
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Savat bronlari (StockReservation) sukut bo'yicha qancha soniya amal qiladi
+STOCK_RESERVATION_TTL = 15 * 60
+
+# Dashboard natijasi har bir worker'da shuncha soniya yangi hisoblanadi (0 - keshsiz);
+# MAX_STALE gacha eskirgan natija darhol qaytariladi va fonda yangilanadi
+DASHBOARD_CACHE_TTL = 10
+DASHBOARD_CACHE_MAX_STALE = 60
+
 JAZZMIN_UI_TWEAKS = {
     "navbar_small_text": False,
     "footer_small_text": False,